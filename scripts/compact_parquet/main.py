@@ -0,0 +1,277 @@
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fsspec.core import url_to_fs
+from pydantic import BaseModel
+
+from ..schema import HIDDEN_PREFIXES
+from ..transform_load_to_parquet.catalog import CATALOG_NAME, update_catalog
+from ..transform_load_to_parquet.layout import Layout
+from ..transform_load_to_parquet.parallel import MANIFEST_NAME
+from ..transform_load_to_parquet.rollups import ROLLUP_TEMPLATE
+from ..transform_load_to_parquet.writers import write_parquet_stream
+from .parser import get_config
+
+logger = logging.getLogger("Compact Parquet")
+
+HISTOGRAM_WIDTH = 40
+# Bytes of decoded rows buffered before a row group is sorted and written
+BUFFER_SIZE = 256 * 1024**2
+JOURNAL_TEMPLATE = "_compaction-{token}.json"
+TEMPORARY_GLOB = ".compact-*"
+
+
+class CompactionJournal(BaseModel):
+    """
+    Swap of a rewritten group of files, written once the new files are complete so that a swap interrupted by a crash
+    is completed on the next run: file names of the partition directory, from the hidden new files to their final
+    names, and the original files they replace.
+    """
+
+    renames: dict[str, str]
+    replaced: list[str]
+
+
+def main(argv: list[str] | None = None) -> None:
+    config = get_config(argv)
+    logging.basicConfig(level=config.log_level)
+
+    try:
+        if not config.dataset.is_dir():
+            raise FileNotFoundError(f"Dataset directory '{config.dataset}' doesn't exist.")
+
+        if not config.dry_run:
+            recover_interrupted_rewrites(config.dataset)
+        partitions = list_partitions(config.dataset)
+        log_histogram("Before compaction", partitions, config.target_size)
+        groups = [
+            (directory, group)
+            for directory, files in partitions.items()
+            for group in plan_partition(files, config.target_size)
+        ]
+        logger.info(
+            f"{sum(len(group) for _, group in groups)} files in {len({directory for directory, _ in groups})} "
+            f"partitions to rewrite as {len(groups)} groups"
+        )
+        if config.dry_run:
+            return
+
+        if groups:
+            remove_outdated_sidecars(config.dataset, [path for _, group in groups for path in group])
+        for directory, group in groups:
+            rewrite_group(directory, group, config.target_size, config.layout)
+        if (config.dataset / CATALOG_NAME).exists():
+            # Entries of the rewritten files are replaced, the others are kept
+            update_catalog(*url_to_fs(str(config.dataset)))
+        log_histogram("After compaction", list_partitions(config.dataset), config.target_size)
+
+    except FileNotFoundError as e:
+        logger.exception(e)
+        sys.exit(1)
+    except Exception as e:
+        logger.exception(f"An error occurred: {e}")
+        sys.exit(1)
+
+
+def list_partitions(dataset: Path) -> dict[Path, list[Path]]:
+    """
+    Returns the visible Parquet files of the dataset grouped by directory, in name order.
+    """
+    partitions: dict[Path, list[Path]] = {}
+    for path in sorted(dataset.rglob("*.parquet")):
+        if not any(part.startswith(HIDDEN_PREFIXES) for part in path.relative_to(dataset).parts):
+            partitions.setdefault(path.parent, []).append(path)
+    return partitions
+
+
+def plan_partition(files: list[Path], target_size: int) -> list[list[Path]]:
+    """
+    Groups the files of a partition that are rewritten together. Files smaller than the target size are packed, in
+    name order, into groups of about the target size, and files over twice the target size are rewritten alone to be
+    split. A small file left alone in its group is kept as it is.
+    """
+    oversized: list[list[Path]] = []
+    small_groups: list[list[Path]] = [[]]
+    small_size = 0
+    for path in files:
+        size = path.stat().st_size
+        if size > 2 * target_size:
+            oversized.append([path])
+        elif size < target_size:
+            if small_groups[-1] and small_size + size > target_size:
+                small_groups.append([])
+                small_size = 0
+            small_groups[-1].append(path)
+            small_size += size
+    return oversized + [group for group in small_groups if len(group) > 1]
+
+
+def rewrite_group(directory: Path, files: list[Path], target_size: int, layout: Layout) -> list[Path]:
+    """
+    Rewrites a group of files of a partition into files of about the target size. The files are streamed batch by
+    batch through the Parquet writer of the streaming conversion, so only a row group is held in memory and, as in
+    that conversion, the rows of every row group are sorted as the layout requires but not the file as a whole.
+    New files are written with hidden names, then a journal of the swap is written before they are renamed into
+    place and the original files are removed. An interrupted write leaves no visible file, and an interrupted swap
+    is completed from the journal by the next run, so duplicated rows are never left behind.
+    """
+    schema = pa.unify_schemas([pq.read_schema(path) for path in files], promote_options="permissive")
+    rows = sum(pq.read_metadata(path).num_rows for path in files)
+    file_count = max(1, round(sum(path.stat().st_size for path in files) / target_size))
+    rows_per_file = max(1, math.ceil(rows / file_count))
+    token = uuid.uuid4().hex[:8]
+
+    temporary_paths: list[Path] = []
+    try:
+        pieces = split_rows(read_batches(files, schema), rows_per_file)
+        for index, file_pieces in itertools.groupby(pieces, key=lambda piece: piece[0]):
+            temporary_path = directory / f".compact-{token}-{index:05d}.parquet"
+            temporary_paths.append(temporary_path)
+            reader = pa.RecordBatchReader.from_batches(schema, (batch for _, batch in file_pieces))
+            write_parquet_stream(reader, temporary_path, layout, BUFFER_SIZE)
+    except BaseException:
+        for temporary_path in temporary_paths:
+            temporary_path.unlink(missing_ok=True)
+        raise
+
+    journal = CompactionJournal(
+        renames={
+            path.name: f"part-compacted-{token}-{index:05d}.parquet" for index, path in enumerate(temporary_paths)
+        },
+        replaced=[path.name for path in files],
+    )
+    journal_path = directory / JOURNAL_TEMPLATE.format(token=token)
+    # Written in a hidden file and renamed into place, so a journal is always complete
+    temporary_journal_path = directory / f".{journal_path.name}.tmp"
+    temporary_journal_path.write_text(journal.model_dump_json())
+    os.replace(temporary_journal_path, journal_path)
+    written = complete_rewrite(journal_path)
+    logger.debug(f"'{directory.name}': {len(files)} files rewritten as {len(written)}")
+    return written
+
+
+def read_batches(files: list[Path], schema: pa.Schema) -> Iterator[pa.RecordBatch]:
+    """
+    Reads the files batch by batch with the schema of the group. Columns missing from a file are filled with nulls.
+    """
+    for path in files:
+        for batch in pq.ParquetFile(path).iter_batches():
+            columns = [
+                batch.column(field.name).cast(field.type)
+                if field.name in batch.schema.names
+                else pa.nulls(batch.num_rows, field.type)
+                for field in schema
+            ]
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def split_rows(batches: Iterator[pa.RecordBatch], rows_per_file: int) -> Iterator[tuple[int, pa.RecordBatch]]:
+    """
+    Slices the batches at every multiple of the rows per file, with the index of the file each slice belongs to.
+    """
+    offset = 0
+    for batch in batches:
+        start = 0
+        while start < batch.num_rows:
+            index = offset // rows_per_file
+            length = min(batch.num_rows - start, (index + 1) * rows_per_file - offset)
+            yield index, batch.slice(start, length)
+            start += length
+            offset += length
+
+
+def remove_outdated_sidecars(dataset: Path, rewritten: list[Path]) -> None:
+    """
+    Removes the files written next to the dataset that describe files about to be rewritten: the rollups, which
+    can only answer queries when they cover every file of the dataset, and the manifest of the parallel conversion.
+    They are removed before the rewrite so that a crash can't leave them pointing at missing files. The catalog is
+    refreshed after the rewrite instead, and the ingest state of the incremental conversion is kept, as its part
+    lists only record the conversion.
+    """
+    rollup_paths = sorted(dataset.glob(ROLLUP_TEMPLATE.format(name="*")))
+    for path in rollup_paths:
+        path.unlink()
+    if rollup_paths:
+        logger.warning(f"{len(rollup_paths)} rollups removed, convert the dataset again to write them")
+    manifest_path = dataset / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        listed = {part["path"] for chunk in manifest["chunks"] for part in chunk["parts"]}
+        if listed & {str(path.relative_to(dataset)) for path in rewritten}:
+            manifest_path.unlink()
+            logger.warning(f"'{MANIFEST_NAME}' removed, it lists rewritten parts")
+
+
+def complete_rewrite(journal_path: Path) -> list[Path]:
+    """
+    Renames the new files of a journal into place, removes the files they replace and then the journal. Steps
+    already done are skipped, so it completes a swap interrupted at any point.
+    """
+    directory = journal_path.parent
+    journal = CompactionJournal.model_validate_json(journal_path.read_text())
+    for temporary_name, name in journal.renames.items():
+        if (directory / temporary_name).exists():
+            os.replace(directory / temporary_name, directory / name)
+    for name in journal.replaced:
+        (directory / name).unlink(missing_ok=True)
+    journal_path.unlink()
+    return [directory / name for name in journal.renames.values()]
+
+
+def recover_interrupted_rewrites(dataset: Path) -> None:
+    """
+    Completes the swaps that a previous run left unfinished, then removes the hidden files of the rewrites that
+    were interrupted before their journal was written.
+    """
+    for journal_path in sorted(dataset.rglob(JOURNAL_TEMPLATE.format(token="*"))):
+        written = complete_rewrite(journal_path)
+        logger.warning(f"Interrupted rewrite of '{journal_path.parent.name}' completed as {len(written)} files")
+    for path in sorted(dataset.rglob(TEMPORARY_GLOB)):
+        path.unlink()
+        logger.warning(f"Removed '{path.name}', left by an interrupted rewrite")
+
+
+def size_histogram(sizes: list[int], target_size: int) -> list[tuple[str, int]]:
+    """
+    Counts the files per size bucket, with bucket edges relative to the target size.
+    """
+    edges = [0, target_size / 64, target_size / 8, target_size / 2, target_size, 2 * target_size, math.inf]
+    counts, _ = np.histogram(sizes, bins=edges)
+    labels = [f"{format_size(low)} - {format_size(high)}" for low, high in zip(edges, edges[1:-1])]
+    labels.append(f">= {format_size(edges[-2])}")
+    return list(zip(labels, counts.tolist()))
+
+
+def log_histogram(title: str, partitions: dict[Path, list[Path]], target_size: int) -> None:
+    sizes = [path.stat().st_size for files in partitions.values() for path in files]
+    files_per_partition = [len(files) for files in partitions.values()] or [0]
+    logger.info(
+        f"{title}: {len(sizes)} files in {len(partitions)} partitions ({format_size(sum(sizes))}), "
+        f"up to {max(files_per_partition)} files per partition"
+    )
+    histogram = size_histogram(sizes, target_size)
+    largest = max(count for _, count in histogram) or 1
+    for label, count in histogram:
+        logger.info(f"  {label:>23} {count:>6} {'#' * math.ceil(HISTOGRAM_WIDTH * count / largest)}")
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+if __name__ == "__main__":
+    main()
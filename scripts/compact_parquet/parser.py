@@ -0,0 +1,67 @@
+import argparse
+import logging
+from pathlib import Path
+from typing import get_args
+
+from pydantic import BaseModel
+
+from ..transform_load_to_parquet.layout import Compression, Layout
+
+
+class Config(BaseModel):
+    dataset: Path
+    target_size: int
+    layout: Layout
+    dry_run: bool
+    log_level: int
+
+
+def get_parser() -> argparse.ArgumentParser:
+    prog = "Compact Parquet"
+    description = (
+        "Merge the small files of every partition of a Parquet dataset, and split the oversized ones, "
+        "into files of about a target size."
+    )
+    dataset_help = "Directory of the Parquet dataset, optionally hive-partitioned."
+    target_size_help = (
+        "Target file size in MiB. Smaller files of a partition are merged up to this size, and files over twice "
+        "this size are split. Default is 128."
+    )
+    sort_by_help = "Columns by which the rows of the rewritten files are sorted."
+    row_group_size_help = "Maximum number of rows per row group of the rewritten files. Default is 1000000."
+    compression_help = "Compression codec of the rewritten files. Default is snappy."
+    compression_level_help = "Compression level, for the codecs that support it (zstd, gzip, brotli)."
+    page_index_help = "Write the page index in the rewritten files."
+    dry_run_help = "Only report the files that would be rewritten."
+    log_level_help = "Set the root logger level to the specified level."
+    log_level_choices = ("NOTSET", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument("dataset", type=Path, help=dataset_help)
+    parser.add_argument("-t", "--target-size", type=float, help=target_size_help, default=128)
+    parser.add_argument("--sort-by", help=sort_by_help, nargs="+")
+    parser.add_argument("--row-group-size", type=int, help=row_group_size_help, default=1_000_000)
+    parser.add_argument("--compression", help=compression_help, choices=get_args(Compression), default="snappy")
+    parser.add_argument("--compression-level", type=int, help=compression_level_help)
+    parser.add_argument("--page-index", help=page_index_help, action="store_true")
+    parser.add_argument("-n", "--dry-run", help=dry_run_help, action="store_true")
+    parser.add_argument("-l", "--log-level", help=log_level_help, choices=log_level_choices, default="INFO")
+    return parser
+
+
+def get_config(argv: list[str] | None = None) -> Config:
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    return Config(
+        dataset=args.dataset,
+        target_size=int(args.target_size * 1024**2),
+        layout=Layout(
+            sort_by=args.sort_by,
+            row_group_size=args.row_group_size,
+            compression=args.compression,
+            compression_level=args.compression_level,
+            page_index=args.page_index,
+        ),
+        dry_run=args.dry_run,
+        log_level=getattr(logging, args.log_level),
+    )
@@ -1,29 +1,43 @@
+import itertools
 import logging
 import math
 import sys
+from collections import deque
 from concurrent import futures
 from functools import cached_property
-from typing import Any, TextIO
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TypeVar
 
 import numpy as np
 import numpy.typing as npt
 import polars as pl
 from pydantic import BaseModel, ConfigDict
 
+from ..schema import FIELDS, PRODUCT_CATEGORIES, SALE_REGIONS
+from .profiles import DistributionProfile, draw_codes, draw_sales, extend_labels, inject_malformed, inject_nulls
+from .writers import BatchWriter, OutputFormat, QuoteStyle, get_writer, write_shard_file
+
 logger = logging.getLogger("Synthetic Data")
 
-FIELDS = ("id_cliente", "fecha_de_transaccion", "cantidad_de_venta", "categoria_de_producto", "region_de_venta")
-PRODUCT_CATEGORIES = ["Moda", "Tecnología", "Belleza", "Salud", "Juguetes"]
-SALE_REGIONS = ["Caribe", "Andina", "Pacífico", "Orinoquía", "Amazonía", "Insular"]
 DATES_RANGE = np.arange("2023-01-01", "2024-01-01", dtype="datetime64[D]")
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class Config(BaseModel):
     records: int = 10_000_000
     batch_size: int = 1_000_000
     workers: int = 3
     rng_seed: int = 12345
+    # Also the path of the Parquet and Arrow IPC outputs, the name is kept for the existing configs
     csv_output_path: str = "challenge/dataset_preparation/dataset.csv"
+    output_format: OutputFormat = OutputFormat.CSV
+    max_pending_batches: int | None = None
+    ordered: bool = False
+    sharded: bool = False
+    categorical: bool = False
+    profile: DistributionProfile | None = None
     log_level: int = logging.INFO
 
     @cached_property
@@ -34,6 +48,18 @@ class Config(BaseModel):
     def random_number_generator(self) -> np.random.Generator:
         return np.random.default_rng(self.rng_seed)
 
+    @cached_property
+    def pending_batches_limit(self) -> int:
+        # Two batches per worker keep every process busy while the parent writes
+        return max(1, self.max_pending_batches or 2 * self.workers)
+
+    @cached_property
+    def quote_style(self) -> QuoteStyle:
+        # Malformed rows get their extra field from an unquoted separator in a value
+        if self.profile is not None and self.profile.malformed_rate > 0:
+            return "never"
+        return "necessary"
+
 
 class DataframeConfig(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -43,27 +69,56 @@ class DataframeConfig(BaseModel):
     dates_range: npt.NDArray[np.datetime64]
     batch_size: int
     seed: int
+    categorical: bool = False
+    profile: DistributionProfile | None = None
+
+
+class ShardConfig(BaseModel):
+    df_config: DataframeConfig
+    path: Path
+    output_format: OutputFormat
+    quote_style: QuoteStyle = "necessary"
 
 
 def main(config: Config | None = None) -> None:
     """
-    Generates and saves synthetic data to a CSV file.
-    This function uses multiprocessing to generate data in parallel, which may result in the saved data being unordered.
-    The generated data is written to the specified CSV file path.
+    Generates and saves synthetic data to a CSV, Parquet or Arrow IPC file.
+    This function uses multiprocessing to generate data in parallel, which may result in the saved data being unordered
+    unless `ordered` is set. At most `pending_batches_limit` batches are held in memory at any time.
+    The generated data is written to the specified output path, one batch at a time.
+    When `sharded` is set the workers serialize their own batches into shard files, so the parent only concatenates
+    CSV bytes (or, for Parquet and IPC, the output path becomes a directory of part files).
     """
     config = config or Config()
     logging.basicConfig(level=config.log_level)
 
     with (
-        open(config.csv_output_path, "w") as file,
+        get_writer(config.output_format, config.csv_output_path, FIELDS, config.sharded, config.quote_style) as writer,
         futures.ProcessPoolExecutor(max_workers=config.workers) as executor,
     ):
-        write_header(file)
         df_configs = (generate_df_config(batch_num, config) for batch_num in range(config.number_of_batches))
         logger.info("Generating data")
-        future_dfs = [executor.submit(_generate_df, df_config) for df_config in df_configs]
-        logger.info("Writing data")
-        results = [write_content(file, future_df) for future_df in futures.as_completed(future_dfs)]
+        if config.sharded:
+            shard_configs = (
+                ShardConfig(
+                    df_config=df_config,
+                    path=writer.shard_path(batch_num),
+                    output_format=config.output_format,
+                    quote_style=config.quote_style,
+                )
+                for batch_num, df_config in enumerate(df_configs)
+            )
+            future_shards = submit_bounded(
+                executor, _generate_shard, shard_configs, config.pending_batches_limit, config.ordered
+            )
+            logger.info("Writing data")
+            results = [write_shard(writer, future_shard) for future_shard in future_shards]
+        else:
+            future_dfs = submit_bounded(
+                executor, _generate_df, df_configs, config.pending_batches_limit, config.ordered
+            )
+            logger.info("Writing data")
+            results = [write_content(writer, future_df) for future_df in future_dfs]
 
     exceptions = [e for e in results if e is not None]
     if not exceptions:
@@ -78,8 +133,27 @@ def main(config: Config | None = None) -> None:
     sys.exit(1)
 
 
-def write_header(file: TextIO) -> None:
-    file.write(",".join(FIELDS) + "\n")
+def submit_bounded(
+    executor: futures.Executor, fn: Callable[[T], R], args: Iterable[T], limit: int, ordered: bool = False
+) -> Iterator[futures.Future[R]]:
+    """
+    Lazily submits `fn(arg)` for every arg, keeping at most `limit` futures pending besides the one being consumed.
+    A new task is only submitted once a finished one is handed over, so the results held in memory are bounded by
+    `limit` rather than by the number of args.
+    Futures are yielded as they complete, or in submission order when `ordered` is set.
+    """
+    args_iter = iter(args)
+    pending = deque(executor.submit(fn, arg) for arg in itertools.islice(args_iter, limit))
+    while pending:
+        if ordered:
+            future = pending.popleft()
+            futures.wait([future])
+        else:
+            done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            future = next(iter(done))
+            pending.remove(future)
+        pending.extend(executor.submit(fn, arg) for arg in itertools.islice(args_iter, 1))
+        yield future
 
 
 def generate_df_config(batch_number: int, config: Config) -> DataframeConfig:
@@ -92,22 +166,41 @@ def generate_df_config(batch_number: int, config: Config) -> DataframeConfig:
         dates_range=DATES_RANGE,
         batch_size=config.batch_size,
         seed=next_seed,
+        categorical=config.categorical,
+        profile=config.profile,
     )
     return df_config
 
 
 def _generate_df(df_config: DataframeConfig) -> pl.DataFrame:
-    data = generate_data_batch(**df_config.model_dump())
+    batch_args = df_config.model_dump(exclude={"profile"})
+    if df_config.profile is None:
+        data = generate_data_batch(**batch_args)
+    else:
+        data = generate_profiled_batch(**batch_args, profile=df_config.profile)
     df = pl.DataFrame(data)
     return df
 
 
+def _generate_shard(shard_config: ShardConfig) -> Path:
+    df = _generate_df(shard_config.df_config)
+    write_shard_file(df, shard_config.path, shard_config.output_format, shard_config.quote_style)
+    return shard_config.path
+
+
 def generate_data_batch(
-    start_id: int, end_id: int, dates_range: npt.NDArray[np.datetime64], batch_size: int, seed: int
+    start_id: int,
+    end_id: int,
+    dates_range: npt.NDArray[np.datetime64],
+    batch_size: int,
+    seed: int,
+    categorical: bool = False,
 ) -> dict[str, Any]:
     # Column oriented generator
     rng = np.random.default_rng(seed)
     ids = np.arange(start_id, end_id)
+    if categorical:
+        return generate_coded_columns(rng, ids, dates_range, batch_size)
     dates = rng.choice(dates_range, batch_size)
     sales = rng.integers(10, 10001, batch_size)
     categories = rng.choice(PRODUCT_CATEGORIES, batch_size)
@@ -116,15 +209,84 @@ def generate_data_batch(
     return data
 
 
-def write_content(file: TextIO, future: futures.Future[pl.DataFrame]) -> Exception | None:
+def generate_coded_columns(
+    rng: np.random.Generator, ids: npt.NDArray[np.int64], dates_range: npt.NDArray[np.datetime64], batch_size: int
+) -> dict[str, Any]:
+    """
+    Draws small integer codes instead of sampling the string values, and maps them to `pl.Enum` and `pl.Date` columns
+    without materializing any Python string. Enum columns are transferred and written as dictionary-encoded data.
+    The random stream differs from the default generator, so the same seed yields a different (still deterministic)
+    dataset.
+    """
+    epoch_days = dates_range.astype("datetime64[D]").astype(np.int32)
+    date_codes = rng.integers(0, len(dates_range), batch_size, dtype=np.int32)
+    sales = rng.integers(10, 10001, batch_size)
+    category_codes = rng.integers(0, len(PRODUCT_CATEGORIES), batch_size, dtype=np.uint8)
+    region_codes = rng.integers(0, len(SALE_REGIONS), batch_size, dtype=np.uint8)
+    dates = pl.Series(epoch_days[date_codes]).cast(pl.Date)
+    categories = pl.Series(category_codes).cast(pl.Enum(PRODUCT_CATEGORIES))
+    regions = pl.Series(region_codes).cast(pl.Enum(SALE_REGIONS))
+    data = dict(zip(FIELDS, (ids, dates, sales, categories, regions)))
+    return data
+
+
+def generate_profiled_batch(
+    start_id: int,
+    end_id: int,
+    dates_range: npt.NDArray[np.datetime64],
+    batch_size: int,
+    seed: int,
+    profile: DistributionProfile,
+    categorical: bool = False,
+) -> dict[str, Any]:
+    """
+    Generates a batch following the given distribution profile. The output only depends on the seed, so a
+    dataset is reproducible regardless of the number of workers.
+    Region values are kept as strings when malformed rows are injected, since they no longer match the categories.
+    """
+    rng = np.random.default_rng(seed)
+    if profile.clients is None:
+        ids = pl.Series(np.arange(start_id, end_id))
+    else:
+        ids = pl.Series(draw_codes(rng, profile.clients, profile.client_skew, batch_size) + 1)
+    categories = extend_labels(PRODUCT_CATEGORIES, profile.categories, "Categoría")
+    regions = extend_labels(SALE_REGIONS, profile.regions, "Región")
+    epoch_days = dates_range.astype("datetime64[D]").astype(np.int32)
+    dates = pl.Series(epoch_days[rng.integers(0, len(dates_range), batch_size)]).cast(pl.Date)
+    sales = pl.Series(draw_sales(rng, profile.sales, batch_size))
+    category_codes = pl.Series(draw_codes(rng, len(categories), profile.category_skew, batch_size), dtype=pl.UInt32)
+    region_codes = pl.Series(draw_codes(rng, len(regions), profile.region_skew, batch_size), dtype=pl.UInt32)
+    category_values = category_codes.cast(pl.Enum(categories))
+    region_values = region_codes.cast(pl.Enum(regions))
+    if not categorical:
+        category_values = category_values.cast(pl.String)
+    if not categorical or profile.malformed_rate > 0:
+        region_values = region_values.cast(pl.String)
+    region_values = inject_malformed(region_values, rng, profile.malformed_rate)
+    columns = [ids] + [inject_nulls(s, rng, profile.null_rate) for s in (dates, sales, category_values, region_values)]
+    data = dict(zip(FIELDS, columns))
+    return data
+
+
+def write_content(writer: BatchWriter, future: futures.Future[pl.DataFrame]) -> Exception | None:
     try:
         df = future.result()
-        df.write_csv(file, include_header=False)
+        writer.write(df)
         return None
     except Exception as e:
         logger.exception(f"An error ocurred while trying to write the data: {e}")
         return e
 
 
+def write_shard(writer: BatchWriter, future: futures.Future[Path]) -> Exception | None:
+    try:
+        path = future.result()
+        writer.append_shard(path)
+        return None
+    except Exception as e:
+        logger.exception(f"An error ocurred while trying to write the shard: {e}")
+        return e
+
+
 if __name__ == "__main__":
     main()
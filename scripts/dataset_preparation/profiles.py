@@ -0,0 +1,75 @@
+from typing import Literal
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+from pydantic import BaseModel, Field
+
+
+class DistributionProfile(BaseModel):
+    """
+    Shape of the generated data. The defaults reproduce the cardinalities of the uniform generator.
+    Skews are Zipf exponents over the ranked values: 0 is uniform and values around 1 give a typical long tail.
+    Setting `clients` draws `id_cliente` from that many distinct clients instead of one id per record.
+    Rates are per value (`null_rate`, applied to every column but `id_cliente`) or per row (`malformed_rate`, rows
+    with an extra field once written as CSV).
+    """
+
+    categories: int = Field(default=5, ge=1)
+    regions: int = Field(default=6, ge=1)
+    category_skew: float = Field(default=0.0, ge=0)
+    region_skew: float = Field(default=0.0, ge=0)
+    clients: int | None = Field(default=None, ge=1)
+    client_skew: float = Field(default=0.0, ge=0)
+    sales: Literal["uniform", "lognormal"] = "uniform"
+    null_rate: float = Field(default=0.0, ge=0, le=1)
+    malformed_rate: float = Field(default=0.0, ge=0, le=1)
+
+
+PROFILES: dict[str, DistributionProfile] = {
+    "uniform": DistributionProfile(),
+    "skewed": DistributionProfile(categories=50, regions=30, category_skew=1.1, region_skew=0.8, sales="lognormal"),
+    "high_cardinality": DistributionProfile(
+        categories=5_000, regions=200, category_skew=1.0, clients=1_000_000, client_skew=1.2, sales="lognormal"
+    ),
+    "dirty": DistributionProfile(category_skew=1.0, null_rate=0.01, malformed_rate=0.001),
+}
+
+
+def extend_labels(labels: list[str], count: int, prefix: str) -> list[str]:
+    return labels[:count] + [f"{prefix} {i + 1}" for i in range(len(labels), count)]
+
+
+def draw_codes(rng: np.random.Generator, n_values: int, skew: float, size: int) -> npt.NDArray[np.int64]:
+    if skew == 0:
+        return rng.integers(0, n_values, size)
+    weights = 1.0 / np.arange(1, n_values + 1) ** skew
+    return rng.choice(n_values, size, p=weights / weights.sum())
+
+
+def draw_sales(
+    rng: np.random.Generator, distribution: Literal["uniform", "lognormal"], size: int
+) -> npt.NDArray[np.int64]:
+    if distribution == "lognormal":
+        # Median around 1000 with a heavy right tail, floored at the uniform minimum
+        return np.rint(rng.lognormal(np.log(1000), 1.0, size)).astype(np.int64) + 10
+    return rng.integers(10, 10001, size)
+
+
+def inject_nulls(series: pl.Series, rng: np.random.Generator, rate: float) -> pl.Series:
+    if rate == 0:
+        return series
+    indices = np.flatnonzero(rng.random(len(series)) < rate)
+    return series.scatter(indices, None)
+
+
+def inject_malformed(series: pl.Series, rng: np.random.Generator, rate: float) -> pl.Series:
+    """
+    Appends an unquoted extra field to a fraction of the values of a string column, so the row is malformed
+    once written as CSV.
+    """
+    if rate == 0:
+        return series
+    indices = np.flatnonzero(rng.random(len(series)) < rate)
+    malformed = series.gather(indices) + ",malformed"
+    return series.scatter(indices, malformed)
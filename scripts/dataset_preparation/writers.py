@@ -0,0 +1,218 @@
+import os
+import shutil
+import tempfile
+from abc import abstractmethod
+from enum import StrEnum
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Literal, Self
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from ..schema import ARROW_SCHEMA
+
+# Values are quoted when they contain separators or quotes, unless rows are meant to be malformed
+QuoteStyle = Literal["necessary", "never"]
+
+
+class OutputFormat(StrEnum):
+    CSV = "csv"
+    PARQUET = "parquet"
+    IPC = "ipc"
+
+
+class BatchWriter:
+    """
+    Sink for the batches produced by the generator.
+    Batches are either handed over as dataframes (`write`) or serialized by the workers into shard files that the
+    writer takes ownership of (`shard_path` + `append_shard`).
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    @abstractmethod
+    def write(self, df: pl.DataFrame) -> None:
+        pass
+
+    def shard_path(self, batch_number: int) -> Path:
+        raise NotImplementedError(f"{type(self).__name__} doesn't support shard files")
+
+    def append_shard(self, path: Path) -> None:
+        raise NotImplementedError(f"{type(self).__name__} doesn't support shard files")
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class CsvWriter(BatchWriter):
+    """
+    Writes every batch to a single CSV file. Shards are headerless CSV files concatenated at the byte level.
+    """
+
+    def __init__(self, path: str | Path, fields: tuple[str, ...], quote_style: QuoteStyle = "necessary") -> None:
+        super().__init__(path)
+        self.quote_style = quote_style
+        self.file: BinaryIO = open(path, "wb")
+        self.shard_dir: Path | None = None
+        write_header(self.file, fields)
+
+    def write(self, df: pl.DataFrame) -> None:
+        df.write_csv(self.file, include_header=False, quote_style=self.quote_style)
+
+    def shard_path(self, batch_number: int) -> Path:
+        if self.shard_dir is None:
+            # Same directory as the output so the shards can be copied in-kernel
+            self.shard_dir = Path(tempfile.mkdtemp(prefix=".shards-", dir=self.path.parent))
+        return self.shard_dir / f"part-{batch_number:05d}.csv"
+
+    def append_shard(self, path: Path) -> None:
+        self.file.flush()
+        append_file(self.file, path)
+        path.unlink()
+
+    def close(self) -> None:
+        self.file.close()
+        if self.shard_dir is not None:
+            shutil.rmtree(self.shard_dir, ignore_errors=True)
+
+
+class ParquetWriter(BatchWriter):
+    """
+    Appends each batch as a row group of a single Parquet file with the dataset schema.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__(path)
+        self.writer = pq.ParquetWriter(self.path, ARROW_SCHEMA, compression="snappy")
+
+    def write(self, df: pl.DataFrame) -> None:
+        table = to_dataset_table(df)
+        self.writer.write_table(table, row_group_size=table.num_rows)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class IpcWriter(BatchWriter):
+    """
+    Appends each batch as record batches of a single Arrow IPC (Feather v2) file with the dataset schema.
+    IPC files only allow one dictionary per column, so dictionary columns are stored decoded.
+    """
+
+    schema = pa.schema(
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in ARROW_SCHEMA
+    )
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__(path)
+        self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def write(self, df: pl.DataFrame) -> None:
+        self.writer.write_table(df.to_arrow().cast(self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class PartFileWriter(BatchWriter):
+    """
+    Treats the output path as a directory with one Parquet or IPC part file per batch.
+    Shards are written by the workers straight into their final location.
+    """
+
+    def __init__(self, path: str | Path, output_format: OutputFormat) -> None:
+        super().__init__(path)
+        self.output_format = output_format
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.batch_number = 0
+
+    def write(self, df: pl.DataFrame) -> None:
+        write_shard_file(df, self.shard_path(self.batch_number), self.output_format)
+        self.batch_number += 1
+
+    def shard_path(self, batch_number: int) -> Path:
+        suffix = "arrow" if self.output_format == OutputFormat.IPC else self.output_format.value
+        return self.path / f"part-{batch_number:05d}.{suffix}"
+
+    def append_shard(self, path: Path) -> None:
+        if not path.exists():
+            raise FileNotFoundError(f"Part file '{path}' was not written")
+
+    def close(self) -> None:
+        pass
+
+
+def to_dataset_table(df: pl.DataFrame) -> pa.Table:
+    return df.to_arrow().cast(ARROW_SCHEMA)
+
+
+def write_header(file: BinaryIO, fields: tuple[str, ...]) -> None:
+    file.write((",".join(fields) + "\n").encode())
+
+
+def write_shard_file(
+    df: pl.DataFrame, path: Path, output_format: OutputFormat, quote_style: QuoteStyle = "necessary"
+) -> None:
+    # Binary formats go through PyArrow: Polars' thread pool can deadlock in forked worker processes
+    if output_format == OutputFormat.CSV:
+        df.write_csv(path, include_header=False, quote_style=quote_style)
+        return
+    table = to_dataset_table(df)
+    if output_format == OutputFormat.PARQUET:
+        pq.write_table(table, path, compression="snappy")
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+
+def append_file(dst: BinaryIO, src_path: Path) -> None:
+    """
+    Appends the content of `src_path` to `dst` without moving the bytes through user space when the platform allows
+    it (`copy_file_range` may even share the extents on reflink-capable filesystems).
+    """
+    with open(src_path, "rb") as src:
+        remaining = os.fstat(src.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except (AttributeError, OSError):
+            # Not available on this platform or across these filesystems
+            shutil.copyfileobj(src, dst)
+            remaining = 0
+        if remaining > 0:
+            raise OSError(f"Shard '{src_path}' was only partially copied")
+
+
+def get_writer(
+    output_format: OutputFormat,
+    path: str | Path,
+    fields: tuple[str, ...],
+    sharded: bool = False,
+    quote_style: QuoteStyle = "necessary",
+) -> BatchWriter:
+    if sharded and output_format != OutputFormat.CSV:
+        return PartFileWriter(path, output_format)
+    match output_format:
+        case OutputFormat.CSV:
+            return CsvWriter(path, fields, quote_style)
+        case OutputFormat.PARQUET:
+            return ParquetWriter(path)
+        case OutputFormat.IPC:
+            return IpcWriter(path)
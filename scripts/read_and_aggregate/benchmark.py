@@ -1,23 +1,38 @@
+import os
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-from . import main_dask, main_pandas, main_polars, main_pyspark
+from . import main_dask, main_duckdb, main_pandas, main_polars, main_pyarrow, main_pyspark, main_streaming
 from .common import Processor
 
 GCS_PATH = "gs://single_file/"
 OUTPUT_FILENAME = "single.png"
-FRAMEWORKS = ("Pandas", "Dask", "Pyspark", "Polars")
+FRAMEWORKS = ("Pandas", "Pandas (parallel)", "Dask", "Pyspark", "Polars", "PyArrow", "DuckDB", "Streaming")
 
 
 def main() -> None:
     pandas_results = get_results(main_pandas.PandasProcessor, path=GCS_PATH)
+    parallel_pandas_results = get_results(main_pandas.PandasProcessor, path=GCS_PATH, workers=os.cpu_count() or 1)
     dask_results = get_results(main_dask.DaskProcessor, path=GCS_PATH)
     pyspark_results = get_results(main_pyspark.SparkProcessor, path=GCS_PATH)
     polars_results = get_results(main_polars.PolarsProcessor, path=GCS_PATH)
+    pyarrow_results = get_results(main_pyarrow.PyArrowProcessor, path=GCS_PATH)
+    duckdb_results = get_results(main_duckdb.DuckDBProcessor, path=GCS_PATH)
+    streaming_results = get_results(main_streaming.StreamingProcessor, path=GCS_PATH)
 
     # Labels and measurements
     labels = ("Reading", "Processing", "Total")
-    framework_results = zip(pandas_results, dask_results, pyspark_results, polars_results)
+    framework_results = zip(
+        pandas_results,
+        parallel_pandas_results,
+        dask_results,
+        pyspark_results,
+        polars_results,
+        pyarrow_results,
+        duckdb_results,
+        streaming_results,
+    )
     framework_times = zip(labels, framework_results)
 
     # Label locations
@@ -42,8 +57,8 @@ def main() -> None:
     plt.savefig(OUTPUT_FILENAME)
 
 
-def get_results(processor_class: type[Processor], path: str) -> tuple[float, float, float]:
-    processor = processor_class(path)
+def get_results(processor_class: type[Processor], path: str, workers: int = 1) -> tuple[float, float, float]:
+    processor = processor_class(path, workers=workers)
     processor.run()
     times = processor.read_time, processor.process_time
     return *times, float(sum(times))
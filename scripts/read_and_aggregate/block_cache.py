@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any
+
+from fsspec import AbstractFileSystem
+from fsspec.spec import AbstractBufferedFile
+
+from .cache import object_version
+
+logger = logging.getLogger("Block cache")
+
+
+class BlockCache:
+    """
+    Size-bounded on-disk store of fixed-size blocks of remote files, shared by every engine and run. Blocks are keyed
+    by path, object version and index, so a rewritten object never reads stale blocks, and the least recently used
+    blocks are evicted once the store is larger than `max_size` bytes.
+    """
+
+    def __init__(self, directory: Path, max_size: int, block_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.block_size = block_size
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = sum(path.stat().st_size for path in self.directory.glob("*.block"))
+        self.hits = 0
+        self.misses = 0
+        self.cached_bytes = 0
+        self.fetched_bytes = 0
+
+    def block_path(self, path: str, version: str, index: int) -> Path:
+        key = hashlib.sha256(f"{path}\0{version}\0{self.block_size}\0{index}".encode()).hexdigest()
+        return self.directory / f"{key}.block"
+
+    def read(self, path: str, version: str, index: int, start: int, end: int) -> bytes | None:
+        """
+        Bytes `start` to `end` of a cached block, relative to the block, or None if the block isn't cached.
+        """
+        block_path = self.block_path(path, version, index)
+        try:
+            with open(block_path, "rb") as file:
+                file.seek(start)
+                data = file.read(end - start)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # The modification time of a block records its last use, for the eviction
+        os.utime(block_path)
+        self.hits += 1
+        self.cached_bytes += len(data)
+        return data
+
+    def write(self, path: str, version: str, index: int, data: bytes) -> None:
+        block_path = self.block_path(path, version, index)
+        # Written in a hidden file and renamed into place, so concurrent readers never see a partial block
+        temporary_path = self.directory / f".{block_path.stem}-{uuid.uuid4().hex[:8]}"
+        temporary_path.write_bytes(data)
+        os.replace(temporary_path, block_path)
+        self.fetched_bytes += len(data)
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        blocks = [(path.stat().st_mtime, path.stat().st_size, path) for path in self.directory.glob("*.block")]
+        self.size = sum(size for _, size, _ in blocks)
+        for _, size, path in sorted(blocks):
+            if self.size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            self.size -= size
+
+    def log_metrics(self) -> None:
+        requests = self.hits + self.misses
+        hit_ratio = self.hits / requests if requests else 0.0
+        logger.info(
+            f"{self.hits} block hits, {self.misses} misses ({hit_ratio:.0%} hit ratio), "
+            f"{self.cached_bytes / 1024**2:.2f} MiB read from the cache, "
+            f"{self.fetched_bytes / 1024**2:.2f} MiB fetched"
+        )
+
+
+class BlockCacheFileSystem(AbstractFileSystem):
+    """
+    Read-only fsspec filesystem reading the files of another one through a block cache. Listings and file details
+    come from the target filesystem, so the versions of the objects are always current.
+    """
+
+    protocol = "blockcache"
+    # Instances hold a cache and a filesystem, they aren't reused by fsspec
+    cachable = False
+
+    def __init__(self, target: AbstractFileSystem, cache: BlockCache, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.target = target
+        self.cache = cache
+
+    # DuckDB passes the paths with the protocol of this filesystem, which the target filesystem doesn't know
+    def ls(self, path: str, detail: bool = True, **kwargs: Any) -> Any:
+        return self.target.ls(self._strip_protocol(path), detail=detail, **kwargs)
+
+    def info(self, path: str, **kwargs: Any) -> dict[str, Any]:
+        info: dict[str, Any] = self.target.info(self._strip_protocol(path), **kwargs)
+        return info
+
+    def find(self, path: str, *args: Any, **kwargs: Any) -> Any:
+        return self.target.find(self._strip_protocol(path), *args, **kwargs)
+
+    def _open(self, path: str, mode: str = "rb", **kwargs: Any) -> "CachedFile":
+        if mode != "rb":
+            raise NotImplementedError("The block cache filesystem is read-only")
+        return CachedFile(self, path, self.info(path))
+
+
+class CachedFile(AbstractBufferedFile):
+    def __init__(self, fs: BlockCacheFileSystem, path: str, info: dict[str, Any]) -> None:
+        super().__init__(fs, path, mode="rb", block_size=fs.cache.block_size, cache_type="none", size=info["size"])
+        self.version = object_version(info)
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        """
+        Reads the range from the cached blocks. Consecutive missing blocks are fetched with a single request.
+        """
+        cache: BlockCache = self.fs.cache
+        end = min(end, self.size)
+        if start >= end:
+            return b""
+        block_size = cache.block_size
+        parts: list[bytes] = []
+        missing: list[int] = []
+
+        def fetch_missing() -> None:
+            fetch_start = missing[0] * block_size
+            fetch_end = min((missing[-1] + 1) * block_size, self.size)
+            data = self.fs.target.cat_file(self.path, start=fetch_start, end=fetch_end)
+            for index in missing:
+                block = data[(index - missing[0]) * block_size : (index - missing[0] + 1) * block_size]
+                cache.write(self.path, self.version, index, block)
+                parts.append(block[max(start - index * block_size, 0) : end - index * block_size])
+            missing.clear()
+
+        for index in range(start // block_size, (end - 1) // block_size + 1):
+            block_start = index * block_size
+            data = cache.read(self.path, self.version, index, max(start - block_start, 0), end - block_start)
+            if data is None:
+                missing.append(index)
+                continue
+            if missing:
+                fetch_missing()
+            parts.append(data)
+        if missing:
+            fetch_missing()
+        return b"".join(parts)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from fsspec import AbstractFileSystem
+from fsspec.core import url_to_fs
+from pydantic import BaseModel
+
+from ..schema import HIDDEN_PREFIXES
+
+logger = logging.getLogger("Result cache")
+
+# Attributes identifying the version of an object, from the most to the least precise
+VERSION_KEYS = ("generation", "etag", "mtime", "created")
+ENTRY_NAME = "entry.json"
+
+
+# Details of the files of a dataset by path relative to its root
+Files = dict[str, dict[str, Any]]
+
+
+class CacheEntry(BaseModel):
+    reports: list[str]
+    created_at: float
+
+
+def dataset_fingerprint(path: str, listing: Files | None = None) -> str:
+    """
+    Checksum of the names, sizes and versions (object generations, or modification times of local files) of the
+    files read from the path. It changes whenever a file of the dataset is added, removed or rewritten. The path is
+    listed unless its listing is given.
+    """
+    files = visible_files(listing if listing is not None else list_dataset(*url_to_fs(path)))
+    versions = [(name, info["size"], object_version(info)) for name, info in files.items()]
+    return hashlib.sha256(json.dumps(versions).encode()).hexdigest()
+
+
+def list_dataset(fs: AbstractFileSystem, root: str) -> Files:
+    """
+    Details of all the files below the root path, hidden ones included, by path relative to the root and in name
+    order. A file is listed under the empty name.
+    """
+    return {name[len(root) :].lstrip("/"): info for name, info in sorted(fs.find(root, detail=True).items())}
+
+
+def visible_files(listing: Files) -> Files:
+    """
+    The files of a listing read by the engines, leaving out the hidden ones.
+    """
+    return {
+        name: info
+        for name, info in listing.items()
+        if not any(part.startswith(HIDDEN_PREFIXES) for part in name.split("/") if part)
+    }
+
+
+def object_version(info: dict[str, Any]) -> str:
+    """
+    Version of a file from its fsspec details: the generation of GCS objects, or the modification time of local ones.
+    """
+    return str(next((info[key] for key in VERSION_KEYS if info.get(key) is not None), None))
+
+
+class ResultCache:
+    """
+    On-disk store of query results, one directory per key holding a Parquet file per report. Entries expire after
+    `ttl` seconds, and the least recently used entries are evicted once the store is larger than `max_size` bytes.
+    """
+
+    def __init__(self, directory: Path, max_size: int, ttl: float) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> dict[str, pd.DataFrame] | None:
+        entry_path = self.directory / key / ENTRY_NAME
+        entry = CacheEntry.model_validate_json(entry_path.read_text()) if entry_path.exists() else None
+        if entry is None or time.time() - entry.created_at > self.ttl:
+            self.misses += 1
+            logger.info("Cache miss")
+            return None
+        # The modification time of the entry file records its last use, for the eviction
+        os.utime(entry_path)
+        self.hits += 1
+        logger.info("Cache hit")
+        return {
+            name: pd.read_parquet(self.directory / key / f"{index}.parquet")
+            for index, name in enumerate(entry.reports)
+        }
+
+    def put(self, key: str, results: dict[str, pd.DataFrame]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written in a hidden directory and renamed into place, so readers never see a partial entry
+        temporary_path = self.directory / f".{key}-{uuid.uuid4().hex[:8]}"
+        temporary_path.mkdir()
+        for index, df in enumerate(results.values()):
+            df.to_parquet(temporary_path / f"{index}.parquet")
+        entry = CacheEntry(reports=list(results), created_at=time.time())
+        (temporary_path / ENTRY_NAME).write_text(entry.model_dump_json())
+        shutil.rmtree(self.directory / key, ignore_errors=True)
+        os.replace(temporary_path, self.directory / key)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the expired entries, then the least recently used ones until the store fits in its maximum size.
+        """
+        entries = []
+        for path in self.directory.iterdir():
+            entry_path = path / ENTRY_NAME
+            if path.name.startswith(".") or not entry_path.exists():
+                continue
+            entry = CacheEntry.model_validate_json(entry_path.read_text())
+            if time.time() - entry.created_at > self.ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = sum(file.stat().st_size for file in path.iterdir())
+            entries.append((entry_path.stat().st_mtime, size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            logger.debug(f"Cache entry '{path.name}' evicted")
@@ -0,0 +1,99 @@
+import logging
+import posixpath
+from typing import Any
+
+from fsspec import AbstractFileSystem
+from fsspec.core import url_to_fs
+
+from ..transform_load_to_parquet.catalog import Catalog, ColumnStatistics, FileEntry, json_value
+from .cache import Files, visible_files
+from .filters import COMPARISONS, Filters
+
+logger = logging.getLogger("Catalog")
+
+
+def plan_files(path: str, filters: Filters, listing: Files | None = None) -> list[str] | None:
+    """
+    Paths, relative to the dataset, of the files that can hold rows matching the filters according to the catalog
+    of the dataset, so that the dataset isn't listed and the footers of the pruned files aren't fetched. Returns None
+    when the dataset has no catalog, or when it is out of date and the dataset must be read as a directory.
+    The catalog is checked against the listing of the dataset when it is given, otherwise only the planned files
+    are checked.
+    """
+    fs, root = url_to_fs(path)
+    catalog = Catalog.load(fs, root)
+    if catalog is None or not catalog.files:
+        return None
+    if listing is not None and not catalog_is_current(catalog, listing):
+        logger.warning("The catalog doesn't match the files of the dataset, reading it as a directory")
+        return None
+    conditions = [(column, comparison, json_value(value)) for column, comparison, value in filters.conditions()]
+    # Engines need a file to read the schema from, its rows are then filtered out as usual
+    planned = [entry for entry in catalog.files if file_matches(entry, conditions)] or catalog.files[:1]
+    if listing is None and not entries_are_current(planned, fs, root):
+        logger.warning("The catalog doesn't match the files of the dataset, reading it as a directory")
+        return None
+    logger.info(f"{len(planned)} of {len(catalog.files)} files of the catalog can match the filters")
+    return [entry.path for entry in planned]
+
+
+def catalog_is_current(catalog: Catalog, listing: Files) -> bool:
+    """
+    Whether the catalog lists the Parquet files of the dataset with their current sizes. Versions aren't compared, as
+    a catalog written before uploading the dataset holds the modification times of the local files.
+    """
+    sizes = {name: info["size"] for name, info in visible_files(listing).items() if name.endswith(".parquet")}
+    return sizes == {entry.path: entry.size for entry in catalog.files}
+
+
+def entries_are_current(entries: list[FileEntry], fs: AbstractFileSystem, root: str) -> bool:
+    """
+    Whether the files of the entries still exist with the sizes of the catalog, from their details alone. Files added
+    to the dataset since the catalog was written aren't noticed.
+    """
+    for entry in entries:
+        try:
+            if fs.info(posixpath.join(root, entry.path))["size"] != entry.size:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def file_matches(entry: FileEntry, conditions: list[tuple[str, str, Any]]) -> bool:
+    """
+    Whether the partition values of the file and the statistics of any of its row groups can match the conditions.
+    """
+    file_conditions = []
+    for column, comparison, value in conditions:
+        if column not in entry.partition:
+            file_conditions.append((column, comparison, value))
+        elif not value_matches(entry.partition[column], comparison, value):
+            return False
+    return any(
+        all(
+            statistics_match(row_group.columns.get(column), comparison, value)
+            for column, comparison, value in file_conditions
+        )
+        for row_group in entry.row_groups
+        if row_group.rows
+    )
+
+
+def value_matches(partition_value: str, comparison: str, value: Any) -> bool:
+    if comparison == "in":
+        return partition_value in value
+    return bool(COMPARISONS[comparison](partition_value, value))
+
+
+def statistics_match(statistics: ColumnStatistics | None, comparison: str, value: Any) -> bool:
+    if statistics is None or statistics.min is None or statistics.max is None:
+        return True
+    try:
+        if comparison == "in":
+            return any(statistics.min <= item <= statistics.max for item in value)
+        # The row group can hold a value greater or equal than the bound if its maximum is, and conversely
+        return bool(COMPARISONS[comparison](statistics.max if comparison == ">=" else statistics.min, value))
+    except TypeError:
+        # Statistics of another type than the filter, they can't prune the row group
+        return True
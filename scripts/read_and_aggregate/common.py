@@ -1,9 +1,22 @@
 import functools
+import hashlib
+import json
+import logging
+import posixpath
 import time
 from abc import abstractmethod
 from typing import Any, Callable, TypeVar
 
-from .parser import get_config
+import pandas as pd
+from fsspec import AbstractFileSystem
+from fsspec.core import url_to_fs
+
+from .block_cache import BlockCache, BlockCacheFileSystem
+from .cache import Files, ResultCache, dataset_fingerprint, list_dataset, visible_files
+from .catalog import plan_files
+from .parser import Config, get_config
+from .query import DEFAULT_QUERY, Query
+from .rollups import answer_from_rollups
 
 T = TypeVar("T")
 
@@ -16,18 +29,122 @@ def execution_time(fn: Callable[[], T]) -> tuple[float, T]:
 
 
 class Processor:
-    def __init__(self, path: str) -> None:
+    def __init__(
+        self,
+        path: str,
+        query: Query | None = None,
+        cache: ResultCache | None = None,
+        block_cache: BlockCache | None = None,
+        rollups: bool = False,
+        catalog: bool = False,
+        workers: int = 1,
+    ) -> None:
         self.path = path
+        self.query = query or DEFAULT_QUERY
+        self.cache = cache
+        self.block_cache = block_cache
+        self.rollups = rollups
+        self.catalog = catalog
+        self.workers = workers
         self.read_time = 0.0
         self.process_time = 0.0
+        self.files: Files | None = None
+
+    def run(self) -> dict[str, pd.DataFrame]:
+        """
+        Computes the reports, or returns the cached results of the same query over the same version of the dataset.
+        """
+        # The dataset may have changed since the previous run
+        self.files = None
+        if self.cache is None:
+            return self.compute()
+        key = self.cache_key()
+        results = self.cache.get(key)
+        if results is None:
+            results = self.compute()
+            self.cache.put(key, results)
+        else:
+            self.cleanup()
+        return results
 
-    def run(self) -> None:
+    def compute(self) -> dict[str, pd.DataFrame]:
+        """
+        Computes the reports from the rollups of the dataset when they can answer the query, otherwise scans it.
+        """
+        if self.rollups:
+            results = answer_from_rollups(self.path, self.query, self.listing())
+            if results is not None:
+                self.cleanup()
+                return results
         self.read_time, data = execution_time(self.read)
         process = functools.partial(self.process, data=data)
         self.process_time, result = execution_time(process)
         self.cleanup()
         return result
 
+    def cache_key(self) -> str:
+        """
+        Key of the results of the query run by this engine over the current version of the dataset. Filter values
+        are sorted, as their order doesn't change the results.
+        """
+        query = self.query.model_dump(mode="json")
+        query["filters"] = {
+            name: sorted(value) if isinstance(value, list) else value for name, value in query["filters"].items()
+        }
+        key = {
+            "engine": type(self).__name__,
+            "path": self.path,
+            "dataset": dataset_fingerprint(self.path, self.listing()),
+            "query": query,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def listing(self) -> Files:
+        """
+        Files of the dataset, hidden ones included, listed at most once per run and shared by the result cache, the
+        rollups and the catalog.
+        """
+        if self.files is None:
+            self.files = list_dataset(*url_to_fs(self.path))
+        return self.files
+
+    def filesystem(self) -> tuple[AbstractFileSystem | None, str]:
+        """
+        Filesystem the dataset is read through when there is a block cache, and the path of the dataset in it.
+        Without one the engines read the path directly.
+        """
+        if self.block_cache is None:
+            return None, self.path
+        fs, path = url_to_fs(self.path)
+        return BlockCacheFileSystem(fs, self.block_cache), path
+
+    def paths(self, root: str) -> str | list[str]:
+        """
+        What the engines read below the root, the path of the dataset given by `filesystem`: the files that the
+        catalog of the dataset says can match the filters, or the root itself when there is no catalog.
+        """
+        if not self.catalog:
+            return root
+        # The catalog is checked against the listing of the dataset if it was already needed
+        files = plan_files(self.path, self.query.filters, self.files)
+        if files is None:
+            return root
+        return [posixpath.join(root, file) for file in files]
+
+    def file_paths(self, root: str) -> list[str]:
+        """
+        Like `paths`, with a dataset directory replaced by its visible Parquet files, for the engines that don't
+        skip the hidden files written next to them, such as the rollups, the catalog and the manifests.
+        """
+        paths = self.paths(root)
+        if isinstance(paths, list):
+            return paths
+        return [
+            posixpath.join(paths, name) if name else paths
+            for name in visible_files(self.listing())
+            if not name or name.endswith(".parquet")
+        ]
+
     @abstractmethod
     def cleanup(self) -> None:
         pass
@@ -37,11 +154,40 @@ class Processor:
         pass
 
     @abstractmethod
-    def process(self, data: Any) -> None:
+    def process(self, data: Any) -> dict[str, pd.DataFrame]:
+        """
+        Computes the reports of the query, returned by name as DataFrames with one column per group key and
+        aggregation.
+        """
         pass
 
 
+def log_results(logger: logging.Logger, results: dict[str, pd.DataFrame]) -> None:
+    logger.info("Information processed")
+    for name, df in results.items():
+        logger.info(f"{name}:\n{df}")
+
+
+def build_query(config: Config) -> Query:
+    """
+    The query of the given file, or the default reports, with the filters given in the command line.
+    """
+    query = Query.model_validate_json(config.query.read_text()) if config.query is not None else DEFAULT_QUERY
+    filters = query.filters.model_copy(update=config.filters.model_dump(exclude_none=True))
+    return query.model_copy(update={"filters": filters})
+
+
 def main(processor_class: type[Processor], argv: list[str] | None = None) -> None:
     config = get_config(argv)
-    processor = processor_class(config.path)
+    cache = ResultCache(config.cache_dir, config.cache_size, config.cache_ttl) if config.cache else None
+    # Local files are already on disk, only remote ones are read through the block cache
+    remote = "://" in config.path and not config.path.startswith("file://")
+    block_cache = None
+    if config.block_cache and remote:
+        block_cache = BlockCache(config.block_cache_dir, config.block_cache_size, config.block_size)
+    processor = processor_class(
+        config.path, build_query(config), cache, block_cache, config.rollups, config.catalog, config.workers
+    )
     processor.run()
+    if block_cache is not None:
+        block_cache.log_metrics()
@@ -0,0 +1,84 @@
+import operator
+from datetime import date
+from typing import Any
+
+import polars as pl
+import pyarrow.compute as pc
+from pydantic import BaseModel
+
+DATE_COLUMN = "fecha_de_transaccion"
+CATEGORY_COLUMN = "categoria_de_producto"
+REGION_COLUMN = "region_de_venta"
+COMPARISONS = {">=": operator.ge, "<=": operator.le}
+
+
+class Filters(BaseModel):
+    """
+    Row filters of a query. Every engine receives them in its own form so they are applied while reading: Parquet
+    readers skip the row groups whose min/max statistics can't match, and the hive partition directories whose
+    values don't.
+    """
+
+    start_date: date | None = None
+    end_date: date | None = None
+    regions: list[str] | None = None
+    categories: list[str] | None = None
+
+    def conditions(self) -> list[tuple[str, str, Any]]:
+        """
+        Conditions as (column, comparison, value) tuples, all of which must hold.
+        """
+        conditions: list[tuple[str, str, Any]] = []
+        if self.start_date is not None:
+            conditions.append((DATE_COLUMN, ">=", self.start_date))
+        if self.end_date is not None:
+            conditions.append((DATE_COLUMN, "<=", self.end_date))
+        if self.categories is not None:
+            conditions.append((CATEGORY_COLUMN, "in", self.categories))
+        if self.regions is not None:
+            conditions.append((REGION_COLUMN, "in", self.regions))
+        return conditions
+
+    def to_dnf(self) -> list[tuple[str, str, Any]] | None:
+        """
+        Filters in the disjunctive normal form taken by `pd.read_parquet` and `dd.read_parquet`.
+        """
+        return self.conditions() or None
+
+    def to_arrow(self) -> pc.Expression | None:
+        expression = None
+        for column, comparison, value in self.conditions():
+            field = pc.field(column)
+            condition = field.isin(value) if comparison == "in" else COMPARISONS[comparison](field, value)
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def to_polars(self) -> list[pl.Expr]:
+        """
+        Predicates to pass together to `LazyFrame.filter`.
+        """
+        # Passed as separate predicates, a single conjunction of a hive column and two file columns makes Polars
+        # project the wrong columns of partitioned datasets
+        predicates = []
+        for column, comparison, value in self.conditions():
+            field = pl.col(column)
+            predicates.append(field.is_in(value) if comparison == "in" else COMPARISONS[comparison](field, value))
+        return predicates
+
+    def to_sql(self) -> str | None:
+        """
+        Filters as a SQL condition.
+        """
+        conditions = []
+        for column, comparison, value in self.conditions():
+            if comparison == "in":
+                conditions.append(f"{column} IN ({', '.join(sql_literal(item) for item in value)})")
+            else:
+                conditions.append(f"{column} {comparison} {sql_literal(value)}")
+        return " AND ".join(conditions) or None
+
+
+def sql_literal(value: str | date) -> str:
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    return "'" + value.replace("'", "''") + "'"
@@ -2,8 +2,10 @@ import logging
 
 import dask
 import dask.dataframe as dd
+import pandas as pd
 
-from .common import Processor, main
+from .common import Processor, log_results, main
+from .query import report_frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("DaskProcessor")
@@ -12,22 +14,36 @@ logger = logging.getLogger("DaskProcessor")
 class DaskProcessor(Processor):
     def read(self) -> dd.DataFrame:
         logger.info("Reading files...")
-        df: dd.DataFrame = dd.read_parquet(self.path, filesystem="arrow")
+        filesystem, path = self.filesystem()
+        # Dask doesn't skip the hidden files of a dataset directory, such as the catalog and the manifests. Lists of
+        # files are read with fsspec, as the arrow filesystem only reads directories and single files
+        df: dd.DataFrame = dd.read_parquet(
+            self.file_paths(path),
+            columns=self.query.columns,
+            filters=self.query.filters.to_dnf(),
+            filesystem=filesystem or "fsspec",
+        )
         logger.info("Reading completed")
         # persist data in memory for reuse
         persisted_df: dd.DataFrame = df.persist()  # type: ignore
         return persisted_df
 
-    def process(self, data: dd.DataFrame) -> None:
+    def process(self, data: dd.DataFrame) -> dict[str, pd.DataFrame]:
         logger.info("Processing information...")
-        grouped_by_category = data.groupby("categoria_de_producto", observed=True)
-        total_sales_by_category = grouped_by_category["cantidad_de_venta"].sum()
-        grouped_by_region = data.groupby("region_de_venta", observed=True)
-        average_sales_by_region = grouped_by_region["cantidad_de_venta"].mean()
-        total_sales_result, average_sales_result = dask.compute(total_sales_by_category, average_sales_by_region)  # type: ignore
-        logger.info("Information processed")
-        logger.info(f"Total sales by product category:\n{total_sales_result}")
-        logger.info(f"Average sales by region:\n{average_sales_result}")
+        aggregated = [
+            data.groupby(report.group_by, observed=True).agg(
+                **{
+                    aggregation.alias: (aggregation.column, aggregation.function)
+                    for aggregation in report.aggregations
+                }
+            )
+            for report in self.query.reports
+        ]
+        # A single compute shares the partitions between all the reports
+        frames = dask.compute(*aggregated)  # type: ignore
+        results = {report.name: report_frame(frame, report) for report, frame in zip(self.query.reports, frames)}
+        log_results(logger, results)
+        return results
 
     def cleanup(self) -> None:
         pass
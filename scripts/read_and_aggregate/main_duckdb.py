@@ -0,0 +1,65 @@
+import logging
+
+import duckdb
+import pandas as pd
+
+from .block_cache import BlockCache
+from .cache import ResultCache
+from .common import Processor, log_results, main
+from .query import Query
+from .sql import VIEW_NAME, grouping_sets_sql, split_grouping_sets
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("DuckDBProcessor")
+
+INTEGER_TYPES = ("tinyint", "smallint", "integer", "bigint", "utinyint", "usmallint", "uinteger", "ubigint")
+
+
+class DuckDBProcessor(Processor):
+    def __init__(
+        self,
+        path: str,
+        query: Query | None = None,
+        cache: ResultCache | None = None,
+        block_cache: BlockCache | None = None,
+        rollups: bool = False,
+        catalog: bool = False,
+        workers: int = 1,
+    ) -> None:
+        super().__init__(path, query, cache, block_cache, rollups, catalog, workers)
+        self.connection = duckdb.connect()
+
+    def read(self) -> duckdb.DuckDBPyRelation:
+        logger.info("Reading files...")
+        filesystem, path = self.filesystem()
+        if filesystem is not None:
+            # DuckDB reads the paths of the fsspec filesystems registered under their protocol
+            self.connection.register_filesystem(filesystem)
+            path = f"{filesystem.protocol}://{path}"
+        # DuckDB doesn't skip the hidden files of a dataset directory, so it is given the files to read. Lists of files
+        # are accepted, although the stubs only declare a path
+        relation = self.connection.read_parquet(self.file_paths(path), hive_partitioning=True)  # type: ignore[arg-type]
+        condition = self.query.filters.to_sql()
+        if condition is not None:
+            # DuckDB pushes the condition down to the Parquet scan, skipping row groups and partitions
+            relation = relation.filter(condition)
+        # Materialized, as the other engines hold the data in memory between reading and processing
+        relation.project(", ".join(self.query.columns)).create(VIEW_NAME)
+        logger.info("Reading completed")
+        return self.connection.table(VIEW_NAME)
+
+    def process(self, data: duckdb.DuckDBPyRelation) -> dict[str, pd.DataFrame]:
+        logger.info("Processing information...")
+        # DuckDB sums integers into HUGEINT, which would come back as floats
+        integer_columns = [column for column, type in zip(data.columns, data.types) if type.id in INTEGER_TYPES]
+        rows = self.connection.sql(grouping_sets_sql(self.query, integer_columns)).df()
+        results = split_grouping_sets(rows, self.query)
+        log_results(logger, results)
+        return results
+
+    def cleanup(self) -> None:
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    main(DuckDBProcessor)
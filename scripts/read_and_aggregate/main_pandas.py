@@ -1,30 +1,166 @@
 import logging
+import math
+import multiprocessing
+from concurrent import futures
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from fsspec import AbstractFileSystem
+from pydantic import BaseModel, ConfigDict
 
-from .common import Processor, main
+from ..transform_load_to_parquet.rollups import PARTIALS
+from .common import Processor, log_results, main
+from .query import PARTIAL_AGGREGATES, Query, Report, report_frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PandasProcessor")
 
+# Slices per worker, so that a slow slice doesn't leave the other workers idle
+SLICES_PER_WORKER = 4
+
+Partials = list[pd.DataFrame]
+
+
+class SliceTask(BaseModel):
+    """
+    Row groups of a file read and aggregated by a worker.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    fragment: ds.ParquetFileFragment
+    dataset_schema: pa.Schema
+    query: Query
+
 
 class PandasProcessor(Processor):
-    def read(self) -> pd.DataFrame:
+    """
+    Reads the dataset in a single call and groups it in memory. With several workers, every worker reads only its
+    share of the row groups and returns the partial aggregates of its rows, which are then merged.
+    """
+
+    def read(self) -> pd.DataFrame | list[Partials]:
         logger.info("Reading files...")
-        df = pd.read_parquet(self.path)
+        filesystem, path = self.filesystem()
+        if self.workers > 1:
+            partials = self.read_partials(filesystem, path)
+            logger.info("Reading completed")
+            return partials
+        df = pd.read_parquet(
+            self.paths(path), columns=self.query.columns, filters=self.query.filters.to_dnf(), filesystem=filesystem
+        )
         logger.info("Reading completed")
         return df
 
-    def process(self, data: pd.DataFrame) -> None:
-        total_sales_by_category = data.groupby("categoria_de_producto", observed=True)["cantidad_de_venta"].sum()
-        average_sales_by_region = data.groupby("region_de_venta", observed=True)["cantidad_de_venta"].mean()
-        logger.info("Information processed")
-        logger.info(f"Total sales by product category:\n{total_sales_by_category}")
-        logger.info(f"Average sales by region:\n{average_sales_by_region}")
+    def read_partials(self, filesystem: AbstractFileSystem | None, path: str) -> list[Partials]:
+        """
+        Splits the row groups that can match the filters into slices, and aggregates them in a pool of processes.
+        Block cache metrics of the workers aren't reported.
+        """
+        dataset = ds.dataset(self.paths(path), filesystem=filesystem, format="parquet", partitioning="hive")
+        tasks = slice_tasks(dataset, self.query, self.workers * SLICES_PER_WORKER)
+        if not tasks:
+            return [partial_aggregates(dataset.schema.empty_table().to_pandas(), self.query)]
+        # Workers are spawned, as the event loop of gcsfs isn't fork-safe
+        context = multiprocessing.get_context("spawn")
+        with futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            return list(executor.map(aggregate_slice, tasks))
+
+    def process(self, data: pd.DataFrame | list[Partials]) -> dict[str, pd.DataFrame]:
+        logger.info("Processing information...")
+        if isinstance(data, list):
+            results = {
+                report.name: merge_partials([partials[index] for partials in data], report)
+                for index, report in enumerate(self.query.reports)
+            }
+            log_results(logger, results)
+            return results
+        # Reports with the same keys share the grouping, and all the aggregations of a report run in one pass
+        groupings: dict[tuple[str, ...], pd.core.groupby.DataFrameGroupBy] = {}
+        results = {}
+        for report in self.query.reports:
+            keys = tuple(report.group_by)
+            if keys not in groupings:
+                groupings[keys] = data.groupby(list(keys), observed=True)
+            aggregations = {
+                aggregation.alias: (aggregation.column, aggregation.function) for aggregation in report.aggregations
+            }
+            results[report.name] = report_frame(groupings[keys].agg(**aggregations), report)
+        log_results(logger, results)
+        return results
 
     def cleanup(self) -> None:
         pass
 
 
+def slice_tasks(dataset: ds.FileSystemDataset, query: Query, slices: int) -> list[SliceTask]:
+    """
+    Tasks over the row groups whose statistics can match the filters, in about the given number of slices. A slice
+    never spans files, so that workers read only the footer and the row groups of their file.
+    """
+    expression = query.filters.to_arrow()
+    row_groups = {}
+    for fragment in dataset.get_fragments(filter=expression):
+        # The schema of the dataset is needed to filter on the partition keys
+        ids = [part.row_groups[0].id for part in fragment.split_by_row_group(expression, schema=dataset.schema)]
+        if ids:
+            row_groups[fragment] = ids
+    size = math.ceil(sum(len(ids) for ids in row_groups.values()) / slices)
+    return [
+        SliceTask(
+            fragment=fragment.format.make_fragment(
+                fragment.path, fragment.filesystem, fragment.partition_expression, row_groups=ids[start : start + size]
+            ),
+            dataset_schema=dataset.schema,
+            query=query,
+        )
+        for fragment, ids in row_groups.items()
+        for start in range(0, len(ids), size)
+    ]
+
+
+def aggregate_slice(task: SliceTask) -> Partials:
+    query = task.query
+    # The schema of the dataset fills in the partition keys of the file
+    table = task.fragment.to_table(schema=task.dataset_schema, columns=query.columns, filter=query.filters.to_arrow())
+    return partial_aggregates(table.to_pandas(), query)
+
+
+def partial_aggregates(df: pd.DataFrame, query: Query) -> Partials:
+    """
+    Partials of the aggregations of every report, named after the column and the partial.
+    """
+    partials = []
+    for report in query.reports:
+        aggregations = {
+            f"{aggregation.column}_{partial}": (aggregation.column, partial)
+            for aggregation in report.aggregations
+            for partial in PARTIAL_AGGREGATES[aggregation.function]
+        }
+        partials.append(df.groupby(report.group_by, observed=True).agg(**aggregations).reset_index())
+    return partials
+
+
+def merge_partials(partials: Partials, report: Report) -> pd.DataFrame:
+    """
+    Merges the partials of the slices of a report: sums of sums and counts, minimums of minimums and maximums of
+    maximums. Means are the merged sums over the merged counts.
+    """
+    df = pd.concat(partials, ignore_index=True)
+    merges = {
+        f"{aggregation.column}_{partial}": PARTIALS[partial]
+        for aggregation in report.aggregations
+        for partial in PARTIAL_AGGREGATES[aggregation.function]
+    }
+    merged = df.groupby(report.group_by, observed=True).agg(merges)
+    for aggregation in report.aggregations:
+        if aggregation.function == "mean":
+            merged[aggregation.alias] = merged[f"{aggregation.column}_sum"] / merged[f"{aggregation.column}_count"]
+        else:
+            merged[aggregation.alias] = merged[f"{aggregation.column}_{aggregation.function}"]
+    return report_frame(merged, report)
+
+
 if __name__ == "__main__":
     main(PandasProcessor)
@@ -1,8 +1,11 @@
 import logging
 
+import pandas as pd
 import polars as pl
+import pyarrow.dataset as ds
 
-from .common import Processor, main
+from .common import Processor, log_results, main
+from .query import report_frame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PolarsProcessor")
@@ -11,25 +14,44 @@ logger = logging.getLogger("PolarsProcessor")
 class PolarsProcessor(Processor):
     def read(self) -> pl.DataFrame:
         logger.info("Reading files...")
-        df = pl.read_parquet(self.path)
+        # Only the needed columns, and the row groups and partitions that can match the filters, are read
+        filesystem, path = self.filesystem()
+        # Polars doesn't skip the hidden files of a dataset directory, such as the rollups and the catalog
+        paths = self.file_paths(path)
+        if filesystem is None:
+            lazy_df = pl.scan_parquet(paths, hive_partitioning=True)
+        else:
+            # Polars reads cloud paths with its own client, so cached reads go through a PyArrow dataset
+            dataset = ds.dataset(
+                paths, filesystem=filesystem, format="parquet", partitioning="hive", partition_base_dir=path
+            )
+            lazy_df = pl.scan_pyarrow_dataset(dataset)
+        predicates = self.query.filters.to_polars()
+        if predicates:
+            lazy_df = lazy_df.filter(*predicates)
+        # Row groups of different files have their own dictionaries, merged into categoricals of a global cache
+        with pl.StringCache():
+            df = lazy_df.select(self.query.columns).collect()
         logger.info("Reading completed")
         return df
 
-    def process(self, data: pl.DataFrame) -> None:
+    def process(self, data: pl.DataFrame) -> dict[str, pd.DataFrame]:
+        logger.info("Processing information...")
         lazy_df = data.lazy()
-        total_sales_by_category = (
-            lazy_df.group_by("categoria_de_producto")
-            .agg(pl.col("cantidad_de_venta").sum().alias("total_sales"))
-            .collect()
-        )
-        average_sales_by_region = (
-            lazy_df.group_by("region_de_venta")
-            .agg(pl.col("cantidad_de_venta").mean().alias("average_sales"))
-            .collect()
-        )
-        logger.info("Information processed")
-        logger.info(f"Total sales by product category:\n{total_sales_by_category}")
-        logger.info(f"Average sales by region:\n{average_sales_by_region}")
+        queries = [
+            lazy_df.group_by(report.group_by).agg(
+                getattr(pl.col(aggregation.column), aggregation.function)().alias(aggregation.alias)
+                for aggregation in report.aggregations
+            )
+            for report in self.query.reports
+        ]
+        # All the reports are computed together, in parallel
+        frames = pl.collect_all(queries)
+        results = {
+            report.name: report_frame(frame.to_pandas(), report) for report, frame in zip(self.query.reports, frames)
+        }
+        log_results(logger, results)
+        return results
 
     def cleanup(self) -> None:
         pass
@@ -0,0 +1,46 @@
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .common import Processor, log_results, main
+from .query import report_frame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("PyArrowProcessor")
+
+
+class PyArrowProcessor(Processor):
+    def read(self) -> pa.Table:
+        logger.info("Reading files...")
+        filesystem, path = self.filesystem()
+        dataset = ds.dataset(self.paths(path), filesystem=filesystem, format="parquet", partitioning="hive")
+        # The scanner reads only the needed columns, and skips the partitions and row groups that can't match
+        table = dataset.to_table(columns=self.query.columns, filter=self.query.filters.to_arrow())
+        logger.info("Reading completed")
+        # Files have their own dictionaries, which the group by can't combine
+        return table.unify_dictionaries()
+
+    def process(self, data: pa.Table) -> dict[str, pd.DataFrame]:
+        logger.info("Processing information...")
+        results = {}
+        for report in self.query.reports:
+            # Acero names the aggregations after the column and the function, computed once even if repeated
+            functions = list(
+                dict.fromkeys((aggregation.column, aggregation.function) for aggregation in report.aggregations)
+            )
+            aggregated = data.group_by(report.group_by).aggregate(functions)
+            df = aggregated.to_pandas()
+            for aggregation in report.aggregations:
+                df[aggregation.alias] = df[f"{aggregation.column}_{aggregation.function}"]
+            results[report.name] = report_frame(df, report)
+        log_results(logger, results)
+        return results
+
+    def cleanup(self) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    main(PyArrowProcessor)
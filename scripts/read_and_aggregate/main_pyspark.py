@@ -1,16 +1,31 @@
 import logging
 
-from pyspark.sql import DataFrame, SparkSession, functions
+import pandas as pd
+from pyspark.sql import DataFrame, SparkSession
 
-from .common import Processor, main
+from .block_cache import BlockCache
+from .cache import ResultCache
+from .common import Processor, log_results, main
+from .query import Query
+from .sql import VIEW_NAME, grouping_sets_sql, split_grouping_sets
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SparkProcessor")
 
 
 class SparkProcessor(Processor):
-    def __init__(self, path: str) -> None:
-        super().__init__(path)
+    def __init__(
+        self,
+        path: str,
+        query: Query | None = None,
+        cache: ResultCache | None = None,
+        block_cache: BlockCache | None = None,
+        rollups: bool = False,
+        catalog: bool = False,
+        workers: int = 1,
+    ) -> None:
+        # Spark reads through the Hadoop GCS connector of the JVM, the block cache isn't used
+        super().__init__(path, query, cache, block_cache, rollups, catalog, workers)
         self.spark: SparkSession = (
             SparkSession.builder.appName("SparkProcessor")
             .config("spark.jars", "https://storage.googleapis.com/hadoop-lib/gcs/gcs-connector-hadoop3-latest.jar")
@@ -21,22 +36,29 @@ class SparkProcessor(Processor):
 
     def read(self) -> DataFrame:
         logger.info("Reading files...")
-        required_cols = ["categoria_de_producto", "cantidad_de_venta", "region_de_venta"]
-        df = self.spark.read.parquet(self.path).select(required_cols)
+        paths = self.paths(self.path)
+        if isinstance(paths, str):
+            df = self.spark.read.parquet(paths)
+        else:
+            # The partition columns of the files are discovered relative to the dataset
+            df = self.spark.read.option("basePath", self.path).parquet(*paths)
+        condition = self.query.filters.to_sql()
+        if condition is not None:
+            # Spark pushes the condition down to the Parquet scan and prunes the partitions
+            df = df.where(condition)
+        df = df.select(self.query.columns)
         logger.info("Reading completed")
         self.data = df
         df.cache()
         return df
 
-    def process(self, data: DataFrame) -> None:
+    def process(self, data: DataFrame) -> dict[str, pd.DataFrame]:
         logger.info("Processing information...")
-        df_grouped_by_category = data.groupBy("categoria_de_producto")
-        total_sales_by_category = df_grouped_by_category.agg(functions.sum("cantidad_de_venta").alias("venta_total"))
-        df_grouped_by_region = data.groupBy("region_de_venta")
-        average_sales_by_region = df_grouped_by_region.agg(functions.mean("cantidad_de_venta").alias("venta_promedio"))
-        logger.info("Information processed")
-        logger.info(f"Total sales by product category:\n{total_sales_by_category}")
-        logger.info(f"Average sales by region:\n{average_sales_by_region}")
+        data.createOrReplaceTempView(VIEW_NAME)
+        rows = self.spark.sql(grouping_sets_sql(self.query, quote="`")).toPandas()
+        results = split_grouping_sets(rows, self.query)
+        log_results(logger, results)
+        return results
 
     def cleanup(self) -> None:
         if self.data is not None:
@@ -0,0 +1,191 @@
+import logging
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from .common import Processor, log_results, main
+from .query import PARTIAL_AGGREGATES, Report, report_frame
+from .sql import grouping_keys
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("StreamingProcessor")
+
+IDENTITIES = {"sum": 0, "count": 0, "min": np.inf, "max": -np.inf}
+
+Codes = tuple[np.ndarray, np.ndarray]
+
+
+class KeyEncoder:
+    """
+    Dense codes of the values of a group key, shared by every batch. The dictionaries of the batches are small, so
+    only their values are looked up and the rows are coded with a vectorized take of their dictionary indices.
+    """
+
+    def __init__(self) -> None:
+        self.codes: dict[Any, int] = {}
+        self.values: list[Any] = []
+
+    def code(self, value: Any) -> int:
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+    def encode(self, array: pa.Array) -> Codes:
+        """
+        Codes of the rows of the array, and whether each row has a key. Rows with null keys are left out, as the
+        other engines do.
+        """
+        if not pa.types.is_dictionary(array.type):
+            array = pc.dictionary_encode(array)
+        dictionary_codes = np.array([self.code(value) for value in array.dictionary.to_pylist()], dtype=np.int64)
+        valid = array.indices.is_valid().to_numpy(zero_copy_only=False)
+        indices = pc.fill_null(array.indices, 0).to_numpy()
+        codes = dictionary_codes[indices] if len(dictionary_codes) else np.zeros(len(array), np.int64)
+        return codes, valid
+
+
+class ReportAccumulator:
+    """
+    Partial aggregates of a report in flat arrays indexed by group ids. The key codes of the rows of a batch are
+    reduced to their distinct combinations with `np.unique`, and each combination gets an id the first time it is
+    seen, so the arrays only grow with the number of groups that occur. Every batch is aggregated per combination
+    with `np.bincount` (or `np.minimum.at` and `np.maximum.at`) and then merged into the arrays.
+    """
+
+    def __init__(self, report: Report, encoders: dict[str, KeyEncoder]) -> None:
+        self.report = report
+        self.encoders = [encoders[key] for key in report.group_by]
+        self.groups: dict[tuple[int, ...], int] = {}
+        self.rows = np.zeros(0, np.int64)
+        self.partials: dict[str, dict[str, np.ndarray]] = {}
+        self.integer_columns: set[str] = set()
+        for aggregation in report.aggregations:
+            for partial in PARTIAL_AGGREGATES[aggregation.function]:
+                self.partials.setdefault(aggregation.column, {})[partial] = np.zeros(0, np.float64)
+
+    def group_ids(self, key_codes: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ids of the distinct key combinations of a batch, and the index of the combination of every row.
+        """
+        combinations, inverse = np.unique(np.column_stack(key_codes), axis=0, return_inverse=True)
+        ids = [self.groups.setdefault(group, len(self.groups)) for group in map(tuple, combinations.tolist())]
+        return np.array(ids, np.int64), inverse.reshape(-1)
+
+    def reserve(self) -> None:
+        """
+        Grows the arrays, doubling their size when more groups than fit have been seen.
+        """
+        if len(self.groups) <= len(self.rows):
+            return
+        size = max(len(self.groups), 2 * len(self.rows))
+        self.rows = grow(self.rows, size, 0)
+        for column_partials in self.partials.values():
+            for partial, array in column_partials.items():
+                column_partials[partial] = grow(array, size, IDENTITIES[partial])
+
+    def add(self, batch: pa.RecordBatch, codes: dict[str, Codes]) -> None:
+        valid = np.logical_and.reduce([codes[key][1] for key in self.report.group_by])
+        if not valid.any():
+            return
+        ids, index = self.group_ids([codes[key][0][valid] for key in self.report.group_by])
+        self.reserve()
+        size = len(ids)
+        self.rows[ids] += np.bincount(index, minlength=size)
+        for column, column_partials in self.partials.items():
+            array = batch.column(column).filter(pa.array(valid))
+            has_value = array.is_valid().to_numpy(zero_copy_only=False)
+            value_index = index[has_value]
+            if column_partials.keys() == {"count"}:
+                # Counting needs no values, the column may have any type
+                column_partials["count"][ids] += np.bincount(value_index, minlength=size)
+                continue
+            if pa.types.is_integer(array.type):
+                self.integer_columns.add(column)
+            # Sums are exact for integer totals up to 2**53
+            values = pc.fill_null(array, 0).to_numpy(zero_copy_only=False).astype(np.float64)[has_value]
+            for partial, partial_array in column_partials.items():
+                if partial == "sum":
+                    partial_array[ids] += np.bincount(value_index, weights=values, minlength=size)
+                elif partial == "count":
+                    partial_array[ids] += np.bincount(value_index, minlength=size)
+                elif partial == "min":
+                    batch_partial = np.full(size, np.inf)
+                    np.minimum.at(batch_partial, value_index, values)
+                    partial_array[ids] = np.minimum(partial_array[ids], batch_partial)
+                else:
+                    batch_partial = np.full(size, -np.inf)
+                    np.maximum.at(batch_partial, value_index, values)
+                    partial_array[ids] = np.maximum(partial_array[ids], batch_partial)
+
+    def frame(self) -> pd.DataFrame:
+        count = len(self.groups)
+        key_codes = np.array(list(self.groups), np.int64).reshape(count, len(self.encoders))
+        columns: dict[str, Any] = {
+            key: np.array(encoder.values, dtype=object)[key_codes[:, position]]
+            for position, (key, encoder) in enumerate(zip(self.report.group_by, self.encoders))
+        }
+        for aggregation in self.report.aggregations:
+            partials = {partial: array[:count] for partial, array in self.partials[aggregation.column].items()}
+            if aggregation.function == "mean":
+                with np.errstate(invalid="ignore"):
+                    columns[aggregation.alias] = partials["sum"] / partials["count"]
+            elif aggregation.function == "count":
+                columns[aggregation.alias] = partials["count"].astype(np.int64)
+            else:
+                values = partials[aggregation.function]
+                if aggregation.column in self.integer_columns and np.isfinite(values).all():
+                    columns[aggregation.alias] = values.astype(np.int64)
+                else:
+                    # Groups without values of the column have no minimum or maximum
+                    columns[aggregation.alias] = np.where(np.isinf(values), np.nan, values)
+        return pd.DataFrame(columns)
+
+
+def grow(array: np.ndarray, size: int, identity: float) -> np.ndarray:
+    grown = np.full(size, identity, array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class StreamingProcessor(Processor):
+    """
+    Aggregates the dataset batch by batch, holding only the partial aggregates of every group, so that datasets
+    larger than the memory can be processed. Reading happens while processing.
+    """
+
+    def read(self) -> ds.Scanner:
+        logger.info("Planning the scan...")
+        filesystem, path = self.filesystem()
+        dataset = ds.dataset(self.paths(path), filesystem=filesystem, format="parquet", partitioning="hive")
+        # The scanner reads a bounded number of batches ahead, whatever the size of the dataset
+        return dataset.scanner(columns=self.query.columns, filter=self.query.filters.to_arrow())
+
+    def process(self, data: ds.Scanner) -> dict[str, pd.DataFrame]:
+        logger.info("Processing information...")
+        encoders = {key: KeyEncoder() for key in grouping_keys(self.query)}
+        accumulators = [ReportAccumulator(report, encoders) for report in self.query.reports]
+        for batch in data.to_batches():
+            if not batch.num_rows:
+                continue
+            # Keys are coded once per batch for all the reports
+            codes = {key: encoder.encode(batch.column(key)) for key, encoder in encoders.items()}
+            for accumulator in accumulators:
+                accumulator.add(batch, codes)
+        results = {
+            accumulator.report.name: report_frame(accumulator.frame(), accumulator.report)
+            for accumulator in accumulators
+        }
+        log_results(logger, results)
+        return results
+
+    def cleanup(self) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    main(StreamingProcessor)
@@ -1,20 +1,109 @@
 import argparse
+from datetime import date
+from pathlib import Path
 
 from pydantic import BaseModel
 
+from .filters import Filters
+
+CACHE_DIR = Path.home() / ".cache" / "read_and_aggregate"
+BLOCK_CACHE_DIR = Path.home() / ".cache" / "read_and_aggregate_blocks"
+
 
 class Config(BaseModel):
     path: str
+    query: Path | None = None
+    filters: Filters = Filters()
+    cache: bool = True
+    cache_dir: Path = CACHE_DIR
+    cache_size: int = 256 * 1024**2
+    cache_ttl: float = 24 * 3600
+    block_cache: bool = True
+    block_cache_dir: Path = BLOCK_CACHE_DIR
+    block_cache_size: int = 2 * 1024**3
+    block_size: int = 4 * 1024**2
+    rollups: bool = True
+    catalog: bool = True
+    workers: int = 1
 
 
 def get_parser() -> argparse.ArgumentParser:
     description = "Script to read and query files in Google Cloud Storage"
+    query_help = (
+        "JSON file with the reports to compute, each with its group keys and aggregations, and optionally the filters. "
+        "The filters given in the command line replace the ones of the file. Default is the total sales by product "
+        "category and the average sales by region."
+    )
+    start_date_help = "Only read the transactions made on or after this date (YYYY-MM-DD)."
+    end_date_help = "Only read the transactions made on or before this date (YYYY-MM-DD)."
+    regions_help = (
+        "Only read the transactions of these sale regions. Any label is accepted, as the datasets generated with a "
+        "distribution profile have more regions than the default ones."
+    )
+    categories_help = "Only read the transactions of these product categories. Any label is accepted."
+    no_cache_help = "Compute the reports even if the results of the same query over the same data are cached."
+    cache_dir_help = "Directory of the result cache. Default is ~/.cache/read_and_aggregate."
+    cache_size_help = (
+        "Maximum size in MiB of the result cache, the least recently used results are evicted. Default is 256."
+    )
+    cache_ttl_help = "Hours after which cached results expire. Default is 24."
+    no_block_cache_help = "Read remote files directly instead of through the local block cache."
+    block_cache_dir_help = "Directory of the block cache. Default is ~/.cache/read_and_aggregate_blocks."
+    block_cache_size_help = (
+        "Maximum size in MiB of the block cache, the least recently used blocks are evicted. Default is 2048."
+    )
+    block_size_help = "Size in KiB of the blocks of remote files stored in the block cache. Default is 4096."
+    no_rollups_help = "Always scan the dataset, even if the query can be answered from the rollups of the dataset."
+    no_catalog_help = (
+        "List the dataset and read the footers of its files even if it has a catalog, instead of reading only the "
+        "files that the catalog says can match the filters."
+    )
+
+    workers_help = (
+        "Number of processes of the Pandas processor, each reading only its share of the row groups and returning "
+        "partial aggregates that are then combined. Other engines parallelize on their own. Default is 1."
+    )
+
     parser = argparse.ArgumentParser(prog="File Reader and Query Tool", description=description)
     parser.add_argument("path", type=str, help="Path to the files in Google Cloud Storage")
+    parser.add_argument("-q", "--query", type=Path, help=query_help)
+    parser.add_argument("--start-date", type=date.fromisoformat, help=start_date_help)
+    parser.add_argument("--end-date", type=date.fromisoformat, help=end_date_help)
+    parser.add_argument("--regions", help=regions_help, nargs="+")
+    parser.add_argument("--categories", help=categories_help, nargs="+")
+    parser.add_argument("--no-cache", help=no_cache_help, action="store_true")
+    parser.add_argument("--cache-dir", type=Path, help=cache_dir_help, default=CACHE_DIR)
+    parser.add_argument("--cache-size", type=int, help=cache_size_help, default=256)
+    parser.add_argument("--cache-ttl", type=float, help=cache_ttl_help, default=24)
+    parser.add_argument("--no-block-cache", help=no_block_cache_help, action="store_true")
+    parser.add_argument("--block-cache-dir", type=Path, help=block_cache_dir_help, default=BLOCK_CACHE_DIR)
+    parser.add_argument("--block-cache-size", type=int, help=block_cache_size_help, default=2048)
+    parser.add_argument("--block-size", type=int, help=block_size_help, default=4096)
+    parser.add_argument("--no-rollups", help=no_rollups_help, action="store_true")
+    parser.add_argument("--no-catalog", help=no_catalog_help, action="store_true")
+    parser.add_argument("-w", "--workers", type=int, help=workers_help, default=1)
     return parser
 
 
 def get_config(argv: list[str] | None = None) -> Config:
     parser = get_parser()
     args = parser.parse_args(argv)
-    return Config(path=args.path)
+    filters = Filters(
+        start_date=args.start_date, end_date=args.end_date, regions=args.regions, categories=args.categories
+    )
+    return Config(
+        path=args.path,
+        query=args.query,
+        filters=filters,
+        cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024**2,
+        cache_ttl=args.cache_ttl * 3600,
+        block_cache=not args.no_block_cache,
+        block_cache_dir=args.block_cache_dir,
+        block_cache_size=args.block_cache_size * 1024**2,
+        block_size=args.block_size * 1024,
+        rollups=not args.no_rollups,
+        catalog=not args.no_catalog,
+        workers=args.workers,
+    )
@@ -0,0 +1,80 @@
+from typing import Literal
+
+import pandas as pd
+from pydantic import BaseModel
+
+from .filters import Filters
+
+Function = Literal["sum", "mean", "count", "min", "max"]
+# Partial aggregates of a column each aggregation is computed from, for the engines that merge partials
+PARTIAL_AGGREGATES: dict[str, tuple[str, ...]] = {
+    "sum": ("sum",),
+    "mean": ("sum", "count"),
+    "count": ("count",),
+    "min": ("min",),
+    "max": ("max",),
+}
+
+
+class Aggregation(BaseModel):
+    column: str
+    function: Function
+    alias: str
+
+
+class Report(BaseModel):
+    """
+    Aggregations of the rows grouped by the same keys, e.g. the total and the average sales by region.
+    """
+
+    name: str
+    group_by: list[str]
+    aggregations: list[Aggregation]
+
+    @property
+    def columns(self) -> list[str]:
+        return self.group_by + [aggregation.alias for aggregation in self.aggregations]
+
+
+class Query(BaseModel):
+    """
+    Declarative description of the reports computed over the dataset. Every engine compiles it to its own API, reads
+    only the columns it needs with the filters pushed down, and computes all the reports in a single pass.
+    """
+
+    reports: list[Report]
+    filters: Filters = Filters()
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        Columns read from the dataset, in order of appearance.
+        """
+        columns = [column for report in self.reports for column in report.group_by]
+        columns += [aggregation.column for report in self.reports for aggregation in report.aggregations]
+        return list(dict.fromkeys(columns))
+
+
+DEFAULT_QUERY = Query(
+    reports=[
+        Report(
+            name="Total sales by product category",
+            group_by=["categoria_de_producto"],
+            aggregations=[Aggregation(column="cantidad_de_venta", function="sum", alias="total_sales")],
+        ),
+        Report(
+            name="Average sales by region",
+            group_by=["region_de_venta"],
+            aggregations=[Aggregation(column="cantidad_de_venta", function="mean", alias="average_sales")],
+        ),
+    ]
+)
+
+
+def report_frame(df: pd.DataFrame, report: Report) -> pd.DataFrame:
+    """
+    Result of a report in the form shared by every engine: group keys as plain columns, sorted by them.
+    """
+    df = df.reset_index() if report.group_by[0] not in df.columns else df
+    df = df.astype({key: str for key in report.group_by if isinstance(df[key].dtype, pd.CategoricalDtype)})
+    return df[report.columns].sort_values(report.group_by, ignore_index=True)
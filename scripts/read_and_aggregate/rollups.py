@@ -0,0 +1,97 @@
+import fnmatch
+import json
+import logging
+import posixpath
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from fsspec.core import url_to_fs
+
+from ..transform_load_to_parquet.rollups import (
+    DATE_KEY,
+    FILES_METADATA_KEY,
+    GROUP_KEYS,
+    MEASURE,
+    PARTIALS,
+    ROLLUP_TEMPLATE,
+    merge_partials,
+    partial_column,
+)
+from .cache import Files, list_dataset, visible_files
+from .query import Query, report_frame
+
+logger = logging.getLogger("Rollups")
+
+
+def load_rollup(path: str, listing: Files | None = None) -> pa.Table | None:
+    """
+    Merges the rollups written next to the files of the dataset. Returns None unless the files they cover are
+    exactly the files of the dataset, with the same sizes, e.g. when some parts were written without rollups or
+    were rewritten since. The dataset is listed unless its listing is given.
+    """
+    fs, root = url_to_fs(path)
+    if listing is None:
+        listing = list_dataset(fs, root)
+    files = visible_files(listing)
+    if list(files) == [""]:
+        # A single file, its rollup is next to it
+        directory, name = posixpath.split(root)
+        sizes = {name: files[""]["size"]}
+        rollup_paths = fs.glob(posixpath.join(directory, ROLLUP_TEMPLATE.format(name=posixpath.splitext(name)[0])))
+    else:
+        sizes = {name: info["size"] for name, info in files.items()}
+        pattern = ROLLUP_TEMPLATE.format(name="*")
+        rollup_paths = [posixpath.join(root, name) for name in listing if fnmatch.fnmatchcase(name, pattern)]
+    if not rollup_paths:
+        return None
+
+    tables = [pq.read_table(rollup_path, filesystem=fs) for rollup_path in sorted(rollup_paths)]
+    covered = {
+        file["path"]: file["size"]
+        for table in tables
+        for file in json.loads(table.schema.metadata[FILES_METADATA_KEY])
+    }
+    if covered != sizes:
+        logger.info("The rollups don't cover the files of the dataset")
+        return None
+    # Rollups written with and without dates are merged by the keys they share
+    keys = [key for key in GROUP_KEYS + [DATE_KEY] if all(key in table.column_names for table in tables)]
+    columns = keys + [partial_column(function) for function in PARTIALS]
+    return merge_partials(pa.concat_tables([table.select(columns) for table in tables]), keys)
+
+
+def answer_from_rollups(path: str, query: Query, listing: Files | None = None) -> dict[str, pd.DataFrame] | None:
+    """
+    Computes the reports from the rollups of the dataset when they can answer the query: reports grouped by rollup
+    keys, aggregating the sales, and filters on rollup keys only. Returns None otherwise, and the dataset is scanned.
+    """
+    aggregations = [aggregation for report in query.reports for aggregation in report.aggregations]
+    if any(aggregation.column != MEASURE for aggregation in aggregations):
+        return None
+    rollup = load_rollup(path, listing)
+    if rollup is None:
+        return None
+    keys = set(rollup.column_names) - {partial_column(function) for function in PARTIALS}
+    filter_columns = {column for column, _, _ in query.filters.conditions()}
+    if not all(set(report.group_by) <= keys for report in query.reports) or not filter_columns <= keys:
+        logger.info("The query can't be answered from the rollups")
+        return None
+
+    expression = query.filters.to_arrow()
+    if expression is not None:
+        rollup = rollup.filter(expression)
+    results = {}
+    for report in query.reports:
+        merged = merge_partials(rollup, report.group_by)
+        columns = {key: merged.column(key) for key in report.group_by}
+        for aggregation in report.aggregations:
+            if aggregation.function == "mean":
+                total = pc.cast(merged.column(partial_column("sum")), pa.float64())
+                columns[aggregation.alias] = pc.divide(total, merged.column(partial_column("count")))
+            else:
+                columns[aggregation.alias] = merged.column(partial_column(aggregation.function))
+        results[report.name] = report_frame(pa.table(columns).to_pandas(), report)
+    logger.info(f"{len(results)} reports answered from the rollups")
+    return results
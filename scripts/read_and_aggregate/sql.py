@@ -0,0 +1,62 @@
+from collections.abc import Collection
+
+import pandas as pd
+
+from .query import Query, report_frame
+
+SQL_FUNCTIONS = {"sum": "SUM", "mean": "AVG", "count": "COUNT", "min": "MIN", "max": "MAX"}
+VIEW_NAME = "dataset"
+
+
+def grouping_keys(query: Query) -> list[str]:
+    return list(dict.fromkeys(key for report in query.reports for key in report.group_by))
+
+
+def quote_identifier(name: str, quote: str = '"') -> str:
+    # Column names and aliases come from the query file, so they may hold spaces, reserved words or quotes
+    return quote + name.replace(quote, quote * 2) + quote
+
+
+def grouping_sets_sql(query: Query, integer_columns: Collection[str] = (), quote: str = '"') -> str:
+    """
+    A single aggregation over the grouping sets of all the reports, so the dataset is scanned once. Aggregations
+    are prefixed with the index of their report and the grouping id tells which report a row belongs to. Sums of
+    the integer columns are cast to BIGINT, for engines whose integer sums are wider. Identifiers are quoted with
+    `quote`, which is a backtick for Spark SQL.
+    """
+    keys = [quote_identifier(key, quote) for key in grouping_keys(query)]
+    aggregations = []
+    for index, report in enumerate(query.reports):
+        for aggregation in report.aggregations:
+            expression = f"{SQL_FUNCTIONS[aggregation.function]}({quote_identifier(aggregation.column, quote)})"
+            if aggregation.function == "sum" and aggregation.column in integer_columns:
+                expression = f"CAST({expression} AS BIGINT)"
+            aggregations.append(f"{expression} AS {quote_identifier(f'r{index}_{aggregation.alias}', quote)}")
+    # Reports grouped by the same keys share their grouping set, which would otherwise return every group once per
+    # report. Both reports then read their rows by the same grouping id.
+    unique_sets = {frozenset(report.group_by): report.group_by for report in query.reports}
+    grouping_sets = ", ".join(
+        f"({', '.join(quote_identifier(key, quote) for key in group_by)})" for group_by in unique_sets.values()
+    )
+    return (
+        f"SELECT {', '.join(keys + aggregations)}, GROUPING_ID({', '.join(keys)}) AS grouping_id FROM {VIEW_NAME} "
+        f"GROUP BY GROUPING SETS ({grouping_sets})"
+    )
+
+
+def grouping_id(keys: list[str], group_by: list[str]) -> int:
+    # The bit of every key missing from the grouping set is set, the first key being the most significant bit
+    return sum(1 << (len(keys) - 1 - index) for index, key in enumerate(keys) if key not in group_by)
+
+
+def split_grouping_sets(rows: pd.DataFrame, query: Query) -> dict[str, pd.DataFrame]:
+    """
+    Splits the rows of the grouping sets aggregation into the reports of the query.
+    """
+    keys = grouping_keys(query)
+    results = {}
+    for index, report in enumerate(query.reports):
+        report_rows = rows[rows["grouping_id"] == grouping_id(keys, report.group_by)]
+        columns = {f"r{index}_{aggregation.alias}": aggregation.alias for aggregation in report.aggregations}
+        results[report.name] = report_frame(report_rows.rename(columns=columns), report)
+    return results
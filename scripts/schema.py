@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import polars as pl
+import pyarrow as pa
+
+FIELDS = ("id_cliente", "fecha_de_transaccion", "cantidad_de_venta", "categoria_de_producto", "region_de_venta")
+PRODUCT_CATEGORIES = ["Moda", "Tecnología", "Belleza", "Salud", "Juguetes"]
+SALE_REGIONS = ["Caribe", "Andina", "Pacífico", "Orinoquía", "Amazonía", "Insular"]
+# Files and directories of the dataset with these prefixes (catalogs, rollups, manifests) are ignored by Parquet
+# dataset readers
+HIDDEN_PREFIXES = ("_", ".")
+
+# Types of the dataset, shared by the generator and the Parquet conversion. Integer widths are the smallest that fit
+# the generated values, and the low-cardinality columns are dictionary-encoded (categorical in Polars). The conversion
+# only casts to them: CSV values are read as strings, and those that don't fit become null or are quarantined.
+ARROW_SCHEMA = pa.schema(
+    [
+        # Up to ~2.1 billion records
+        pa.field("id_cliente", pa.int32()),
+        pa.field("fecha_de_transaccion", pa.date32()),
+        # Uniform sales go up to 10000, the lognormal profile has a long tail beyond int16
+        pa.field("cantidad_de_venta", pa.int32()),
+        pa.field("categoria_de_producto", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("region_de_venta", pa.dictionary(pa.int32(), pa.string())),
+    ]
+)
+POLARS_SCHEMA = {
+    "id_cliente": pl.Int32,
+    "fecha_de_transaccion": pl.Date,
+    "cantidad_de_venta": pl.Int32,
+    "categoria_de_producto": pl.Categorical,
+    "region_de_venta": pl.Categorical,
+}
+
+
+def read_header(input: Path) -> tuple[str, ...]:
+    with open(input, encoding="utf-8") as file:
+        return tuple(file.readline().rstrip("\r\n").split(","))
+
+
+def declared_schema(input: Path) -> pa.Schema | None:
+    """
+    The dataset schema when the CSV file has the columns of the dataset, so that types don't need to be inferred.
+    It is the target of non-strict casts, never the type the values are parsed with.
+    """
+    return ARROW_SCHEMA if read_header(input) == FIELDS else None
@@ -0,0 +1,119 @@
+import logging
+import posixpath
+from datetime import date
+from typing import Any
+from urllib.parse import unquote
+
+import pyarrow.parquet as pq
+from fsspec import AbstractFileSystem
+from pydantic import BaseModel
+
+from ..read_and_aggregate.cache import object_version
+from ..schema import HIDDEN_PREFIXES
+
+logger = logging.getLogger("Catalog")
+
+CATALOG_NAME = "_catalog.json"
+
+
+class ColumnStatistics(BaseModel):
+    # Dates are stored in ISO format, so they compare as the dates they represent
+    min: Any = None
+    max: Any = None
+    null_count: int | None = None
+
+
+class RowGroupEntry(BaseModel):
+    rows: int
+    columns: dict[str, ColumnStatistics]
+
+
+class FileEntry(BaseModel):
+    path: str
+    size: int
+    version: str
+    rows: int
+    partition: dict[str, str] = {}
+    row_groups: list[RowGroupEntry]
+
+
+class Catalog(BaseModel):
+    """
+    Metadata of the Parquet files of a dataset, stored at its root: their paths relative to the root, sizes, row
+    counts, hive partition values and the statistics of every row group, as well as the column types of the files.
+    Readers plan their reads from it instead of listing the dataset and fetching the footer of every file.
+    """
+
+    columns: dict[str, str] = {}
+    files: list[FileEntry] = []
+
+    @classmethod
+    def load(cls, fs: AbstractFileSystem, root: str) -> "Catalog | None":
+        try:
+            return cls.model_validate_json(fs.cat_file(posixpath.join(root, CATALOG_NAME)))
+        except (FileNotFoundError, NotADirectoryError):
+            # No catalog, or the dataset is a single file
+            return None
+
+    def save(self, fs: AbstractFileSystem, root: str) -> None:
+        # Written in a hidden file and moved into place, so readers never see a partial catalog
+        temporary_path = posixpath.join(root, f".{CATALOG_NAME}.tmp")
+        fs.pipe_file(temporary_path, self.model_dump_json(indent=2).encode())
+        fs.mv(temporary_path, posixpath.join(root, CATALOG_NAME))
+
+
+def update_catalog(fs: AbstractFileSystem, root: str) -> Catalog:
+    """
+    Writes the catalog of the Parquet files under the root directory. The entries of the previous catalog are reused
+    for the files whose size and version didn't change, so only the footers of new or rewritten files are read.
+    """
+    previous = Catalog.load(fs, root) or Catalog()
+    entries = {entry.path: entry for entry in previous.files}
+    catalog = Catalog(columns=previous.columns)
+    read = 0
+    for name, info in sorted(fs.find(root, detail=True).items()):
+        relative_name = name[len(root) :].lstrip("/")
+        if not relative_name.endswith(".parquet") or any(
+            part.startswith(HIDDEN_PREFIXES) for part in relative_name.split("/")
+        ):
+            continue
+        entry = entries.get(relative_name)
+        version = object_version(info)
+        if entry is None or (entry.size, entry.version) != (info["size"], version):
+            with fs.open(name, "rb") as file:
+                metadata = pq.read_metadata(file)
+            entry = file_entry(relative_name, info["size"], version, metadata)
+            catalog.columns = {field.name: str(field.type) for field in metadata.schema.to_arrow_schema()}
+            read += 1
+        catalog.files.append(entry)
+    catalog.save(fs, root)
+    logger.info(f"Catalog of {len(catalog.files)} files updated, {read} footers read")
+    return catalog
+
+
+def file_entry(path: str, size: int, version: str, metadata: pq.FileMetaData) -> FileEntry:
+    # Hive directories are named after the URL-encoded values of the partition columns
+    directories = [part.split("=", 1) for part in posixpath.dirname(path).split("/") if "=" in part]
+    partition = {key: unquote(value) for key, value in directories}
+    row_groups = []
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        columns = {}
+        for column_index in range(row_group.num_columns):
+            column = row_group.column(column_index)
+            statistics = column.statistics
+            if statistics is None:
+                continue
+            columns[column.path_in_schema] = ColumnStatistics(
+                min=json_value(statistics.min) if statistics.has_min_max else None,
+                max=json_value(statistics.max) if statistics.has_min_max else None,
+                null_count=statistics.null_count if statistics.has_null_count else None,
+            )
+        row_groups.append(RowGroupEntry(rows=row_group.num_rows, columns=columns))
+    return FileEntry(
+        path=path, size=size, version=version, rows=metadata.num_rows, partition=partition, row_groups=row_groups
+    )
+
+
+def json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else value
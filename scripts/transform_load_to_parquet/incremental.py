@@ -0,0 +1,189 @@
+import logging
+import os
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .layout import Layout, log_layout
+from .parallel import ChunkTask, PartFile, convert_chunks, input_schema, merge_quarantines, split_byte_ranges
+from .rollups import Rollup
+
+logger = logging.getLogger("Transform and load to Parquet")
+
+STATE_NAME = "_ingested.json"
+FINGERPRINT_SIZE = 64 * 1024
+SEARCH_BLOCK_SIZE = 64 * 1024
+
+
+class IngestedRange(BaseModel):
+    start: int
+    end: int
+    lines: int
+    rows: int
+    rejected: int
+    checksum: str | None
+    parts: list[PartFile]
+    ingested_at: datetime
+
+
+class IngestedInput(BaseModel):
+    """
+    Progress of an input file. `offset` is the number of bytes already converted, always at the end of a line, and
+    `fingerprint` a checksum of the header and of the bytes just before the offset, used to detect rewritten files.
+    """
+
+    offset: int
+    lines: int
+    fingerprint: str
+    ranges: list[IngestedRange] = []
+
+
+class IngestState(BaseModel):
+    """
+    Manifest of the inputs converted into an output dataset, stored in the dataset directory.
+    """
+
+    next_part: int = 0
+    inputs: dict[str, IngestedInput] = {}
+
+    @classmethod
+    def load(cls, output: Path) -> "IngestState":
+        path = output / STATE_NAME
+        return cls.model_validate_json(path.read_text()) if path.exists() else cls()
+
+    def save(self, output: Path) -> None:
+        # Replacing the file is atomic, an interrupted run leaves the previous state
+        path = output / STATE_NAME
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text(self.model_dump_json(indent=2))
+        os.replace(temporary_path, path)
+
+
+def process_incremental(
+    input: Path,
+    output: Path,
+    partition_cols: list[str] | None,
+    error_handling: bool,
+    workers: int,
+    chunk_size: int,
+    layout: Layout,
+    rollup: Rollup | None = None,
+) -> None:
+    """
+    Converts only the data appended since the previous run, for a CSV file or for every CSV file of a directory.
+    New rows become new part files of the dataset in the output directory, and the converted byte ranges are
+    recorded in its manifest. Rejected rows are appended to a quarantine file per input. New parts get their own
+    rollups, if required, so the rollups of the dataset stay complete.
+    """
+    output.mkdir(parents=True, exist_ok=True)
+    state = IngestState.load(output)
+    inputs = sorted(input.glob("*.csv")) if input.is_dir() else [input]
+    for path in inputs:
+        parts = ingest_file(path, output, state, partition_cols, error_handling, workers, chunk_size, layout, rollup)
+        # Saved after every input, so the inputs already converted aren't converted again if a later one fails
+        state.save(output)
+        if parts:
+            log_layout([output / part.path for part in parts], layout.sort_by)
+
+
+def ingest_file(
+    input: Path,
+    output: Path,
+    state: IngestState,
+    partition_cols: list[str] | None,
+    error_handling: bool,
+    workers: int,
+    chunk_size: int,
+    layout: Layout,
+    rollup: Rollup | None = None,
+) -> list[PartFile]:
+    key = str(input.resolve())
+    ingested = state.inputs.get(key)
+    end = complete_size(input)
+    if ingested is not None and (end < ingested.offset or fingerprint(input, ingested.offset) != ingested.fingerprint):
+        raise ValueError(
+            f"'{input.name}' has changed before the data already converted. "
+            "Only appended data can be converted incrementally, convert the file again without '--incremental'."
+        )
+
+    start = ingested.offset if ingested is not None else None
+    header, ranges = split_byte_ranges(input, chunk_size, start, end)
+    if not ranges:
+        logger.info(f"No new data in '{input.name}'")
+        return []
+    logger.info(f"Converting {ranges[-1][1] - ranges[0][0]} new bytes of '{input.name}' in {len(ranges)} chunks")
+
+    schema = input_schema(input)
+    tasks = [
+        ChunkTask(
+            index=state.next_part + index,
+            input=input,
+            header=header,
+            start=range_start,
+            end=range_end,
+            output_dir=output,
+            arrow_schema=schema,
+            partition_cols=partition_cols,
+            error_handling=error_handling,
+            layout=layout,
+            checksum=True,
+            rollup=rollup,
+        )
+        for index, (range_start, range_end) in enumerate(ranges)
+    ]
+    results = convert_chunks(tasks, workers)
+    state.next_part += len(tasks)
+
+    lines_before = ingested.lines if ingested is not None else 0
+    if error_handling:
+        merge_quarantines(results, output.parent / f"quarantine-{input.stem}.csv", lines_before)
+
+    ingested_at = datetime.now(timezone.utc)
+    new_ranges = [
+        IngestedRange(
+            start=result.start,
+            end=result.end,
+            lines=result.lines,
+            rows=sum(part.rows for part in result.parts),
+            rejected=result.rejected,
+            checksum=result.checksum,
+            parts=result.parts,
+            ingested_at=ingested_at,
+        )
+        for result in sorted(results, key=lambda result: result.index)
+    ]
+    offset = new_ranges[-1].end
+    state.inputs[key] = IngestedInput(
+        offset=offset,
+        lines=lines_before + sum(result.lines for result in results),
+        fingerprint=fingerprint(input, offset),
+        ranges=(ingested.ranges if ingested is not None else []) + new_ranges,
+    )
+    return [part for result in results for part in result.parts]
+
+
+def complete_size(input: Path) -> int:
+    """
+    Size of the file up to its last newline. A last line without one may still be being written.
+    """
+    with open(input, "rb") as file:
+        end = os.fstat(file.fileno()).st_size
+        while end > 0:
+            start = max(0, end - SEARCH_BLOCK_SIZE)
+            file.seek(start)
+            position = file.read(end - start).rfind(b"\n")
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+def fingerprint(input: Path, offset: int) -> str:
+    with open(input, "rb") as file:
+        header = file.readline()
+        start = max(len(header), offset - FINGERPRINT_SIZE)
+        file.seek(start)
+        checksum = zlib.crc32(file.read(max(0, offset - start)), zlib.crc32(header))
+    return f"{checksum:08x}"
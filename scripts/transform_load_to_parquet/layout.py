@@ -0,0 +1,119 @@
+import logging
+from pathlib import Path
+from typing import Any, Literal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.fs
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+logger = logging.getLogger("Transform and load to Parquet")
+
+Compression = Literal["snappy", "zstd", "gzip", "brotli", "lz4", "none"]
+
+
+class Layout(BaseModel):
+    """
+    Physical layout of the written Parquet files. Sorting by the columns most often filtered on (e.g. region, then
+    date) keeps the min/max statistics of every row group narrow, so readers can skip the row groups and pages that
+    can't match a filter. The page index stores those statistics per page in the file footer.
+    """
+
+    sort_by: list[str] | None = None
+    row_group_size: int = 1_000_000
+    page_size: int = 1024**2
+    compression: Compression = "snappy"
+    compression_level: int | None = None
+    statistics: bool = True
+    page_index: bool = False
+
+    def write_options(self, schema: pa.Schema, partition_cols: list[str] | None = None) -> dict[str, Any]:
+        """
+        Keyword arguments for the PyArrow Parquet writers. Partition columns aren't stored in the files, so they
+        are left out of the schema the sorting columns refer to.
+        """
+        options: dict[str, Any] = {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "data_page_size": self.page_size,
+            "write_statistics": self.statistics,
+            "write_page_index": self.page_index,
+        }
+        sort_by = [name for name in self.sort_by or [] if name not in (partition_cols or [])]
+        if sort_by:
+            file_schema = pa.schema(field for field in schema if field.name not in (partition_cols or []))
+            ordering = [(name, "ascending") for name in sort_by]
+            options["sorting_columns"] = pq.SortingColumn.from_ordering(file_schema, ordering)
+        return options
+
+
+class RowGroupStats(BaseModel):
+    rows: int
+    size: int
+    ranges: dict[str, tuple[Any, Any]]
+
+
+class FileLayout(BaseModel):
+    path: Path
+    rows: int
+    size: int
+    compression: str
+    row_groups: list[RowGroupStats]
+
+
+def sort_table(table: pa.Table, sort_by: list[str] | None) -> pa.Table:
+    """
+    Sorts the table by the given columns. Dictionary-encoded columns are sorted by their values.
+    """
+    if not sort_by:
+        return table
+    # Arrow can't sort dictionary arrays, so the keys are decoded first
+    keys = pa.table({name: decode(table.column(name)) for name in sort_by})
+    indices = pc.sort_indices(keys, sort_keys=[(name, "ascending") for name in sort_by])
+    return table.take(indices)
+
+
+def decode(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    return column
+
+
+def describe_file(
+    path: Path, columns: list[str] | None = None, filesystem: pyarrow.fs.FileSystem | None = None
+) -> FileLayout:
+    """
+    Reads the footer of a Parquet file and returns its size, row groups and the min/max statistics of the given
+    columns in every row group.
+    """
+    metadata = pq.read_metadata(str(path), filesystem=filesystem)
+    names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+    indices = [names.index(name) for name in columns or [] if name in names]
+    row_groups = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        ranges = {}
+        for index in indices:
+            statistics = row_group.column(index).statistics
+            if statistics is not None and statistics.has_min_max:
+                ranges[names[index]] = (statistics.min, statistics.max)
+        row_groups.append(RowGroupStats(rows=row_group.num_rows, size=row_group.total_byte_size, ranges=ranges))
+    compression = metadata.row_group(0).column(0).compression if metadata.num_row_groups else "none"
+    size = path.stat().st_size if filesystem is None else filesystem.get_file_info(str(path)).size
+    return FileLayout(path=path, rows=metadata.num_rows, size=size, compression=compression, row_groups=row_groups)
+
+
+def log_layout(
+    paths: list[Path], columns: list[str] | None = None, filesystem: pyarrow.fs.FileSystem | None = None
+) -> list[FileLayout]:
+    layouts = [describe_file(path, columns, filesystem) for path in sorted(paths)]
+    for layout in layouts:
+        logger.info(
+            f"'{layout.path.name}': {layout.rows} rows in {len(layout.row_groups)} row groups, "
+            f"{layout.size / 1024**2:.2f} MiB ({layout.compression})"
+        )
+        for i, row_group in enumerate(layout.row_groups):
+            ranges = ", ".join(f"{name} [{low}, {high}]" for name, (low, high) in row_group.ranges.items())
+            logger.debug(f"  row group {i}: {row_group.rows} rows, {row_group.size} bytes {ranges}")
+    return layouts
@@ -1,31 +1,26 @@
 import logging
+import posixpath
 import sys
 from pathlib import Path
-from typing import Literal
 
 import polars as pl
-import pyarrow.csv
-import pyarrow.parquet as pq
-
-from .parser import get_config
+import pyarrow as pa
+import pyarrow.fs
+from fsspec.core import url_to_fs
+
+from ..schema import declared_schema
+from .catalog import update_catalog
+from .incremental import process_incremental
+from .layout import Layout, log_layout
+from .parallel import process_parallel
+from .parser import Config, get_config
+from .quarantine import Quarantine, cast_column, open_lenient_csv, open_validated_csv, polars_schema
+from .rollups import Rollup, RollupBuilder
+from .writers import create_parent_dir, open_filesystem, write_parquet_stream, write_partitioned_stream, write_table
 
 logger = logging.getLogger("Transform and load to Parquet")
 
-
-class ErrorHandler:
-    def __init__(self, path: Path) -> None:
-        self.path = path
-        self.records: list[str] = []
-
-    def register_error(self, record: str) -> Literal["skip"]:
-        self.records.append(record)
-        return "skip"
-
-    def save(self) -> None:
-        if self.records:
-            logger.warning(f"{len(self.records)} invalid records. Saving records to '{self.path}'")
-            with open(self.path, "a") as f:
-                f.writelines(self.records)
+MIN_BLOCK_SIZE = 1 << 20  # 1 MiB
 
 
 def main(argv: list[str] | None = None) -> None:
@@ -35,16 +30,75 @@ def main(argv: list[str] | None = None) -> None:
     try:
         if not config.input.exists():
             raise FileNotFoundError(f"Input file '{config.input.name}' doesn't exist.")
-
-        if not config.force and config.output.exists():
-            raise FileExistsError("The file already exists. Add '-f' flag to overwrite it, or choose another name.")
-
-        config.output.parent.mkdir(exist_ok=True)
-
-        if not config.error_handling:
-            process_using_polars(config.input, config.output, config.partition_cols)
+        if config.rollup is not None and config.input.is_file() and declared_schema(config.input) is None:
+            raise ValueError("Rollups can only be written for CSV files with the columns of the dataset.")
+
+        if config.output_url is not None:
+            if not config.streaming:
+                raise ValueError("Only the streaming conversion can write to a URL, add the '-s' flag.")
+            filesystem, path = open_filesystem(config.output_url)
+            if not config.force and filesystem.get_file_info(path).type != pyarrow.fs.FileType.NotFound:
+                raise FileExistsError(
+                    "The file already exists. Add '-f' flag to overwrite it, or choose another name."
+                )
+            create_parent_dir(filesystem, path)
         else:
-            process_using_pyarrow(config.input, config.output, config.partition_cols)
+            if not config.force and not config.incremental and config.output.exists():
+                raise FileExistsError(
+                    "The file already exists. Add '-f' flag to overwrite it, or choose another name."
+                )
+            config.output.parent.mkdir(exist_ok=True)
+
+        if config.output_url is not None:
+            process_streaming(
+                config.input,
+                Path(path),
+                config.partition_cols,
+                config.error_handling,
+                config.memory_budget,
+                config.layout,
+                filesystem,
+                rollup=config.rollup,
+            )
+        elif config.incremental:
+            process_incremental(
+                config.input,
+                config.output,
+                config.partition_cols,
+                config.error_handling,
+                config.workers,
+                config.chunk_size,
+                config.layout,
+                config.rollup,
+            )
+        elif config.workers > 1:
+            process_parallel(
+                config.input,
+                config.output,
+                config.partition_cols,
+                config.error_handling,
+                config.workers,
+                config.chunk_size,
+                config.layout,
+                config.rollup,
+            )
+        elif config.streaming:
+            process_streaming(
+                config.input,
+                config.output,
+                config.partition_cols,
+                config.error_handling,
+                config.memory_budget,
+                config.layout,
+                rollup=config.rollup,
+            )
+        elif not config.error_handling:
+            process_using_polars(config.input, config.output, config.partition_cols, config.layout, config.rollup)
+        else:
+            process_using_pyarrow(config.input, config.output, config.partition_cols, config.layout, config.rollup)
+
+        if config.catalog:
+            update_dataset_catalog(config)
 
         logger.info(f"Successfully transform and load '{config.input.name}' to Parquet")
 
@@ -59,24 +113,108 @@ def main(argv: list[str] | None = None) -> None:
         sys.exit(1)
 
 
-def process_using_polars(input: Path, output: Path, partition_cols: list[str] | None) -> None:
+def process_using_polars(
+    input: Path, output: Path, partition_cols: list[str] | None, layout: Layout, rollup: Rollup | None = None
+) -> None:
     logger.info("Reading file (ignore errors)")
-    df = pl.read_csv(input, ignore_errors=True)
+    schema = declared_schema(input)
+    if schema is None:
+        table = pl.read_csv(input, ignore_errors=True).to_arrow()
+    else:
+        # Values are read as strings and cast like in the other modes, so every mode writes the dataset schema
+        df = pl.read_csv(input, schema={name: pl.String for name in schema.names}, ignore_errors=True)
+        casts = [cast_column(name, dtype) for name, dtype in polars_schema(schema).items()]
+        table = df.select(casts).to_arrow().cast(schema)
     logger.info("Generating Parquet file")
-    file = output if partition_cols is None else output.parent
-    # 'snappy' guarantees more backwards compatibility when dealing with older parquet readers
-    # https://docs.pola.rs/api/python/stable/reference/api/polars.DataFrame.write_parquet.html
-    df.write_parquet(file, compression="snappy", partition_by=partition_cols)
+    # The default 'snappy' codec guarantees more backwards compatibility when dealing with older parquet readers
+    write_table_with_rollup(table, output, partition_cols, layout, rollup)
 
 
-def process_using_pyarrow(input: Path, output: Path, partition_cols: list[str] | None) -> None:
+def process_using_pyarrow(
+    input: Path, output: Path, partition_cols: list[str] | None, layout: Layout, rollup: Rollup | None = None
+) -> None:
     logger.info("Reading file")
-    quarantine = ErrorHandler(output.parent / "quarantine.csv")
-    parse_options = pyarrow.csv.ParseOptions(invalid_row_handler=quarantine.register_error)
-    table = pyarrow.csv.read_csv(input, parse_options=parse_options)
-    quarantine.save()
+    quarantine = Quarantine(output.parent / "quarantine.csv")
+    table = open_validated_csv(input, quarantine, schema=declared_schema(input)).read_all()
+    quarantine.close()
+    log_quarantine(quarantine)
     logger.info("Generating Parquet file")
-    pq.write_to_dataset(table=table, root_path=output.parent, partition_cols=partition_cols)
+    write_table_with_rollup(table, output, partition_cols, layout, rollup)
+
+
+def write_table_with_rollup(
+    table: pa.Table, output: Path, partition_cols: list[str] | None, layout: Layout, rollup: Rollup | None
+) -> None:
+    paths = write_table(table, output, partition_cols, layout)
+    if rollup is not None:
+        builder = RollupBuilder(rollup)
+        builder.add(table)
+        builder.write(output.parent, output.stem, paths)
+    log_layout(paths, layout.sort_by)
+
+
+def process_streaming(
+    input: Path,
+    output: Path,
+    partition_cols: list[str] | None,
+    error_handling: bool,
+    memory_budget: int,
+    layout: Layout,
+    filesystem: pyarrow.fs.FileSystem | None = None,
+    rollup: Rollup | None = None,
+) -> None:
+    """
+    Converts the input incrementally, so the whole file is never held in memory. The memory budget (in bytes) bounds
+    the CSV read blocks and the rows buffered before a row group is flushed. Column types are those of the dataset
+    schema, or inferred from the first block for other files. Rows with a wrong number of fields are skipped and
+    values that can't be cast become null, or both are saved to the quarantine file next to the output when error
+    handling is enabled.
+    With a filesystem, the output is a path on it and every row group or partition file is uploaded as soon as it
+    is written, so the conversion and the upload overlap and nothing is staged on the local disk. The quarantine
+    file is written to the filesystem too.
+    The rollup, if any, is accumulated from the batches as they are written.
+    """
+    logger.info("Streaming file")
+    block_size = max(MIN_BLOCK_SIZE, memory_budget // 8)
+    schema = declared_schema(input)
+    quarantine = Quarantine(output.parent / "quarantine.csv", filesystem) if error_handling else None
+    if quarantine is not None:
+        reader = open_validated_csv(input, quarantine, block_size, schema)
+    else:
+        reader = open_lenient_csv(input, block_size, schema)
+    builder = RollupBuilder(rollup) if rollup is not None else None
+    if builder is not None:
+        reader = builder.track(reader)
+    if partition_cols is None:
+        write_parquet_stream(reader, output, layout, memory_budget // 2, filesystem)
+        paths = [output]
+    else:
+        paths = write_partitioned_stream(reader, output.parent, partition_cols, layout, filesystem=filesystem)
+    if builder is not None:
+        builder.write(output.parent, output.stem, paths, filesystem)
+    if quarantine is not None:
+        quarantine.close()
+        log_quarantine(quarantine)
+    log_layout(paths, layout.sort_by, filesystem)
+
+
+def update_dataset_catalog(config: Config) -> None:
+    """
+    Refreshes the catalog of the dataset written: the output directory of the parallel and incremental conversions,
+    or the directory of the output file (holding the partitions, if any) otherwise.
+    """
+    if config.output_url is not None:
+        filesystem, path = url_to_fs(config.output_url)
+        update_catalog(filesystem, posixpath.dirname(path))
+    elif config.workers > 1 or config.incremental:
+        update_catalog(*url_to_fs(str(config.output)))
+    else:
+        update_catalog(*url_to_fs(str(config.output.parent)))
+
+
+def log_quarantine(quarantine: Quarantine) -> None:
+    if quarantine.rejected:
+        logger.warning(f"{quarantine.rejected} invalid records saved to '{quarantine.path}'")
 
 
 if __name__ == "__main__":
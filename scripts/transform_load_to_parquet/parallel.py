@@ -0,0 +1,241 @@
+import io
+import json
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent import futures
+from pathlib import Path
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel, ConfigDict
+
+from ..schema import declared_schema
+from .layout import Layout, log_layout
+from .quarantine import Quarantine, infer_schema, open_lenient_csv, open_validated_csv
+from .rollups import ROLLUP_TEMPLATE, Rollup, RollupBuilder
+from .writers import write_parquet_stream, write_partitioned_stream
+
+logger = logging.getLogger("Transform and load to Parquet")
+
+MANIFEST_NAME = "_manifest.json"
+PART_TEMPLATE = "part-{index:05d}"
+
+
+class ChunkTask(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: int
+    input: Path
+    header: bytes
+    start: int
+    end: int
+    output_dir: Path
+    arrow_schema: pa.Schema
+    partition_cols: list[str] | None
+    error_handling: bool
+    layout: Layout
+    checksum: bool = False
+    rollup: Rollup | None = None
+
+
+class PartFile(BaseModel):
+    path: str
+    rows: int
+    size: int
+
+
+class ChunkResult(BaseModel):
+    index: int
+    start: int
+    end: int
+    lines: int
+    parts: list[PartFile]
+    quarantine: Path | None
+    rejected: int
+    checksum: str | None = None
+
+
+def split_byte_ranges(
+    input: Path, chunk_size: int, start: int | None = None, end: int | None = None
+) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    Splits the data lines of a CSV file, from `start` (the end of the header by default) up to `end` (the end of the
+    file by default), into byte ranges of about `chunk_size` bytes that start and end on line boundaries. Returns the
+    header line and the ranges. Quoted values spanning several lines are not supported.
+    """
+    with open(input, "rb") as file:
+        header = file.readline()
+        size = os.fstat(file.fileno()).st_size if end is None else end
+        ranges = []
+        start = len(header) if start is None else start
+        while start < size:
+            file.seek(min(start + chunk_size, size))
+            file.readline()
+            range_end = min(file.tell(), size)
+            ranges.append((start, range_end))
+            start = range_end
+    return header, ranges
+
+
+def process_parallel(
+    input: Path,
+    output: Path,
+    partition_cols: list[str] | None,
+    error_handling: bool,
+    workers: int,
+    chunk_size: int,
+    layout: Layout,
+    rollup: Rollup | None = None,
+) -> None:
+    """
+    Converts newline-aligned byte ranges of the input in a process pool. Every range becomes its own part file (or
+    set of partition files) under the output directory, with its own rollup if required, and a manifest listing
+    every part is written next to them. Quarantined rows of every range are merged, with their global line numbers,
+    into a single quarantine file.
+    """
+    output.mkdir(parents=True, exist_ok=True)
+    remove_previous_parts(output)
+    data_size = input.stat().st_size
+    chunk_size = max(1, min(chunk_size, -(-data_size // workers)))
+    header, ranges = split_byte_ranges(input, chunk_size)
+    schema = input_schema(input)
+    logger.info(f"Converting {len(ranges)} chunks with {workers} workers")
+
+    tasks = [
+        ChunkTask(
+            index=index,
+            input=input,
+            header=header,
+            start=start,
+            end=end,
+            output_dir=output,
+            arrow_schema=schema,
+            partition_cols=partition_cols,
+            error_handling=error_handling,
+            layout=layout,
+            rollup=rollup,
+        )
+        for index, (start, end) in enumerate(ranges)
+    ]
+    results = convert_chunks(tasks, workers)
+
+    if error_handling:
+        quarantine_path = output.parent / "quarantine.csv"
+        quarantine_path.unlink(missing_ok=True)
+        merge_quarantines(results, quarantine_path)
+    write_manifest(input, output, results)
+    log_layout([output / part.path for result in results for part in result.parts], layout.sort_by)
+
+
+def input_schema(input: Path) -> pa.Schema:
+    """
+    The schema every chunk is read with: the dataset schema, or the types inferred from the first block of the file.
+    """
+    schema = declared_schema(input)
+    if schema is None:
+        with open(input, "rb") as file:
+            schema = infer_schema(file)
+    return schema
+
+
+def convert_chunks(tasks: list[ChunkTask], workers: int) -> list[ChunkResult]:
+    if workers <= 1:
+        return [convert_chunk(task) for task in tasks]
+    # Polars' thread pool isn't fork-safe, so workers are spawned
+    context = multiprocessing.get_context("spawn")
+    with futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        return list(executor.map(convert_chunk, tasks))
+
+
+def convert_chunk(task: ChunkTask) -> ChunkResult:
+    with open(task.input, "rb") as file:
+        file.seek(task.start)
+        data = file.read(task.end - task.start)
+    lines = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+    checksum = f"{zlib.crc32(data):08x}" if task.checksum else None
+    source = io.BytesIO(task.header + data)
+    del data
+
+    basename = PART_TEMPLATE.format(index=task.index)
+    quarantine = Quarantine(task.output_dir / f".quarantine-{basename}.csv") if task.error_handling else None
+    if quarantine is not None:
+        reader = open_validated_csv(source, quarantine, schema=task.arrow_schema)
+    else:
+        reader = open_lenient_csv(source, schema=task.arrow_schema)
+    builder = RollupBuilder(task.rollup) if task.rollup is not None else None
+    if builder is not None:
+        reader = builder.track(reader)
+
+    if task.partition_cols is None:
+        path = task.output_dir / f"{basename}.parquet"
+        write_parquet_stream(reader, path, task.layout, buffer_size=task.end - task.start)
+        paths = [path]
+    else:
+        paths = write_partitioned_stream(
+            reader, task.output_dir, task.partition_cols, task.layout, f"{basename}-{{i}}.parquet"
+        )
+    if builder is not None:
+        builder.write(task.output_dir, basename, paths)
+    if quarantine is not None:
+        quarantine.close()
+
+    parts = [
+        PartFile(
+            path=str(path.relative_to(task.output_dir)), rows=pq.read_metadata(path).num_rows, size=path.stat().st_size
+        )
+        for path in paths
+    ]
+    return ChunkResult(
+        index=task.index,
+        start=task.start,
+        end=task.end,
+        lines=lines,
+        parts=parts,
+        quarantine=quarantine.path if quarantine is not None and quarantine.rejected else None,
+        rejected=quarantine.rejected if quarantine is not None else 0,
+        checksum=checksum,
+    )
+
+
+def merge_quarantines(results: list[ChunkResult], path: Path, lines_before: int = 0) -> None:
+    """
+    Concatenates the quarantine files of every chunk, shifting their line numbers (local to the chunk, whose first
+    line is the header) to line numbers of the input file. `lines_before` is the number of data lines preceding the
+    first chunk. Rows are appended when the quarantine file already exists.
+    """
+    rejected = []
+    for result in sorted(results, key=lambda result: result.index):
+        if result.quarantine is not None:
+            df = pl.read_csv(result.quarantine, schema_overrides={"record": pl.String})
+            rejected.append(df.with_columns(pl.col("line_number") + lines_before))
+            result.quarantine.unlink()
+        lines_before += result.lines
+    if rejected:
+        merged = pl.concat(rejected)
+        with open(path, "a") as file:
+            merged.write_csv(file, include_header=file.tell() == 0)
+        logger.warning(f"{len(merged)} invalid records saved to '{path}'")
+
+
+def write_manifest(input: Path, output: Path, results: list[ChunkResult]) -> None:
+    results = sorted(results, key=lambda result: result.index)
+    manifest = {
+        "source": str(input),
+        "source_size": input.stat().st_size,
+        "rows": sum(part.rows for result in results for part in result.parts),
+        "rejected": sum(result.rejected for result in results),
+        "chunks": [result.model_dump(mode="json", exclude={"quarantine"}) for result in results],
+    }
+    (output / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+
+def remove_previous_parts(output: Path) -> None:
+    # Only files written by a previous parallel conversion are removed, the directory may hold other data
+    for path in output.rglob("part-*.parquet"):
+        path.unlink()
+    for path in output.glob(ROLLUP_TEMPLATE.format(name="part-*")):
+        path.unlink()
+    (output / MANIFEST_NAME).unlink(missing_ok=True)
@@ -1,37 +1,107 @@
 import argparse
 import logging
 from pathlib import Path
+from typing import get_args
 
 from pydantic import BaseModel
 
+from .layout import Compression, Layout
+from .rollups import Rollup
+
 
 class Config(BaseModel):
     input: Path
     output: Path
+    output_url: str | None = None
     partition_cols: list[str] | None
     force: bool
     error_handling: bool
+    streaming: bool = False
+    memory_budget: int = 512 * 1024**2
+    layout: Layout = Layout()
+    workers: int = 1
+    incremental: bool = False
+    chunk_size: int = 128 * 1024**2
+    rollup: Rollup | None = None
+    catalog: bool = False
     log_level: int
 
 
 def get_parser() -> argparse.ArgumentParser:
     prog = "Transform and load to Parquet"
     description = "Convert a plain text file into a Parquet file with optional partitioning and error handling."
-    output_help = "Path to write the output Parquet file."
+    output_help = (
+        "Path to write the output Parquet file. In streaming mode it can also be an fsspec URL, such as "
+        "'gs://bucket/dataset.parquet', written to directly without staging the file on the local disk. A URL "
+        "can't be combined with '--workers' or '--incremental'."
+    )
     partition_cols_help = "Column names by which the dataset will be partitioned. No partitions are made by default."
     error_handling_help = (
         "Errors encountered while reading the file will be captured and stored in a quarantine file. "
         "This method is slower and results in a larger output file compared to the default behavior."
     )
+    streaming_help = (
+        "Convert the file incrementally instead of loading it into memory. "
+        "Allows converting files larger than the available memory."
+    )
+    memory_budget_help = "Approximate memory budget in MiB used by the streaming conversion. Default is 512."
+    row_group_size_help = "Maximum number of rows per row group. Default is 1000000."
+    sort_by_help = (
+        "Columns by which the rows are sorted before being written, e.g. region, category and date. Keeps the "
+        "statistics of each row group narrow so filtered reads can skip most of the file. In streaming and parallel "
+        "modes only the rows of each row group are sorted."
+    )
+    page_size_help = "Target size in KiB of the data pages. Default is 1024."
+    compression_help = "Compression codec. Default is snappy."
+    compression_level_help = "Compression level, for the codecs that support it (zstd, gzip, brotli)."
+    no_statistics_help = "Don't write the min/max statistics of the columns."
+    page_index_help = "Write the page index, which lets readers skip pages within a row group."
+    workers_help = (
+        "Number of processes converting newline-aligned chunks of the input in parallel. With more than one worker "
+        "the output path is a directory holding one part file per chunk and a manifest. Default is 1."
+    )
+    incremental_help = (
+        "Convert only the data appended to the input (a file or a directory of CSV files) since the previous run, "
+        "into new part files of the dataset in the output directory. Converted byte ranges are recorded in a "
+        "manifest inside the output directory."
+    )
+    chunk_size_help = "Maximum size in MiB of the chunks converted by each worker. Default is 128."
+    rollups_help = (
+        "Also write rollups next to the Parquet files: the sum, count, min and max of the sales per product category "
+        "and region, which answer the reports of read_and_aggregate without scanning the data. "
+        "Requires the columns of the dataset."
+    )
+    rollups_by_date_help = "Write the rollups per date too, so that reports filtered or grouped by date can use them."
+    catalog_help = (
+        "Write or refresh a '_catalog.json' catalog at the root of the dataset, with the paths, sizes, row counts, "
+        "partition values, column types and row group statistics of its Parquet files. Readers plan and prune their "
+        "reads from it without listing the dataset or fetching the footers. Only the footers of new or rewritten "
+        "files are read when the catalog is refreshed."
+    )
     log_level_help = "Set the root logger level to the specified level."
     log_level_choices = ("NOTSET", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
 
     parser = argparse.ArgumentParser(prog=prog, description=description)
     parser.add_argument("input", type=Path, help="Plain text file to transform")
-    parser.add_argument("output", type=Path, help=output_help)
+    parser.add_argument("output", help=output_help)
     parser.add_argument("-p", "--partition-cols", help=partition_cols_help, nargs="*")
     parser.add_argument("-f", "--force", help="Overwrite output file", action="store_true")
     parser.add_argument("-e", "--error-handling", help=error_handling_help, action="store_true")
+    parser.add_argument("-s", "--streaming", help=streaming_help, action="store_true")
+    parser.add_argument("--memory-budget", type=int, help=memory_budget_help, default=512)
+    parser.add_argument("--row-group-size", type=int, help=row_group_size_help, default=1_000_000)
+    parser.add_argument("--sort-by", help=sort_by_help, nargs="+")
+    parser.add_argument("--page-size", type=int, help=page_size_help, default=1024)
+    parser.add_argument("--compression", help=compression_help, choices=get_args(Compression), default="snappy")
+    parser.add_argument("--compression-level", type=int, help=compression_level_help)
+    parser.add_argument("--no-statistics", help=no_statistics_help, action="store_true")
+    parser.add_argument("--page-index", help=page_index_help, action="store_true")
+    parser.add_argument("-w", "--workers", type=int, help=workers_help, default=1)
+    parser.add_argument("-i", "--incremental", help=incremental_help, action="store_true")
+    parser.add_argument("--chunk-size", type=int, help=chunk_size_help, default=128)
+    parser.add_argument("--rollups", help=rollups_help, action="store_true")
+    parser.add_argument("--rollups-by-date", help=rollups_by_date_help, action="store_true")
+    parser.add_argument("--catalog", help=catalog_help, action="store_true")
     parser.add_argument("-l", "--log-level", help=log_level_help, choices=log_level_choices, default="INFO")
     return parser
 
@@ -39,11 +109,31 @@ def get_parser() -> argparse.ArgumentParser:
 def get_config(argv: list[str] | None = None) -> Config:
     parser = get_parser()
     args = parser.parse_args(argv)
+    output_url = args.output if "://" in args.output else None
+    if output_url is not None and (args.workers > 1 or args.incremental):
+        parser.error("the parallel and incremental conversions can't write to a URL, use a local output path")
     return Config(
         input=args.input,
-        output=args.output,
+        output=Path(args.output),
+        output_url=output_url,
         partition_cols=args.partition_cols,
         force=args.force,
         error_handling=args.error_handling,
+        streaming=args.streaming,
+        memory_budget=args.memory_budget * 1024**2,
+        layout=Layout(
+            sort_by=args.sort_by,
+            row_group_size=args.row_group_size,
+            page_size=args.page_size * 1024,
+            compression=args.compression,
+            compression_level=args.compression_level,
+            statistics=not args.no_statistics,
+            page_index=args.page_index,
+        ),
+        workers=args.workers,
+        incremental=args.incremental,
+        chunk_size=args.chunk_size * 1024**2,
+        rollup=Rollup(by_date=args.rollups_by_date) if args.rollups or args.rollups_by_date else None,
+        catalog=args.catalog,
         log_level=getattr(logging, args.log_level),
     )
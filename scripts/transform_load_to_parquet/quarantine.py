@@ -0,0 +1,198 @@
+import functools
+import io
+from pathlib import Path
+from typing import BinaryIO, Iterator, Literal, TextIO
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.fs
+
+QUARANTINE_FIELDS = ("line_number", "reason", "record")
+HEADER_LINES = 1
+
+
+class Quarantine:
+    """
+    Validates record batches column by column and streams the rejected rows to a CSV file as they are found,
+    together with their source line number and the rejection reason.
+    Structural errors (wrong number of fields) are reported by the CSV reader, type errors are detected by
+    vectorized casts. Line numbers assume one record per line.
+    With a filesystem, the path is on it and the file is written through it.
+    """
+
+    def __init__(self, path: Path, filesystem: pyarrow.fs.FileSystem | None = None) -> None:
+        self.path = path
+        self.filesystem = filesystem
+        self.file: TextIO | None = None
+        self.rejected = 0
+        self.pending: list[tuple[int, str, str]] = []
+        # Line numbers of the rows skipped by the reader that may precede rows not validated yet
+        self.skipped_lines: list[int] = []
+        self.skipped_before = 0
+
+    def register_error(self, row: pyarrow.csv.InvalidRow) -> Literal["skip"]:
+        number = row.number if row.number is not None else -1
+        self.skipped_lines.append(number)
+        reason = f"expected {row.expected_columns} fields, got {row.actual_columns}"
+        self.pending.append((number, reason, row.text))
+        return "skip"
+
+    def validate(self, batch: pa.RecordBatch, schema: pa.Schema, first_row: int) -> pa.Table:
+        """
+        Casts a batch of string columns to the target schema. Rows with values that can't be cast are written
+        to the quarantine file and dropped from the returned table. `first_row` is the index of the first row of
+        the batch among all the rows returned by the reader.
+        """
+        df = pl.DataFrame(pa.Table.from_batches([batch]))
+        target = polars_schema(schema)
+        checked = df.with_columns(cast_column(name, dtype).alias(f"__{name}") for name, dtype in target.items())
+        invalid = [pl.col(name).is_not_null() & pl.col(f"__{name}").is_null() for name in target]
+        reason = pl.coalesce(
+            [pl.when(is_invalid).then(pl.lit(f"invalid {name}")) for name, is_invalid in zip(target, invalid)]
+        )
+        checked = checked.with_columns(reason.alias("__reason"))
+        rejected = checked.filter(pl.col("__reason").is_not_null())
+        line_numbers = self._line_numbers(first_row, len(df))
+        if not rejected.is_empty():
+            record = pl.concat_str([pl.col(name).fill_null("") for name in target], separator=",")
+            rejected_lines = pl.Series(line_numbers).filter(checked["__reason"].is_not_null())
+            rows = rejected.select(rejected_lines.alias("line_number"), pl.col("__reason"), record).rows()
+            self.pending.extend(rows)
+        # The reader may already have reported invalid rows of the following blocks
+        if len(line_numbers):
+            self._flush(up_to=int(line_numbers[-1]))
+        if rejected.is_empty():
+            valid = checked.select(pl.col(f"__{name}").alias(name) for name in target)
+        else:
+            valid = checked.filter(pl.col("__reason").is_null()).select(
+                pl.col(f"__{name}").alias(name) for name in target
+            )
+        table = valid.to_arrow()
+        return table if table.schema == schema else table.cast(schema)
+
+    def close(self) -> None:
+        self._flush()
+        if self.file is not None:
+            self.file.close()
+
+    def _line_numbers(self, first_row: int, num_rows: int) -> npt.NDArray[np.int64]:
+        rows = np.arange(first_row, first_row + num_rows)
+        skipped = np.asarray(self.skipped_lines, dtype=np.int64)
+        # Number of rows returned by the reader before each skipped line
+        positions = skipped - HEADER_LINES - 1 - self.skipped_before - np.arange(len(skipped))
+        line_numbers = rows + HEADER_LINES + 1 + self.skipped_before + np.searchsorted(positions, rows, side="right")
+        # Skipped lines before the end of this batch precede every row still to come
+        done = int(np.searchsorted(positions, first_row + num_rows, side="left"))
+        self.skipped_before += done
+        del self.skipped_lines[:done]
+        return line_numbers
+
+    def _flush(self, up_to: int | None = None) -> None:
+        ready = [row for row in self.pending if up_to is None or row[0] <= up_to]
+        if not ready:
+            return
+        if self.file is None:
+            if self.filesystem is None:
+                self.file = open(self.path, "w")
+            else:
+                self.file = io.TextIOWrapper(self.filesystem.open_output_stream(str(self.path)))
+        rejected = pl.DataFrame(ready, schema=list(QUARANTINE_FIELDS), orient="row").sort("line_number")
+        self.file.write(rejected.write_csv(include_header=self.rejected == 0))
+        self.rejected += len(rejected)
+        self.pending = [row for row in self.pending if up_to is not None and row[0] > up_to]
+
+
+def open_validated_csv(
+    input: Path | BinaryIO, quarantine: Quarantine, block_size: int | None = None, schema: pa.Schema | None = None
+) -> pa.RecordBatchReader:
+    """
+    Opens a streaming CSV reader whose batches have been validated by the quarantine.
+    Unless a schema is given, column types are inferred from the first block of the file.
+    """
+    read_options = pyarrow.csv.ReadOptions(block_size=block_size) if block_size else pyarrow.csv.ReadOptions()
+    if schema is None:
+        schema = infer_schema(input, read_options)
+
+    reader = pyarrow.csv.open_csv(
+        input,
+        read_options=read_options,
+        parse_options=pyarrow.csv.ParseOptions(invalid_row_handler=quarantine.register_error),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={name: pa.string() for name in schema.names}, strings_can_be_null=True
+        ),
+    )
+
+    def validated_batches() -> Iterator[pa.RecordBatch]:
+        first_row = 0
+        for batch in reader:
+            yield from quarantine.validate(batch, schema, first_row).to_batches()
+            first_row += batch.num_rows
+
+    return pa.RecordBatchReader.from_batches(schema, validated_batches())
+
+
+def open_lenient_csv(
+    input: Path | BinaryIO, block_size: int | None = None, schema: pa.Schema | None = None
+) -> pa.RecordBatchReader:
+    """
+    Opens a streaming CSV reader that skips the rows with a wrong number of fields and, like Polars with
+    `ignore_errors`, turns the values that can't be cast to the schema into nulls instead of failing.
+    Unless a schema is given, column types are inferred from the first block of the file.
+    """
+    read_options = pyarrow.csv.ReadOptions(block_size=block_size) if block_size else pyarrow.csv.ReadOptions()
+    if schema is None:
+        schema = infer_schema(input, read_options)
+
+    # Values are read as strings, the schema is only the target of the casts
+    reader = pyarrow.csv.open_csv(
+        input,
+        read_options=read_options,
+        parse_options=pyarrow.csv.ParseOptions(invalid_row_handler=skip_invalid_row),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={name: pa.string() for name in schema.names}, strings_can_be_null=True
+        ),
+    )
+
+    def cast_batches() -> Iterator[pa.RecordBatch]:
+        for batch in reader:
+            df = pl.DataFrame(pa.Table.from_batches([batch]))
+            table = df.select(cast_column(name, dtype) for name, dtype in polars_schema(schema).items()).to_arrow()
+            yield from (table if table.schema == schema else table.cast(schema)).to_batches()
+
+    return pa.RecordBatchReader.from_batches(schema, cast_batches())
+
+
+def infer_schema(input: Path | BinaryIO, read_options: pyarrow.csv.ReadOptions | None = None) -> pa.Schema:
+    """
+    Infers the column types from the first block of the file. File objects are rewound afterwards.
+    """
+    position = None if isinstance(input, Path) else input.tell()
+    skip_options = pyarrow.csv.ParseOptions(invalid_row_handler=skip_invalid_row)
+    with pyarrow.csv.open_csv(input, read_options=read_options, parse_options=skip_options) as reader:
+        # Large strings are what Polars produces, so valid batches don't need to be cast back
+        schema = pa.schema(
+            pa.field(field.name, pa.large_string()) if pa.types.is_string(field.type) else field
+            for field in reader.schema
+        )
+    if position is not None and not isinstance(input, Path):
+        input.seek(position)
+    return schema
+
+
+@functools.cache
+def polars_schema(schema: pa.Schema) -> pl.Schema:
+    return pl.DataFrame(schema.empty_table()).schema
+
+
+def cast_column(name: str, dtype: pl.DataType) -> pl.Expr:
+    # Values that can't be cast become null. An explicit format is much faster than date inference
+    if dtype == pl.Date:
+        return pl.col(name).str.to_date("%Y-%m-%d", strict=False)
+    return pl.col(name).cast(dtype, strict=False)
+
+
+def skip_invalid_row(_: pyarrow.csv.InvalidRow) -> Literal["skip"]:
+    return "skip"
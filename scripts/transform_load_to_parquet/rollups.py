@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.fs
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+from .layout import decode
+
+ROLLUP_TEMPLATE = "_rollup-{name}.parquet"
+FILES_METADATA_KEY = b"rollup.files"
+GROUP_KEYS = ["categoria_de_producto", "region_de_venta"]
+DATE_KEY = "fecha_de_transaccion"
+MEASURE = "cantidad_de_venta"
+# Partial aggregates of the measure and the aggregation merging two partials of each
+PARTIALS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+class Rollup(BaseModel):
+    """
+    Materialized partial aggregates of the sales written next to the Parquet files: sum, count, min and max of the
+    sales per product category and region, and optionally per date. Readers merge the rollups of every part file to
+    answer the reports grouped by these columns without scanning the data.
+    """
+
+    by_date: bool = False
+
+    @property
+    def keys(self) -> list[str]:
+        return GROUP_KEYS + [DATE_KEY] if self.by_date else GROUP_KEYS
+
+
+class RollupFile(BaseModel):
+    path: str
+    size: int
+
+
+def partial_column(function: str) -> str:
+    return f"{MEASURE}_{function}"
+
+
+def merge_partials(table: pa.Table, keys: list[str]) -> pa.Table:
+    """
+    Merges the partial aggregates of the rows with the same keys.
+    """
+    aggregated = table.group_by(keys, use_threads=False).aggregate(
+        [(partial_column(function), merge) for function, merge in PARTIALS.items()]
+    )
+    names = {f"{partial_column(function)}_{merge}": partial_column(function) for function, merge in PARTIALS.items()}
+    return aggregated.rename_columns([names.get(name, name) for name in aggregated.column_names])
+
+
+class RollupBuilder:
+    """
+    Accumulates the partial aggregates of the tables or batches written to a set of files.
+    """
+
+    # Partials kept before they are merged, so memory doesn't grow with the number of batches
+    MAX_PARTIALS = 64
+
+    def __init__(self, rollup: Rollup) -> None:
+        self.rollup = rollup
+        self.partials: list[pa.Table] = []
+
+    def add(self, table: pa.Table) -> None:
+        # Dictionaries differ between batches and can't be unified when merging, so the keys are decoded
+        keys = pa.table(
+            {key: decode(table.column(key)) for key in self.rollup.keys} | {MEASURE: table.column(MEASURE)}
+        )
+        # Aggregated columns are named after the measure and the function, as the partial columns
+        self.partials.append(
+            keys.group_by(self.rollup.keys, use_threads=False).aggregate(
+                [(MEASURE, function) for function in PARTIALS]
+            )
+        )
+        if len(self.partials) >= self.MAX_PARTIALS:
+            self.partials = [self.table()]
+
+    def track(self, reader: pa.RecordBatchReader) -> pa.RecordBatchReader:
+        """
+        Returns a reader of the same batches, adding each of them to the rollup as it is read.
+        """
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            for batch in reader:
+                self.add(pa.Table.from_batches([batch]))
+                yield batch
+
+        return pa.RecordBatchReader.from_batches(reader.schema, batches())
+
+    def table(self) -> pa.Table:
+        if not self.partials:
+            # A file without rows has an empty rollup
+            empty = {key: pa.array([], pa.string()) for key in GROUP_KEYS}
+            self.add(pa.table(empty | {DATE_KEY: pa.array([], pa.date32()), MEASURE: pa.array([], pa.int64())}))
+        return merge_partials(pa.concat_tables(self.partials), self.rollup.keys)
+
+    def write(
+        self, directory: Path, name: str, files: list[Path], filesystem: pyarrow.fs.FileSystem | None = None
+    ) -> Path:
+        """
+        Writes the rollup next to the files it summarizes. The names and sizes of the files, relative to the
+        directory, are stored in the metadata of the rollup so that readers only use it while they are unchanged.
+        """
+        if filesystem is None:
+            filesystem = pyarrow.fs.LocalFileSystem()
+        covered = [
+            RollupFile(path=path.relative_to(directory).as_posix(), size=filesystem.get_file_info(str(path)).size)
+            for path in files
+        ]
+        table = self.table()
+        metadata = json.dumps([file.model_dump() for file in covered]).encode()
+        table = table.replace_schema_metadata({FILES_METADATA_KEY: metadata})
+        path = directory / ROLLUP_TEMPLATE.format(name=name)
+        pq.write_table(table, str(path), filesystem=filesystem)
+        return path
@@ -0,0 +1,119 @@
+from pathlib import Path
+from typing import Iterator
+
+import fsspec
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from .layout import Layout, sort_table
+
+
+def open_filesystem(url: str) -> tuple[pyarrow.fs.FileSystem, str]:
+    """
+    Returns the filesystem of an fsspec URL (gcsfs for 'gs://'), wrapped for the PyArrow writers, and the path on it.
+    """
+    fs, path = fsspec.core.url_to_fs(url)
+    return pyarrow.fs.PyFileSystem(pyarrow.fs.FSSpecHandler(fs)), path
+
+
+def create_parent_dir(filesystem: pyarrow.fs.FileSystem, path: str) -> None:
+    """
+    Creates the parent directory of a path on a local filesystem. Object stores have no directories to create, and
+    creating the parent of a path at the root of a bucket would try to create the bucket.
+    """
+    if isinstance(filesystem, pyarrow.fs.PyFileSystem):
+        if not isinstance(filesystem.handler.fs, fsspec.implementations.local.LocalFileSystem):
+            return
+    elif not isinstance(filesystem, pyarrow.fs.LocalFileSystem):
+        return
+    filesystem.create_dir(str(Path(path).parent), recursive=True)
+
+
+def write_table(table: pa.Table, output: Path, partition_cols: list[str] | None, layout: Layout) -> list[Path]:
+    """
+    Writes an in-memory table, sorted as the layout requires, to a Parquet file or to a hive-partitioned dataset
+    next to it. Returns the paths of the written files.
+    """
+    table = sort_table(table, layout.sort_by)
+    options = layout.write_options(table.schema, partition_cols)
+    if partition_cols is None:
+        pq.write_table(table, output, row_group_size=layout.row_group_size, **options)
+        return [output]
+    written: list[Path] = []
+    pq.write_to_dataset(
+        table,
+        root_path=output.parent,
+        partition_cols=partition_cols,
+        row_group_size=layout.row_group_size,
+        file_visitor=lambda file: written.append(Path(file.path)),
+        **options,
+    )
+    return written
+
+
+def write_parquet_stream(
+    reader: pa.RecordBatchReader,
+    output: Path,
+    layout: Layout,
+    buffer_size: int,
+    filesystem: pyarrow.fs.FileSystem | None = None,
+) -> None:
+    """
+    Writes the batches of the reader to a single Parquet file. Batches are buffered until a row group is full or the
+    buffer reaches `buffer_size` bytes, whichever comes first. Only the buffered rows can be sorted, so every row
+    group is sorted but the file as a whole is not. Row groups are written to the filesystem as soon as they are
+    complete.
+    """
+    buffered: list[pa.RecordBatch] = []
+    rows = nbytes = 0
+    options = layout.write_options(reader.schema)
+    with pq.ParquetWriter(str(output), reader.schema, filesystem=filesystem, **options) as writer:
+        for batch in reader:
+            buffered.append(batch)
+            rows += batch.num_rows
+            nbytes += batch.nbytes
+            if rows >= layout.row_group_size or nbytes >= buffer_size:
+                table = sort_table(pa.Table.from_batches(buffered), layout.sort_by)
+                writer.write_table(table, row_group_size=layout.row_group_size)
+                buffered, rows, nbytes = [], 0, 0
+        if buffered:
+            table = sort_table(pa.Table.from_batches(buffered), layout.sort_by)
+            writer.write_table(table, row_group_size=layout.row_group_size)
+
+
+def write_partitioned_stream(
+    reader: pa.RecordBatchReader,
+    root_path: Path,
+    partition_cols: list[str],
+    layout: Layout,
+    basename_template: str | None = None,
+    filesystem: pyarrow.fs.FileSystem | None = None,
+) -> list[Path]:
+    """
+    Writes the batches of the reader to a hive-partitioned dataset and returns the paths of the written files.
+    Rows are buffered per open partition file until a row group is full. The rows of a row group come from several
+    batches, so they are sorted per batch only and the files don't declare a sort order.
+    """
+
+    def sorted_batches() -> Iterator[pa.RecordBatch]:
+        for batch in reader:
+            yield from sort_table(pa.Table.from_batches([batch]), layout.sort_by).to_batches()
+
+    options = layout.model_copy(update={"sort_by": None}).write_options(reader.schema, partition_cols)
+    written: list[Path] = []
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(reader.schema, sorted_batches()),
+        str(root_path),
+        format="parquet",
+        filesystem=filesystem,
+        partitioning=partition_cols,
+        partitioning_flavor="hive",
+        basename_template=basename_template,
+        file_options=ds.ParquetFileFormat().make_write_options(**options),
+        max_rows_per_group=layout.row_group_size,
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda file: written.append(Path(file.path)),
+    )
+    return written
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+import gcsfs.core
+from gcsfs.retry import HttpError, is_retriable
+from pydantic import BaseModel
+
+logger = logging.getLogger("Upload to GCS")
+
+Put = Callable[[Path, str], Awaitable[None]]
+
+THROTTLING_CODES = {429, 503}
+
+
+class Throttled(Exception):
+    """
+    Throttling answer of the service. gcsfs retries throttled requests up to 6 times on its own, so the adaptive
+    limiter would hardly ever see the throttling: this error is raised by the HTTP session before gcsfs checks the
+    response, and as gcsfs doesn't retry it, throttled requests are retried by `upload_concurrently` instead.
+    """
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"Throttled by the service (HTTP {status})")
+        self.status = status
+
+
+async def raise_throttling(response: aiohttp.ClientResponse) -> None:
+    if response.status in THROTTLING_CODES:
+        raise Throttled(response.status)
+
+
+def throttling_filesystem(**kwargs: Any) -> gcsfs.core.GCSFileSystem:
+    """
+    GCS filesystem raising `Throttled` on the throttled requests. Other errors are still retried by gcsfs.
+    """
+    return gcsfs.core.GCSFileSystem(session_kwargs={"raise_for_status": raise_throttling}, **kwargs)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that grows while uploads succeed and is halved whenever the service throttles (AIMD). It
+    starts by adding one slot per successful upload, and after the first throttling only one slot per `limit`
+    successful uploads, so it settles just below the concurrency the service accepts.
+    """
+
+    def __init__(self, initial: int, maximum: int) -> None:
+        self.limit = float(min(initial, maximum))
+        self.maximum = maximum
+        self.active = 0
+        self.peak = 0
+        self.slow_start = True
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    async def release(self, throttled: bool) -> None:
+        async with self.condition:
+            self.active -= 1
+            if throttled:
+                self.slow_start = False
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + (1 if self.slow_start else 1 / self.limit))
+            self.condition.notify_all()
+
+
+class RetryBudget:
+    """
+    Retries left for the whole upload, so a persistent failure of the service doesn't multiply the requests.
+    """
+
+    def __init__(self, retries: int) -> None:
+        self.retries = retries
+
+    def take(self) -> bool:
+        if self.retries <= 0:
+            return False
+        self.retries -= 1
+        return True
+
+
+class FileUpload(BaseModel):
+    name: str
+    size: int
+    seconds: float
+    attempts: int
+    error: str | None = None
+
+    @property
+    def throughput(self) -> float:
+        return self.size / 1024**2 / self.seconds if self.seconds else 0.0
+
+
+class UploadReport(BaseModel):
+    files: list[FileUpload]
+    seconds: float
+    retries: int
+    peak_concurrency: int
+
+    @property
+    def failed(self) -> list[FileUpload]:
+        return [file for file in self.files if file.error is not None]
+
+    @property
+    def throughput(self) -> float:
+        size = sum(file.size for file in self.files if file.error is None)
+        return size / 1024**2 / self.seconds if self.seconds else 0.0
+
+
+def upload_files_async(directory: Path, bucket_name: str, names: list[str], max_concurrency: int) -> UploadReport:
+    """
+    Uploads files of the directory with gcsfs, adapting the number of concurrent uploads to the service.
+    """
+
+    async def run() -> UploadReport:
+        fs = throttling_filesystem(asynchronous=True)
+        session = await fs._set_session()
+        try:
+            return await upload_concurrently(gcs_put(fs, bucket_name), directory, names, max_concurrency)
+        finally:
+            await session.close()
+
+    return asyncio.run(run())
+
+
+def gcs_put(fs: gcsfs.core.GCSFileSystem, bucket_name: str) -> Put:
+    async def put(path: Path, name: str) -> None:
+        await fs._put_file(str(path), f"{bucket_name}/{name}")
+
+    return put
+
+
+async def upload_concurrently(
+    put: Put,
+    directory: Path,
+    names: list[str],
+    max_concurrency: int,
+    initial_concurrency: int = 4,
+    max_attempts: int = 5,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+) -> UploadReport:
+    """
+    Uploads every file with `put`, under an adaptive concurrency limit. Retriable errors are retried with full
+    jitter exponential backoff, up to `max_attempts` per file and within a retry budget of a tenth of the files.
+    """
+    limiter = AdaptiveLimiter(initial_concurrency, max_concurrency)
+    budget = RetryBudget(max(10, len(names) // 10))
+    start = time.perf_counter()
+
+    async def upload(name: str) -> FileUpload:
+        path = directory / name
+        file_start = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            await limiter.acquire()
+            throttled = False
+            error: Exception | None = None
+            try:
+                await put(path, name)
+            except Exception as e:
+                throttled = isinstance(e, Throttled) or (isinstance(e, HttpError) and e.code in THROTTLING_CODES)
+                error = e
+            finally:
+                await limiter.release(throttled)
+
+            if error is None:
+                break
+            retriable = throttled or is_retriable(error)
+            if attempts >= max_attempts or not retriable or not budget.take():
+                logger.warning(f"Error while uploading '{name}' after {attempts} attempts: {error}")
+                break
+            await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2**attempts)))
+
+        file = FileUpload(
+            name=name,
+            size=path.stat().st_size,
+            seconds=time.perf_counter() - file_start,
+            attempts=attempts,
+            error=None if error is None else str(error),
+        )
+        if error is None:
+            logger.debug(f"File '{name}' uploaded in {file.seconds:.2f}s ({file.throughput:.1f} MiB/s)")
+        return file
+
+    files = await asyncio.gather(*(upload(name) for name in names))
+    return UploadReport(
+        files=list(files),
+        seconds=time.perf_counter() - start,
+        retries=sum(file.attempts - 1 for file in files),
+        peak_concurrency=limiter.peak,
+    )
+
+
+def log_report(report: UploadReport) -> None:
+    logger.info(
+        f"{len(report.files) - len(report.failed)} of {len(report.files)} files uploaded in {report.seconds:.2f}s "
+        f"({report.throughput:.1f} MiB/s), {report.retries} retries, up to {report.peak_concurrency} concurrent uploads"
+    )
@@ -1,10 +1,15 @@
 import logging
 import sys
 
+from fsspec.core import url_to_fs
 from google.cloud.exceptions import exceptions
 from google.cloud.storage import Bucket, Client, transfer_manager
 
+from ..transform_load_to_parquet.catalog import CATALOG_NAME, update_catalog
+from .async_upload import log_report, upload_files_async
 from .parser import Config, get_config
+from .sync import sync_files_to_gcs
+from .transfers import upload_in_chunks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Upload to GCS")
@@ -20,8 +25,22 @@ def main(argv: list[str] | None = None) -> None:
         client = Client()
         logger.info("Getting bucket for file upload")
         bucket = get_or_create_bucket(client, config.bucket_name)
-        logger.info(f"Uploading files to gcs bucket '{bucket.name}'")
-        upload_files_to_gcs(bucket, config)
+        if config.sync:
+            logger.info(f"Synchronizing files with gcs bucket '{bucket.name}'")
+            failed = sync_files_to_gcs(bucket, config)
+        elif config.asyncio:
+            logger.info(f"Uploading files to gcs bucket '{bucket.name}' with adaptive concurrency")
+            failed = upload_files_to_gcs_async(bucket, config)
+        else:
+            logger.info(f"Uploading files to gcs bucket '{bucket.name}'")
+            failed = upload_files_to_gcs(bucket, config)
+        if failed:
+            # A catalog listing missing objects would make readers plan reads of them
+            skipped = ", the catalog was not uploaded" if config.catalog else ""
+            logger.error(f"{failed} uploads or deletions failed{skipped}")
+            sys.exit(1)
+        if config.catalog:
+            upload_catalog(bucket, config)
 
     except FileNotFoundError:
         logger.exception(f"Directory '{config.directory}' doesn't exist")
@@ -41,7 +60,10 @@ def get_or_create_bucket(client: Client, bucket_name: str) -> Bucket:
     return bucket
 
 
-def upload_files_to_gcs(bucket: Bucket, config: Config) -> None:
+def upload_files_to_gcs(bucket: Bucket, config: Config) -> int:
+    """
+    Uploads the Parquet files of the directory and returns the number of files that couldn't be uploaded.
+    """
     paths = config.directory.rglob("*")
     file_paths = [path for path in paths if path.is_file() and path.suffix == ".parquet"]
 
@@ -52,9 +74,12 @@ def upload_files_to_gcs(bucket: Bucket, config: Config) -> None:
         file_path_obj = file_paths[0]
         blob_name = f"{file_path_obj.name}" if config.blob_name is None else config.blob_name
         blob = bucket.blob(blob_name)
-        blob.upload_from_filename(str(file_path_obj), if_generation_match=0)
+        if file_path_obj.stat().st_size > config.chunk_size:
+            upload_in_chunks(blob, file_path_obj, config.chunk_size, config.workers)
+        else:
+            blob.upload_from_filename(str(file_path_obj), if_generation_match=0)
         logger.info(f"File '{blob_name}' uploaded successfully")
-        return
+        return 0
 
     filenames = [str(path.relative_to(config.directory)) for path in file_paths]
     logger.info(f"{len(filenames)} files found for upload")
@@ -70,6 +95,33 @@ def upload_files_to_gcs(bucket: Bucket, config: Config) -> None:
             logger.warning(f"Error while uploading '{name}': {result}")
         else:
             logger.info(f"File '{name}' uploaded successfully")
+    return sum(isinstance(result, Exception) for result in results)
+
+
+def upload_catalog(bucket: Bucket, config: Config) -> None:
+    """
+    Refreshes the catalog of the directory and uploads it once the files it lists are in the bucket under their
+    paths relative to the directory, the names the catalog uses, so readers never plan reads of missing objects. It
+    isn't called when any file failed to upload.
+    """
+    update_catalog(*url_to_fs(str(config.directory)))
+    bucket.blob(CATALOG_NAME).upload_from_filename(str(config.directory / CATALOG_NAME))
+    logger.info(f"Catalog '{CATALOG_NAME}' uploaded successfully")
+
+
+def upload_files_to_gcs_async(bucket: Bucket, config: Config) -> int:
+    paths = config.directory.rglob("*")
+    filenames = [
+        str(path.relative_to(config.directory)) for path in paths if path.is_file() and path.suffix == ".parquet"
+    ]
+
+    if not filenames:
+        raise FileNotFoundError
+
+    logger.info(f"{len(filenames)} files found for upload")
+    report = upload_files_async(config.directory, bucket.name, filenames, config.max_concurrency)
+    log_report(report)
+    return len(report.failed)
 
 
 if __name__ == "__main__":
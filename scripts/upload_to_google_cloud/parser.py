@@ -9,6 +9,13 @@ class Config(BaseModel):
     bucket_name: str
     blob_name: str | None
     workers: int
+    chunk_size: int = 32 * 1024**2
+    sync: bool = False
+    delete: bool = False
+    refresh: bool = False
+    asyncio: bool = False
+    max_concurrency: int = 64
+    catalog: bool = False
 
 
 def get_parser() -> argparse.ArgumentParser:
@@ -22,11 +29,38 @@ def get_parser() -> argparse.ArgumentParser:
         "Optional name for the blob (file) in the bucket. If not specified, the original file names will be used."
     )
     max_workers_help = "Number of concurrent workers to use for uploading files. Default is 8."
+    chunk_size_help = (
+        "Size in MiB of the parts of a single file uploaded concurrently. A single file larger than this is uploaded "
+        "in parts by the workers and checksum-verified. Default is 32."
+    )
+    sync_help = (
+        "Only upload the files that are missing from the bucket or whose size or CRC32C differ from the remote "
+        "object, overwriting it. Object names are the paths relative to the directory. The state of the bucket is "
+        "cached in a manifest inside the directory."
+    )
+    delete_help = "With --sync, delete the remote Parquet objects that no longer exist in the directory."
+    refresh_help = "With --sync, list the bucket instead of relying on the state cached by the previous sync."
+    asyncio_help = (
+        "Upload the files with an asyncio engine that adapts the number of concurrent uploads to the service, "
+        "backing off when it throttles, and retries failed uploads. Ignores --workers and --blob-name."
+    )
+    max_concurrency_help = "Maximum number of concurrent uploads of the asyncio engine. Default is 64."
+    catalog_help = (
+        "After the files, upload the '_catalog.json' catalog of the directory to the root of the bucket, refreshing "
+        "it first. Only the footers of the files that aren't in the catalog yet, or changed, are read."
+    )
 
     parser.add_argument("directory", type=Path, help=directory_help)
     parser.add_argument("bucket_name", type=str, help=bucket_name_help)
     parser.add_argument("--blob-name", type=str, help=blob_name_help)
     parser.add_argument("-w", "--workers", type=int, help=max_workers_help, default=8)
+    parser.add_argument("--chunk-size", type=int, help=chunk_size_help, default=32)
+    parser.add_argument("-s", "--sync", help=sync_help, action="store_true")
+    parser.add_argument("--delete", help=delete_help, action="store_true")
+    parser.add_argument("--refresh", help=refresh_help, action="store_true")
+    parser.add_argument("-a", "--asyncio", help=asyncio_help, action="store_true")
+    parser.add_argument("--max-concurrency", type=int, help=max_concurrency_help, default=64)
+    parser.add_argument("--catalog", help=catalog_help, action="store_true")
     return parser
 
 
@@ -38,4 +72,11 @@ def get_config(argv: list[str] | None = None) -> Config:
         bucket_name=args.bucket_name,
         blob_name=args.blob_name,
         workers=args.workers,
+        chunk_size=args.chunk_size * 1024**2,
+        sync=args.sync,
+        delete=args.delete,
+        refresh=args.refresh,
+        asyncio=args.asyncio,
+        max_concurrency=args.max_concurrency,
+        catalog=args.catalog,
     )
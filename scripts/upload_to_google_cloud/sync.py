@@ -0,0 +1,155 @@
+import logging
+import os
+from pathlib import Path
+
+from google.cloud.storage import Bucket, transfer_manager
+from pydantic import BaseModel
+
+from .parser import Config
+from .transfers import file_crc32c, upload_in_chunks
+
+logger = logging.getLogger("Upload to GCS")
+
+MANIFEST_TEMPLATE = ".gcs-sync-{bucket}.json"
+
+
+class LocalFile(BaseModel):
+    size: int
+    mtime_ns: int
+    crc32c: str
+
+
+class RemoteObject(BaseModel):
+    size: int
+    crc32c: str
+
+
+class SyncManifest(BaseModel):
+    """
+    State of the last sync of a directory to a bucket, stored in the directory. Local checksums are reused while the
+    size and modification time of a file don't change, and the remote objects avoid listing the bucket again.
+    """
+
+    local: dict[str, LocalFile] = {}
+    remote: dict[str, RemoteObject] | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncManifest":
+        return cls.model_validate_json(path.read_text()) if path.exists() else cls()
+
+    def save(self, path: Path) -> None:
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text(self.model_dump_json(indent=2))
+        os.replace(temporary_path, path)
+
+
+def sync_files_to_gcs(bucket: Bucket, config: Config) -> int:
+    """
+    Uploads the Parquet files of the directory that are missing from the bucket or whose size or CRC32C differ from
+    the remote object, and optionally deletes the remote Parquet objects that no longer exist locally.
+    Object names are the paths relative to the directory. Returns the number of files that couldn't be uploaded and
+    of objects that couldn't be deleted. The manifest records what succeeded even when the sync fails midway.
+    """
+    if not config.directory.is_dir():
+        raise FileNotFoundError
+    manifest_path = config.directory / MANIFEST_TEMPLATE.format(bucket=bucket.name)
+    manifest = SyncManifest.load(manifest_path)
+    local = scan_local_files(config.directory, manifest.local)
+    if manifest.remote is None or config.refresh:
+        logger.info(f"Listing objects of bucket '{bucket.name}'")
+        remote = list_remote_objects(bucket)
+    else:
+        remote = dict(manifest.remote)
+
+    changed = [
+        name
+        for name, file in local.items()
+        if name not in remote or (remote[name].size, remote[name].crc32c) != (file.size, file.crc32c)
+    ]
+    deleted = [name for name in remote if name not in local] if config.delete else []
+    logger.info(f"{len(changed)} of {len(local)} files to upload, {len(deleted)} objects to delete")
+
+    uploaded: list[str] = []
+    removed: list[str] = []
+    try:
+        uploaded = upload_changed_files(bucket, config, changed)
+        for name in uploaded:
+            remote[name] = RemoteObject(size=local[name].size, crc32c=local[name].crc32c)
+        removed = delete_objects(bucket, deleted)
+        for name in removed:
+            del remote[name]
+    finally:
+        SyncManifest(local=local, remote=remote).save(manifest_path)
+    return len(changed) - len(uploaded) + len(deleted) - len(removed)
+
+
+def scan_local_files(directory: Path, cached: dict[str, LocalFile]) -> dict[str, LocalFile]:
+    local = {}
+    for path in sorted(directory.rglob("*.parquet")):
+        if not path.is_file():
+            continue
+        name = path.relative_to(directory).as_posix()
+        stat = path.stat()
+        file = cached.get(name)
+        if file is None or (file.size, file.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            file = LocalFile(size=stat.st_size, mtime_ns=stat.st_mtime_ns, crc32c=file_crc32c(path))
+        local[name] = file
+    return local
+
+
+def list_remote_objects(bucket: Bucket) -> dict[str, RemoteObject]:
+    # Only Parquet objects are considered, the same files that are uploaded
+    return {
+        blob.name: RemoteObject(size=blob.size, crc32c=blob.crc32c)
+        for blob in bucket.list_blobs()
+        if blob.name.endswith(".parquet")
+    }
+
+
+def delete_objects(bucket: Bucket, names: list[str]) -> list[str]:
+    """
+    Deletes the given objects and returns the names of the ones deleted successfully.
+    """
+    removed = []
+    for name in names:
+        try:
+            bucket.blob(name).delete()
+        except Exception as e:
+            logger.warning(f"Error while deleting '{name}': {e}")
+        else:
+            removed.append(name)
+            logger.info(f"Object '{name}' deleted")
+    return removed
+
+
+def upload_changed_files(bucket: Bucket, config: Config, names: list[str]) -> list[str]:
+    """
+    Uploads the given files, overwriting the remote objects, and returns the names of the ones uploaded
+    successfully. Files larger than the chunk size are uploaded in concurrent chunks one after the other, the rest
+    are uploaded concurrently.
+    """
+    large = [name for name in names if (config.directory / name).stat().st_size > config.chunk_size]
+    small = [name for name in names if name not in large]
+    uploaded = []
+    for name in large:
+        try:
+            upload_in_chunks(bucket.blob(name), config.directory / name, config.chunk_size, config.workers, True)
+        except Exception as e:
+            logger.warning(f"Error while uploading '{name}': {e}")
+        else:
+            uploaded.append(name)
+    if small:
+        results = transfer_manager.upload_many_from_filenames(
+            bucket=bucket,
+            filenames=small,
+            source_directory=str(config.directory),
+            max_workers=config.workers,
+        )
+        for name, result in zip(small, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error while uploading '{name}': {result}")
+            else:
+                uploaded.append(name)
+    for name in uploaded:
+        logger.info(f"File '{name}' uploaded successfully")
+    return uploaded
@@ -0,0 +1,55 @@
+import base64
+import logging
+import math
+from pathlib import Path
+from typing import Callable, Protocol
+
+import google_crc32c
+from google.api_core import exceptions
+from google.cloud.storage import Blob, transfer_manager
+
+logger = logging.getLogger("Upload to GCS")
+
+CHECKSUM_BLOCK_SIZE = 1024**2
+
+
+class Checksum(Protocol):
+    def update(self, chunk: bytes) -> None: ...
+
+    def digest(self) -> bytes: ...
+
+
+# Typed shims over the untyped constructors of google-crc32c and google-cloud-core
+new_checksum: Callable[[], Checksum] = google_crc32c.Checksum
+precondition_failed: Callable[[str], Exception] = exceptions.PreconditionFailed
+
+
+def upload_in_chunks(blob: Blob, path: Path, chunk_size: int, workers: int, overwrite: bool = False) -> None:
+    """
+    Uploads a large file as the parts of an XML multipart upload sent concurrently, each one verified with its own
+    checksum. The CRC32C of the assembled object is then compared with the one of the local file.
+    """
+    # Multipart uploads don't take generation preconditions, the existing object is checked beforehand instead
+    if not overwrite and blob.exists():
+        raise precondition_failed(f"Object '{blob.name}' already exists")
+    chunks = math.ceil(path.stat().st_size / chunk_size)
+    logger.info(f"Uploading '{path.name}' in {chunks} chunks with {workers} workers")
+    transfer_manager.upload_chunks_concurrently(
+        str(path), blob, chunk_size=chunk_size, max_workers=workers, checksum="crc32c"
+    )
+    blob.reload()
+    local_crc32c = file_crc32c(path)
+    if blob.crc32c != local_crc32c:
+        blob.delete()
+        raise ValueError(f"CRC32C of '{blob.name}' doesn't match the local file: {blob.crc32c} != {local_crc32c}")
+
+
+def file_crc32c(path: Path) -> str:
+    """
+    Base64-encoded CRC32C of a file, as reported in the metadata of GCS objects.
+    """
+    checksum = new_checksum()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHECKSUM_BLOCK_SIZE), b""):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode()
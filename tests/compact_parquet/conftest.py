@@ -0,0 +1,23 @@
+import pyarrow.csv
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.schema import ARROW_SCHEMA
+from tests.conftest import DATASET
+
+
+@pytest.fixture
+def partitioned_dataset(tmp_path):
+    """
+    Dataset partitioned by region, with ten small files per partition as left by repeated appends.
+    """
+    table = pyarrow.csv.read_csv(DATASET, convert_options=pyarrow.csv.ConvertOptions(column_types=ARROW_SCHEMA))
+    dataset = tmp_path / "dataset"
+    for index, offset in enumerate(range(0, table.num_rows, 100)):
+        pq.write_to_dataset(
+            table.slice(offset, 100),
+            root_path=dataset,
+            partition_cols=["region_de_venta"],
+            basename_template=f"part-{index:05d}-{{i}}.parquet",
+        )
+    return dataset
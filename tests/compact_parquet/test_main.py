@@ -0,0 +1,152 @@
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+from fsspec.core import url_to_fs
+
+from scripts.compact_parquet.main import main, plan_partition, size_histogram
+from scripts.transform_load_to_parquet.catalog import Catalog, update_catalog
+from scripts.transform_load_to_parquet.main import main as transform
+from tests.conftest import DATASET
+
+
+def read_dataset(dataset) -> pl.DataFrame:
+    return pl.read_parquet(dataset / "**/*.parquet", hive_partitioning=True).cast({pl.Categorical: pl.String})
+
+
+def test_plan_partition(tmp_path):
+    sizes = [10, 10, 500, 10, 60, 40, 10]
+    files = []
+    for index, size in enumerate(sizes):
+        path = tmp_path / f"part-{index}.parquet"
+        path.write_bytes(b"0" * size)
+        files.append(path)
+
+    groups = plan_partition(files, target_size=100)
+
+    # The oversized file is split, small files are packed up to the target size and a single small file is kept
+    assert groups == [[files[2]], files[0:2] + files[3:5], files[5:7]]
+
+
+def test_size_histogram():
+    histogram = size_histogram([1, 10, 10, 100, 300], target_size=100)
+
+    assert [count for _, count in histogram] == [1, 2, 0, 0, 1, 1]
+    assert histogram[-1][0] == ">= 200 B"
+
+
+def test_main_merges_small_files(partitioned_dataset):
+    expected_df = read_dataset(partitioned_dataset).sort("id_cliente")
+
+    main([str(partitioned_dataset), "--target-size", "1", "--sort-by", "fecha_de_transaccion"])
+    partitions = list(partitioned_dataset.glob("region_de_venta=*"))
+    result_df = read_dataset(partitioned_dataset).sort("id_cliente")
+
+    assert len(partitions) == 6
+    assert all(len(list(partition.glob("*.parquet"))) == 1 for partition in partitions)
+    assert not list(partitioned_dataset.rglob(".compact-*"))
+    assert result_df.equals(expected_df.select(result_df.columns))
+    for path in partitioned_dataset.rglob("*.parquet"):
+        dates = pq.read_table(path).column("fecha_de_transaccion").to_pylist()
+        assert dates == sorted(dates)
+
+
+def test_main_splits_large_files(tmp_path):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    pl.read_csv(DATASET).write_parquet(dataset / "part-00000.parquet")
+    size = (dataset / "part-00000.parquet").stat().st_size
+
+    main([str(dataset), "--target-size", str(size / 4 / 1024**2)])
+    paths = list(dataset.glob("*.parquet"))
+
+    assert len(paths) == 4
+    assert sum(pq.read_metadata(path).num_rows for path in paths) == 1000
+
+
+def test_main_refreshes_catalog(partitioned_dataset):
+    update_catalog(*url_to_fs(str(partitioned_dataset)))
+
+    main([str(partitioned_dataset), "--target-size", "1"])
+    catalog = Catalog.load(*url_to_fs(str(partitioned_dataset)))
+
+    assert catalog is not None
+    assert len(catalog.files) == 6
+    assert all((partitioned_dataset / entry.path).exists() for entry in catalog.files)
+    assert sum(entry.rows for entry in catalog.files) == 1000
+
+
+def test_main_streams_row_groups(tmp_path, monkeypatch):
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    pl.read_csv(DATASET).write_parquet(dataset / "part-00000.parquet", row_group_size=100)
+    size = (dataset / "part-00000.parquet").stat().st_size
+    # Files are never read whole
+    monkeypatch.setattr(pq, "read_table", None)
+
+    main([str(dataset), "--target-size", str(size / 4 / 1024**2), "--sort-by", "id_cliente", "--row-group-size", "50"])
+    paths = sorted(dataset.glob("*.parquet"))
+
+    assert len(paths) == 4
+    for path in paths:
+        file = pq.ParquetFile(path)
+        assert file.metadata.num_row_groups == 5
+        for index in range(file.metadata.num_row_groups):
+            ids = file.read_row_group(index).column("id_cliente").to_pylist()
+            assert ids == sorted(ids)
+    assert pl.read_parquet(paths).sort("id_cliente").equals(pl.read_csv(DATASET).sort("id_cliente"))
+
+
+def test_main_removes_outdated_sidecars(tmp_path):
+    dataset = tmp_path / "dataset"
+    transform([str(DATASET), str(dataset), "-w", "4", "--chunk-size", "0", "--rollups", "--catalog"])
+    assert list(dataset.glob("_rollup-*.parquet"))
+
+    main([str(dataset), "--target-size", "1"])
+    catalog = Catalog.load(*url_to_fs(str(dataset)))
+
+    assert not list(dataset.glob("_rollup-*.parquet"))
+    assert not (dataset / "_manifest.json").exists()
+    assert catalog is not None
+    assert sorted(entry.path for entry in catalog.files) == sorted(path.name for path in dataset.glob("*.parquet"))
+
+
+def test_main_dry_run(partitioned_dataset):
+    paths = sorted(partitioned_dataset.rglob("*.parquet"))
+
+    main([str(partitioned_dataset), "--dry-run"])
+
+    assert sorted(partitioned_dataset.rglob("*.parquet")) == paths
+
+
+def test_main_fail(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        main([str(tmp_path / "missing")])
+
+    assert exc.value.code == 1
+
+
+def test_main_completes_interrupted_rewrites(partitioned_dataset, monkeypatch):
+    expected_df = read_dataset(partitioned_dataset).sort("id_cliente")
+
+    # The run crashes once the new files are renamed into place, before the merged files are removed
+    def crash(path, missing_ok=False):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr("pathlib.Path.unlink", crash)
+        with pytest.raises(KeyboardInterrupt):
+            main([str(partitioned_dataset), "--target-size", "1"])
+    assert list(partitioned_dataset.rglob("_compaction-*.json"))
+    # Left by a rewrite interrupted before its journal was written
+    partition = next(partitioned_dataset.glob("region_de_venta=*"))
+    (partition / ".compact-orphan-00000.parquet").write_bytes(b"0")
+
+    main([str(partitioned_dataset), "--target-size", "1", "--dry-run"])
+    assert list(partitioned_dataset.rglob("_compaction-*.json"))
+
+    main([str(partitioned_dataset), "--target-size", "1"])
+    result_df = read_dataset(partitioned_dataset).sort("id_cliente")
+
+    assert not list(partitioned_dataset.rglob("_compaction-*.json"))
+    assert not list(partitioned_dataset.rglob(".compact-*"))
+    assert result_df.equals(expected_df.select(result_df.columns))
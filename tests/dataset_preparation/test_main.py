@@ -1,9 +1,22 @@
+import time
+from concurrent import futures
 from unittest.mock import patch
 
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
-from scripts.dataset_preparation.main import FIELDS, Config, main
+from scripts.dataset_preparation.main import (
+    FIELDS,
+    PRODUCT_CATEGORIES,
+    SALE_REGIONS,
+    Config,
+    main,
+    submit_bounded,
+)
+from scripts.dataset_preparation.writers import OutputFormat, get_writer, write_shard_file
+from scripts.schema import POLARS_SCHEMA
 from tests.conftest import DATASET
 
 
@@ -20,8 +33,143 @@ def test_main_success(mock_config: Config):
     assert expected_result_df.equals(result_df)
 
 
+@pytest.mark.parametrize(
+    "output_format, read",
+    [
+        pytest.param(OutputFormat.PARQUET, pl.read_parquet, id="Parquet"),
+        pytest.param(OutputFormat.IPC, pl.read_ipc, id="Arrow IPC"),
+    ],
+)
+def test_main_success_binary_formats(output_format, read, mock_config: Config):
+    id_field = FIELDS[0]
+    expected_result_df = pl.read_csv(DATASET, try_parse_dates=True).sort(by=id_field)
+    mock_config.output_format = output_format
+
+    main(mock_config)
+    result_df = read(mock_config.csv_output_path).sort(by=id_field)
+
+    # Arrow IPC files keep the categorical columns as plain strings
+    assert all(result_df.schema[name] == dtype for name, dtype in POLARS_SCHEMA.items() if dtype != pl.Categorical)
+    assert expected_result_df.equals(result_df.cast({pl.Categorical: pl.String}))
+
+
+def test_main_success_ordered(mock_config: Config):
+    expected_result_df = pl.read_csv(DATASET).sort(by=FIELDS[0])
+    mock_config.ordered = True
+    mock_config.max_pending_batches = 2
+
+    main(mock_config)
+    result_df = pl.read_csv(mock_config.csv_output_path)
+
+    assert expected_result_df.equals(result_df)
+
+
+def test_main_success_sharded_csv(mock_config: Config):
+    expected_result_df = pl.read_csv(DATASET).sort(by=FIELDS[0])
+    mock_config.sharded = True
+    mock_config.ordered = True
+
+    main(mock_config)
+    result_df = pl.read_csv(mock_config.csv_output_path)
+
+    assert expected_result_df.equals(result_df)
+    assert [path.name for path in mock_config.csv_output_path.parent.iterdir()] == [mock_config.csv_output_path.name]
+
+
+@pytest.mark.parametrize(
+    "output_format, read, pattern",
+    [
+        pytest.param(OutputFormat.PARQUET, pl.read_parquet, "*.parquet", id="Parquet"),
+        pytest.param(OutputFormat.IPC, pl.read_ipc, "*.arrow", id="Arrow IPC"),
+    ],
+)
+def test_main_success_sharded_part_files(output_format, read, pattern, mock_config: Config):
+    id_field = FIELDS[0]
+    expected_result_df = pl.read_csv(DATASET, try_parse_dates=True).sort(by=id_field)
+    mock_config.output_format = output_format
+    mock_config.sharded = True
+
+    main(mock_config)
+    part_files = sorted(mock_config.csv_output_path.glob(pattern))
+    result_df = pl.concat([read(path) for path in part_files]).sort(by=id_field)
+
+    assert len(part_files) == mock_config.number_of_batches
+    assert expected_result_df.equals(result_df)
+
+
+def test_main_success_categorical(mock_config: Config, tmp_path):
+    mock_config.categorical = True
+    mock_config.output_format = OutputFormat.PARQUET
+    mock_config.csv_output_path = tmp_path / "categorical.parquet"
+    other_config = mock_config.model_copy(update={"workers": 1, "csv_output_path": tmp_path / "other.parquet"})
+
+    main(mock_config)
+    main(other_config)
+    result_df = (
+        pl.read_parquet(mock_config.csv_output_path)
+        .sort(by=FIELDS[0])
+        .with_columns(pl.col(pl.Categorical).cast(pl.String))
+    )
+    other_df = (
+        pl.read_parquet(other_config.csv_output_path)
+        .sort(by=FIELDS[0])
+        .with_columns(pl.col(pl.Categorical).cast(pl.String))
+    )
+    schema = pq.read_schema(mock_config.csv_output_path)
+
+    assert result_df.shape[0] == mock_config.records
+    assert pa.types.is_dictionary(schema.field("categoria_de_producto").type)
+    assert pa.types.is_date32(schema.field("fecha_de_transaccion").type)
+    assert set(result_df["categoria_de_producto"]) <= set(PRODUCT_CATEGORIES)
+    assert set(result_df["region_de_venta"]) <= set(SALE_REGIONS)
+    assert result_df["fecha_de_transaccion"].dt.year().unique().to_list() == [2023]
+    assert result_df.equals(other_df)
+
+
+@pytest.mark.parametrize("ordered", [pytest.param(False, id="Unordered"), pytest.param(True, id="Ordered")])
+def test_submit_bounded(ordered: bool):
+    submitted = []
+    results = []
+    max_pending = 0
+
+    def task(n: int) -> int:
+        time.sleep(0.001 * (n % 3))
+        return n
+
+    def args():
+        for n in range(20):
+            submitted.append(n)
+            yield n
+
+    with futures.ThreadPoolExecutor(max_workers=4) as executor:
+        for future in submit_bounded(executor, task, args(), limit=3, ordered=ordered):
+            results.append(future.result())
+            max_pending = max(max_pending, len(submitted) - len(results))
+
+    assert max_pending <= 3
+    assert sorted(results) == list(range(20))
+    if ordered:
+        assert results == list(range(20))
+
+
 @patch("scripts.dataset_preparation.main.write_content", retun_value=Exception("Test Error"))
 def test_main_fail(_, mock_config: Config):
     with pytest.raises(SystemExit) as exc:
         main(mock_config)
     assert exc.value.code == 1
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_csv_writer_quotes_separators(tmp_path, sharded):
+    df = pl.DataFrame({"categoria_de_producto": ['Hogar, "jardín"', "Moda"], "region_de_venta": ["Caribe", "Andina"]})
+    path = tmp_path / "output.csv"
+
+    with get_writer(OutputFormat.CSV, path, tuple(df.columns)) as writer:
+        if sharded:
+            shard_path = writer.shard_path(0)
+            write_shard_file(df, shard_path, OutputFormat.CSV)
+            writer.append_shard(shard_path)
+        else:
+            writer.write(df)
+
+    assert pl.read_csv(path).equals(df)
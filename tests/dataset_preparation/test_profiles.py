@@ -0,0 +1,56 @@
+import numpy as np
+import polars as pl
+import pyarrow.csv
+import pytest
+
+from scripts.dataset_preparation.main import FIELDS, Config, main
+from scripts.dataset_preparation.profiles import PROFILES, DistributionProfile, draw_codes, extend_labels
+
+
+def test_draw_codes_skew():
+    rng = np.random.default_rng(0)
+
+    codes = draw_codes(rng, n_values=100, skew=1.2, size=100_000)
+    counts = np.bincount(codes, minlength=100)
+
+    assert codes.min() >= 0 and codes.max() < 100
+    assert counts[0] > 10 * counts[50]
+
+
+def test_extend_labels():
+    assert extend_labels(["a", "b"], 1, "x") == ["a"]
+    assert extend_labels(["a", "b"], 4, "x") == ["a", "b", "x 3", "x 4"]
+
+
+@pytest.mark.parametrize("profile_name", ["skewed", "high_cardinality"])
+def test_main_profile_is_deterministic(profile_name: str, mock_config: Config, tmp_path):
+    mock_config.profile = PROFILES[profile_name]
+    other_config = mock_config.model_copy(update={"workers": 1, "csv_output_path": tmp_path / "other.csv"})
+
+    main(mock_config)
+    main(other_config)
+    result_df = pl.read_csv(mock_config.csv_output_path)
+
+    assert result_df.shape == (mock_config.records, len(FIELDS))
+    assert result_df.sort(FIELDS).equals(pl.read_csv(other_config.csv_output_path).sort(FIELDS))
+    assert result_df["categoria_de_producto"].n_unique() > 5
+
+
+def test_main_profile_nulls_and_malformed_rows(mock_config: Config):
+    mock_config.records = 10_000
+    mock_config.batch_size = 1_000
+    mock_config.profile = DistributionProfile(null_rate=0.05, malformed_rate=0.01)
+    invalid_rows = []
+
+    def register_error(row) -> str:
+        invalid_rows.append(row)
+        return "skip"
+
+    main(mock_config)
+    parse_options = pyarrow.csv.ParseOptions(invalid_row_handler=register_error)
+    table = pyarrow.csv.read_csv(mock_config.csv_output_path, parse_options=parse_options)
+
+    assert 50 < len(invalid_rows) < 200
+    assert table.num_rows + len(invalid_rows) == mock_config.records
+    assert 0.03 < table.column("cantidad_de_venta").null_count / table.num_rows < 0.07
+    assert table.column("id_cliente").null_count == 0
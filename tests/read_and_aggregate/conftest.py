@@ -0,0 +1,26 @@
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.schema import ARROW_SCHEMA
+from tests.conftest import DATASET
+
+
+@pytest.fixture(scope="session")
+def table() -> pa.Table:
+    return pyarrow.csv.read_csv(DATASET, convert_options=pyarrow.csv.ConvertOptions(column_types=ARROW_SCHEMA))
+
+
+@pytest.fixture(params=["single", "partitioned"])
+def dataset(request: pytest.FixtureRequest, tmp_path, table):
+    """
+    The dataset as a single Parquet file of small row groups, and partitioned by region.
+    """
+    if request.param == "single":
+        path = tmp_path / "single.parquet"
+        pq.write_table(table, path, row_group_size=100)
+    else:
+        path = tmp_path / "partitioned"
+        pq.write_to_dataset(table, root_path=path, partition_cols=["region_de_venta"])
+    return str(path)
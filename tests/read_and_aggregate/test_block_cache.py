@@ -0,0 +1,100 @@
+import fsspec
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.read_and_aggregate.block_cache import BlockCache, BlockCacheFileSystem
+from scripts.read_and_aggregate.main_dask import DaskProcessor
+from scripts.read_and_aggregate.main_duckdb import DuckDBProcessor
+from scripts.read_and_aggregate.main_pandas import PandasProcessor
+from scripts.read_and_aggregate.main_polars import PolarsProcessor
+from scripts.read_and_aggregate.main_pyarrow import PyArrowProcessor
+from scripts.read_and_aggregate.main_streaming import StreamingProcessor
+
+PROCESSORS = [PandasProcessor, DaskProcessor, PolarsProcessor, PyArrowProcessor, DuckDBProcessor, StreamingProcessor]
+
+
+@pytest.fixture
+def block_cache(tmp_path) -> BlockCache:
+    return BlockCache(tmp_path / "blocks", max_size=1024**3, block_size=4 * 1024)
+
+
+def test_cached_file_reads_every_range(tmp_path, block_cache):
+    path = tmp_path / "data.bin"
+    content = bytes(range(256)) * 100
+    path.write_bytes(content)
+    fs = BlockCacheFileSystem(fsspec.filesystem("file"), block_cache)
+
+    for start, end in [(0, 10), (4090, 4100), (100, 20_000), (0, len(content)), (25_000, 30_000)]:
+        with fs.open(str(path), "rb") as file:
+            file.seek(start)
+            assert file.read(end - start) == content[start:end]
+
+    # All the blocks were fetched once, the later reads hit the cache
+    assert block_cache.fetched_bytes == len(content)
+    assert block_cache.hits > 0
+
+
+def test_rewritten_files_are_fetched_again(tmp_path, block_cache):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"a" * 10_000)
+    fs = BlockCacheFileSystem(fsspec.filesystem("file"), block_cache)
+    assert fs.cat_file(str(path)) == b"a" * 10_000
+
+    path.write_bytes(b"b" * 10_000)
+
+    assert fs.cat_file(str(path)) == b"b" * 10_000
+    assert block_cache.fetched_bytes == 20_000
+
+
+def test_least_recently_used_blocks_are_evicted(tmp_path):
+    block_cache = BlockCache(tmp_path / "blocks", max_size=8 * 1024, block_size=4 * 1024)
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"a" * 16 * 1024)
+    fs = BlockCacheFileSystem(fsspec.filesystem("file"), block_cache)
+
+    assert fs.cat_file(str(path)) == b"a" * 16 * 1024
+
+    assert block_cache.size <= block_cache.max_size
+    assert len(list(block_cache.directory.glob("*.block"))) == 2
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_processors_read_through_the_block_cache(processor_class, dataset, block_cache):
+    expected_results = processor_class(dataset).run()
+
+    results = processor_class(dataset, block_cache=block_cache).run()
+    fetched_bytes = block_cache.fetched_bytes
+    warm_results = processor_class(dataset, block_cache=block_cache).run()
+
+    assert fetched_bytes > 0
+    # The warm run doesn't fetch anything
+    assert block_cache.fetched_bytes == fetched_bytes
+    for name, df in expected_results.items():
+        pd.testing.assert_frame_equal(results[name], df, check_dtype=False)
+        pd.testing.assert_frame_equal(warm_results[name], df, check_dtype=False)
+
+
+def test_block_cache_is_keyed_by_version(tmp_path, table, block_cache):
+    path = tmp_path / "single.parquet"
+    pq.write_table(table, path)
+    PandasProcessor(str(path), block_cache=block_cache).run()
+    fetched_bytes = block_cache.fetched_bytes
+
+    pq.write_table(table.slice(0, 100), path)
+    results = PandasProcessor(str(path), block_cache=block_cache).run()
+
+    assert block_cache.fetched_bytes > fetched_bytes
+    expected_total = sum(table.slice(0, 100).column("cantidad_de_venta").to_pylist())
+    assert results["Total sales by product category"]["total_sales"].sum() == expected_total
+
+
+def test_parallel_pandas_reads_through_the_block_cache(dataset, block_cache):
+    expected_results = PandasProcessor(dataset).run()
+
+    results = PandasProcessor(dataset, block_cache=block_cache, workers=2).run()
+
+    # The workers fetch through copies of the cache, sharing its directory
+    assert list(block_cache.directory.glob("*.block"))
+    for name, df in expected_results.items():
+        pd.testing.assert_frame_equal(results[name], df, check_dtype=False)
@@ -0,0 +1,99 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.read_and_aggregate.cache import ResultCache, dataset_fingerprint
+from scripts.read_and_aggregate.common import main
+from scripts.read_and_aggregate.filters import Filters
+from scripts.read_and_aggregate.main_pandas import PandasProcessor
+from scripts.read_and_aggregate.main_polars import PolarsProcessor
+from scripts.read_and_aggregate.query import DEFAULT_QUERY, Query
+
+
+@pytest.fixture
+def cache(tmp_path) -> ResultCache:
+    return ResultCache(tmp_path / "cache", max_size=1024**2, ttl=3600)
+
+
+def results(value: int) -> dict[str, pd.DataFrame]:
+    return {"Report": pd.DataFrame({"region_de_venta": ["Caribe"], "total_sales": [value]})}
+
+
+def test_dataset_fingerprint(tmp_path, table):
+    dataset = tmp_path / "dataset"
+    pq.write_to_dataset(table, root_path=dataset, partition_cols=["region_de_venta"])
+    fingerprint = dataset_fingerprint(str(dataset))
+
+    # Hidden files aren't read by the engines
+    (dataset / "_manifest.json").write_text("{}")
+    assert dataset_fingerprint(str(dataset)) == fingerprint
+
+    path = next(dataset.rglob("*.parquet"))
+    pq.write_table(table.slice(0, 10), path)
+    assert dataset_fingerprint(str(dataset)) != fingerprint
+
+
+@pytest.mark.parametrize("processor_class", [PandasProcessor, PolarsProcessor])
+def test_run_returns_cached_results(processor_class, dataset, cache):
+    expected_results = processor_class(dataset, cache=cache).run()
+
+    processor = processor_class(dataset, cache=cache)
+    results = processor.run()
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert processor.read_time == processor.process_time == 0
+    for name, df in expected_results.items():
+        pd.testing.assert_frame_equal(results[name], df)
+
+
+def test_cache_key(tmp_path, table):
+    path = str(tmp_path / "single.parquet")
+    pq.write_table(table, path)
+
+    def key(processor_class, **filters) -> str:
+        return processor_class(path, Query(reports=DEFAULT_QUERY.reports, filters=Filters(**filters))).cache_key()
+
+    # The order of the filter values doesn't matter, the engine and the filters do
+    assert key(PandasProcessor, regions=["Caribe", "Andina"]) == key(PandasProcessor, regions=["Andina", "Caribe"])
+    assert key(PandasProcessor, regions=["Caribe"]) != key(PolarsProcessor, regions=["Caribe"])
+    assert key(PandasProcessor, regions=["Caribe"]) != key(PandasProcessor, regions=["Andina"])
+
+    unchanged_key = key(PandasProcessor)
+    pq.write_table(table.slice(0, 10), path)
+    assert key(PandasProcessor) != unchanged_key
+
+
+def test_expired_entries_are_missed(tmp_path):
+    cache = ResultCache(tmp_path, max_size=1024**2, ttl=0)
+
+    cache.put("key", results(1))
+
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, cache):
+    cache.put("a", results(1))
+    cache.put("b", results(2))
+    entry_size = sum(file.stat().st_size for file in (cache.directory / "a").iterdir())
+    cache.max_size = 2 * entry_size
+    # Entry 'b' was used the longest time ago once 'a' is read
+    os.utime(cache.directory / "b" / "entry.json", (0, 0))
+    assert cache.get("a") is not None
+
+    cache.put("c", results(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")["Report"]["total_sales"].tolist() == [1]
+    assert cache.get("c")["Report"]["total_sales"].tolist() == [3]
+
+
+def test_main_no_cache(dataset, tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    main(PolarsProcessor, [dataset, "--cache-dir", str(cache_dir), "--no-cache"])
+    assert not cache_dir.exists()
+
+    main(PolarsProcessor, [dataset, "--cache-dir", str(cache_dir)])
+    assert len(list(cache_dir.iterdir())) == 1
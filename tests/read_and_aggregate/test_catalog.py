@@ -0,0 +1,122 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from fsspec.core import url_to_fs
+from fsspec.implementations.local import LocalFileSystem
+
+from scripts.read_and_aggregate.cache import ResultCache, list_dataset
+from scripts.read_and_aggregate.catalog import plan_files
+from scripts.read_and_aggregate.filters import Filters
+from scripts.read_and_aggregate.main_dask import DaskProcessor
+from scripts.read_and_aggregate.main_duckdb import DuckDBProcessor
+from scripts.read_and_aggregate.main_pandas import PandasProcessor
+from scripts.read_and_aggregate.main_polars import PolarsProcessor
+from scripts.read_and_aggregate.main_pyarrow import PyArrowProcessor
+from scripts.read_and_aggregate.main_streaming import StreamingProcessor
+from scripts.read_and_aggregate.query import DEFAULT_QUERY, Query
+from scripts.transform_load_to_parquet.main import main as transform
+from tests.conftest import DATASET
+
+FILTERS = Filters(start_date=date(2023, 3, 1), end_date=date(2023, 9, 30), regions=["Amazonía", "Caribe"])
+
+
+@pytest.fixture
+def dataset(tmp_path) -> str:
+    """
+    Parallel conversion partitioned by region, with every part sorted by date into small row groups.
+    """
+    output = tmp_path / "dataset"
+    transform(
+        [str(DATASET), str(output), "-w", "3", "-p", "region_de_venta"]
+        + ["--sort-by", "fecha_de_transaccion", "--row-group-size", "50", "--catalog"]
+    )
+    return str(output)
+
+
+def test_plan_files_prunes_partitions(dataset):
+    files = plan_files(dataset, Filters(regions=["Amazonía", "Caribe"]))
+
+    assert files is not None
+    assert len(files) == 6
+    assert all(file.split("/")[0] in ("region_de_venta=Amazon%C3%ADa", "region_de_venta=Caribe") for file in files)
+
+
+def test_plan_files_prunes_by_statistics(dataset):
+    all_files = plan_files(dataset, Filters())
+    # No file has transactions of the future, one is still planned so engines return empty reports
+    assert all_files is not None
+    assert len(plan_files(dataset, Filters(start_date=date(2100, 1, 1))) or []) == 1
+    assert len(plan_files(dataset, Filters(start_date=date(2000, 1, 1))) or []) == len(all_files)
+
+
+def test_plan_files_ignores_outdated_catalog(dataset, tmp_path):
+    files = plan_files(dataset, Filters())
+    assert files is not None
+    # A part added after the catalog was written is only noticed in a listing of the dataset
+    (tmp_path / "dataset" / "region_de_venta=Caribe" / "extra.parquet").write_bytes(
+        (tmp_path / "dataset" / files[0]).read_bytes()
+    )
+    assert plan_files(dataset, Filters(), list_dataset(*url_to_fs(dataset))) is None
+    assert plan_files(dataset, Filters()) == files
+
+    (tmp_path / "dataset" / "region_de_venta=Caribe" / "extra.parquet").unlink()
+    assert plan_files(dataset, Filters(), list_dataset(*url_to_fs(dataset))) == files
+    # A planned part rewritten since is noticed from its details
+    (tmp_path / "dataset" / files[-1]).write_bytes(b"")
+    assert plan_files(dataset, Filters()) is None
+    assert plan_files(dataset, Filters(), list_dataset(*url_to_fs(dataset))) is None
+
+
+def test_run_lists_dataset_once(dataset, tmp_path, monkeypatch):
+    listings = []
+    find = LocalFileSystem.find
+    monkeypatch.setattr(
+        LocalFileSystem, "find", lambda self, *args, **kwargs: listings.append(args) or find(self, *args, **kwargs)
+    )
+    cache = ResultCache(tmp_path / "cache", max_size=1024**2, ttl=3600)
+    processor = PolarsProcessor(dataset, DEFAULT_QUERY, cache, rollups=True, catalog=True)
+
+    processor.run()
+    assert len(listings) == 1
+    processor.run()
+    assert len(listings) == 2
+
+
+def test_plan_files_without_catalog(tmp_path):
+    output = tmp_path / "output.parquet"
+    transform([str(DATASET), str(output)])
+
+    assert plan_files(str(output), Filters()) is None
+    assert plan_files(str(tmp_path), Filters()) is None
+
+
+PROCESSORS = [PandasProcessor, DaskProcessor, PolarsProcessor, PyArrowProcessor, DuckDBProcessor, StreamingProcessor]
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_processor_reads_planned_files(processor_class, dataset):
+    query = Query(reports=DEFAULT_QUERY.reports, filters=FILTERS)
+    expected = PandasProcessor(dataset, query).run()
+
+    processor = processor_class(dataset, query, catalog=True)
+    results = processor.run()
+
+    assert isinstance(processor.paths(dataset), list)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(results[name], df, check_dtype=False)
+    assert results["Average sales by region"]["region_de_venta"].tolist() == ["Amazonía", "Caribe"]
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_processor_reads_directory_holding_catalog(processor_class, dataset):
+    query = Query(reports=DEFAULT_QUERY.reports, filters=FILTERS)
+    expected = PandasProcessor(dataset, query).run()
+
+    # The catalog and the manifest are hidden files of the dataset directory
+    processor = processor_class(dataset, query, catalog=False)
+    results = processor.run()
+
+    assert processor.paths(dataset) == dataset
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(results[name], df, check_dtype=False)
@@ -0,0 +1,245 @@
+from datetime import date
+
+import dask.dataframe as dd
+import duckdb
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pytest
+
+from scripts.read_and_aggregate.common import build_query
+from scripts.read_and_aggregate.filters import Filters
+from scripts.read_and_aggregate.main_dask import DaskProcessor
+from scripts.read_and_aggregate.main_duckdb import DuckDBProcessor
+from scripts.read_and_aggregate.main_pandas import PandasProcessor, slice_tasks
+from scripts.read_and_aggregate.main_polars import PolarsProcessor
+from scripts.read_and_aggregate.main_pyarrow import PyArrowProcessor
+from scripts.read_and_aggregate.main_streaming import StreamingProcessor
+from scripts.read_and_aggregate.parser import get_config
+from scripts.read_and_aggregate.query import DEFAULT_QUERY, Aggregation, Query, Report
+from scripts.read_and_aggregate.sql import grouping_id, grouping_sets_sql
+
+PROCESSORS = [PandasProcessor, DaskProcessor, PolarsProcessor, PyArrowProcessor, DuckDBProcessor, StreamingProcessor]
+FILTERS = Filters(
+    start_date=date(2023, 3, 1), end_date=date(2023, 9, 30), regions=["Caribe", "Andina"], categories=["Moda"]
+)
+COLUMNS = ["categoria_de_producto", "region_de_venta", "cantidad_de_venta"]
+QUERY = Query(
+    reports=[
+        Report(
+            name="Sales by region",
+            group_by=["region_de_venta"],
+            aggregations=[
+                Aggregation(column="cantidad_de_venta", function="sum", alias="total"),
+                Aggregation(column="cantidad_de_venta", function="mean", alias="average"),
+                Aggregation(column="id_cliente", function="count", alias="transactions"),
+            ],
+        ),
+        Report(
+            name="Sales by region and category",
+            group_by=["region_de_venta", "categoria_de_producto"],
+            aggregations=[
+                Aggregation(column="cantidad_de_venta", function="min", alias="smallest"),
+                Aggregation(column="cantidad_de_venta", function="max", alias="largest"),
+            ],
+        ),
+    ],
+    filters=Filters(start_date=date(2023, 6, 1)),
+)
+
+
+def to_pandas(data) -> pd.DataFrame:
+    if isinstance(data, pl.DataFrame):
+        data = data.to_pandas()
+    elif isinstance(data, dd.DataFrame):
+        data = data.compute()
+    elif isinstance(data, pa.Table):
+        data = data.to_pandas()
+    elif isinstance(data, ds.Scanner):
+        data = data.to_table().to_pandas()
+    elif isinstance(data, duckdb.DuckDBPyRelation):
+        data = data.df()
+    df = data.astype({"categoria_de_producto": str, "region_de_venta": str})
+    return df.sort_values(COLUMNS, ignore_index=True)
+
+
+def test_get_config():
+    argv = ["gs://bucket/", "--start-date", "2023-03-01", "--end-date", "2023-09-30", "--regions", "Caribe", "Andina"]
+    argv += ["--categories", "Moda"]
+
+    assert get_config(argv).filters == FILTERS
+    assert get_config(["gs://bucket/"]).filters.to_dnf() is None
+
+
+def test_get_config_accepts_profile_labels():
+    config = get_config(["gs://bucket/", "--regions", "Región 7", "--categories", "Categoría 12"])
+
+    assert config.filters == Filters(regions=["Región 7"], categories=["Categoría 12"])
+
+
+def test_build_query(tmp_path):
+    query_file = tmp_path / "query.json"
+    query_file.write_text(QUERY.model_dump_json())
+
+    query = build_query(get_config(["gs://bucket/", "-q", str(query_file), "--regions", "Caribe"]))
+
+    assert query.reports == QUERY.reports
+    assert query.filters == Filters(start_date=date(2023, 6, 1), regions=["Caribe"])
+    assert build_query(get_config(["gs://bucket/"])) == DEFAULT_QUERY
+
+
+def test_query_columns():
+    assert DEFAULT_QUERY.columns == COLUMNS
+    assert QUERY.columns == ["region_de_venta", "categoria_de_producto", "cantidad_de_venta", "id_cliente"]
+
+
+def test_to_sql():
+    assert FILTERS.to_sql() == (
+        "fecha_de_transaccion >= DATE '2023-03-01' AND fecha_de_transaccion <= DATE '2023-09-30' "
+        "AND categoria_de_producto IN ('Moda') AND region_de_venta IN ('Caribe', 'Andina')"
+    )
+
+
+def test_grouping_sets_sql():
+    assert grouping_sets_sql(QUERY) == (
+        'SELECT "region_de_venta", "categoria_de_producto", SUM("cantidad_de_venta") AS "r0_total", '
+        'AVG("cantidad_de_venta") AS "r0_average", COUNT("id_cliente") AS "r0_transactions", '
+        'MIN("cantidad_de_venta") AS "r1_smallest", MAX("cantidad_de_venta") AS "r1_largest", '
+        'GROUPING_ID("region_de_venta", "categoria_de_producto") AS grouping_id FROM dataset '
+        'GROUP BY GROUPING SETS (("region_de_venta"), ("region_de_venta", "categoria_de_producto"))'
+    )
+    shared_keys = Query(reports=[QUERY.reports[0], QUERY.reports[0].model_copy(update={"name": "Again"})])
+    assert grouping_sets_sql(shared_keys).endswith('GROUP BY GROUPING SETS (("region_de_venta"))')
+    assert grouping_sets_sql(shared_keys, quote="`").startswith("SELECT `region_de_venta`, SUM(`cantidad_de_venta`)")
+    assert grouping_id(["region_de_venta", "categoria_de_producto"], ["region_de_venta"]) == 1
+    assert grouping_id(["region_de_venta", "categoria_de_producto"], ["categoria_de_producto"]) == 2
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_read_projects_columns(processor_class, dataset, table):
+    # The processor holds the connection of DuckDB relations
+    processor = processor_class(dataset)
+    df = to_pandas(processor.read())
+
+    assert list(df.columns) == COLUMNS
+    assert len(df) == table.num_rows
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_read_applies_filters(processor_class, dataset, table):
+    mask = (
+        (pc.field("fecha_de_transaccion") >= date(2023, 3, 1))
+        & (pc.field("fecha_de_transaccion") <= date(2023, 9, 30))
+        & pc.field("region_de_venta").isin(["Caribe", "Andina"])
+        & pc.field("categoria_de_producto").isin(["Moda"])
+    )
+    expected_df = to_pandas(table.filter(mask).select(COLUMNS).to_pandas())
+
+    processor = processor_class(dataset, Query(reports=DEFAULT_QUERY.reports, filters=FILTERS))
+    result_df = to_pandas(processor.read())
+
+    assert 0 < len(result_df) < table.num_rows
+    pd.testing.assert_frame_equal(result_df, expected_df, check_dtype=False)
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_run(processor_class, dataset):
+    processor = processor_class(dataset, Query(reports=DEFAULT_QUERY.reports, filters=Filters(regions=["Caribe"])))
+
+    results = processor.run()
+
+    assert processor.read_time > 0
+    assert processor.process_time > 0
+    assert list(results) == ["Total sales by product category", "Average sales by region"]
+    assert results["Average sales by region"]["region_de_venta"].tolist() == ["Caribe"]
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_run_computes_every_report(processor_class, dataset, table):
+    df = table.filter(pc.field("fecha_de_transaccion") >= date(2023, 6, 1)).to_pandas()
+    df = df.astype({"categoria_de_producto": str, "region_de_venta": str})
+    by_region = df.groupby("region_de_venta").agg(
+        total=("cantidad_de_venta", "sum"), average=("cantidad_de_venta", "mean"), transactions=("id_cliente", "count")
+    )
+    by_region_and_category = df.groupby(["region_de_venta", "categoria_de_producto"]).agg(
+        smallest=("cantidad_de_venta", "min"), largest=("cantidad_de_venta", "max")
+    )
+
+    results = processor_class(dataset, QUERY).run()
+
+    pd.testing.assert_frame_equal(results["Sales by region"], by_region.reset_index(), check_dtype=False)
+    pd.testing.assert_frame_equal(
+        results["Sales by region and category"], by_region_and_category.reset_index(), check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("processor_class", PROCESSORS)
+def test_run_reports_sharing_keys(processor_class, dataset):
+    by_category = Report(
+        name="Total sales by category",
+        group_by=["categoria_de_producto"],
+        aggregations=[Aggregation(column="cantidad_de_venta", function="sum", alias="total")],
+    )
+    by_category_too = Report(
+        name="Largest sale by category",
+        group_by=["categoria_de_producto"],
+        aggregations=[Aggregation(column="cantidad_de_venta", function="max", alias="largest")],
+    )
+    expected = PandasProcessor(dataset, Query(reports=[by_category])).run()["Total sales by category"]
+
+    results = processor_class(dataset, Query(reports=[by_category, by_category_too])).run()
+
+    assert len(expected) == 5
+    pd.testing.assert_frame_equal(results["Total sales by category"], expected, check_dtype=False)
+    assert (
+        results["Largest sale by category"]["categoria_de_producto"].tolist()
+        == expected["categoria_de_producto"].tolist()
+    )
+
+
+@pytest.mark.parametrize("filters", [QUERY.filters, FILTERS, Filters(regions=["Caribe"], categories=["Inexistente"])])
+def test_parallel_pandas_matches_sequential(dataset, filters):
+    query = Query(reports=QUERY.reports, filters=filters)
+    expected = PandasProcessor(dataset, query).run()
+
+    results = PandasProcessor(dataset, query, workers=2).run()
+
+    assert list(results) == list(expected)
+    for name, expected_df in expected.items():
+        pd.testing.assert_frame_equal(results[name], expected_df, check_dtype=False)
+
+
+def test_slice_tasks_cover_every_row_group_once(dataset, table):
+    dataset = ds.dataset(dataset, format="parquet", partitioning="hive")
+
+    tasks = slice_tasks(dataset, Query(reports=QUERY.reports), 4)
+
+    assert len(tasks) >= 4
+    assert sum(task.fragment.to_table().num_rows for task in tasks) == table.num_rows
+
+
+def test_duckdb_sums_integers(dataset):
+    results = DuckDBProcessor(dataset, QUERY).run()
+
+    assert pd.api.types.is_integer_dtype(results["Sales by region"]["total"])
+    assert pd.api.types.is_float_dtype(results["Sales by region"]["average"])
+
+
+def test_duckdb_quotes_identifiers(dataset):
+    report = Report(
+        name="Sales by region",
+        group_by=["region_de_venta"],
+        aggregations=[
+            Aggregation(column="cantidad_de_venta", function="sum", alias="total sales"),
+            Aggregation(column="id_cliente", function="count", alias="count"),
+            Aggregation(column="cantidad_de_venta", function="max", alias='"largest" FROM dataset; --'),
+        ],
+    )
+    expected = PandasProcessor(dataset, Query(reports=[report])).run()["Sales by region"]
+
+    results = DuckDBProcessor(dataset, Query(reports=[report])).run()
+
+    assert list(expected.columns) == ["region_de_venta", "total sales", "count", '"largest" FROM dataset; --']
+    pd.testing.assert_frame_equal(results["Sales by region"], expected, check_dtype=False)
@@ -0,0 +1,106 @@
+from datetime import date
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.read_and_aggregate.filters import Filters
+from scripts.read_and_aggregate.main_duckdb import DuckDBProcessor
+from scripts.read_and_aggregate.main_pandas import PandasProcessor
+from scripts.read_and_aggregate.main_polars import PolarsProcessor
+from scripts.read_and_aggregate.query import DEFAULT_QUERY, Aggregation, Query, Report
+from scripts.read_and_aggregate.rollups import answer_from_rollups
+from scripts.transform_load_to_parquet.main import main as transform
+from tests.conftest import DATASET
+
+QUERY = Query(
+    reports=[
+        Report(
+            name="Sales by region and category",
+            group_by=["region_de_venta", "categoria_de_producto"],
+            aggregations=[
+                Aggregation(column="cantidad_de_venta", function=function, alias=function)
+                for function in ("sum", "count", "mean", "min", "max")
+            ],
+        ),
+        *DEFAULT_QUERY.reports,
+    ],
+    filters=Filters(regions=["Caribe", "Andina", "Insular"], categories=["Moda", "Salud"]),
+)
+
+
+@pytest.fixture(params=[[], ["-p", "region_de_venta"], ["-w", "3"]], ids=["Single", "Partitioned", "Parallel"])
+def dataset(request: pytest.FixtureRequest, tmp_path) -> str:
+    output = tmp_path / "dataset" / "output.parquet"
+    transform([str(DATASET), str(output), "--rollups-by-date"] + request.param)
+    return str(output if "-w" in request.param or not request.param else output.parent)
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        pytest.param(QUERY.filters, id="Regions and categories"),
+        pytest.param(Filters(start_date=date(2023, 3, 1), end_date=date(2023, 6, 30)), id="Dates"),
+    ],
+)
+def test_answer_from_rollups(dataset, filters: Filters):
+    query = QUERY.model_copy(update={"filters": filters})
+    expected_results = PandasProcessor(dataset, query).run()
+
+    results = answer_from_rollups(dataset, query)
+
+    assert results is not None
+    assert list(results) == list(expected_results)
+    for name, df in expected_results.items():
+        pd.testing.assert_frame_equal(results[name], df, check_dtype=False)
+
+
+def test_rollups_dont_answer_other_aggregations(dataset):
+    aggregation = Aggregation(column="id_cliente", function="count", alias="transactions")
+    query = Query(reports=[Report(name="Transactions", group_by=["region_de_venta"], aggregations=[aggregation])])
+
+    assert answer_from_rollups(dataset, query) is None
+
+
+@pytest.mark.parametrize("processor_class", [PolarsProcessor, DuckDBProcessor])
+def test_processors_skip_rollup_files(processor_class, dataset):
+    aggregation = Aggregation(column="id_cliente", function="count", alias="transactions")
+    query = Query(reports=[Report(name="Transactions", group_by=["region_de_venta"], aggregations=[aggregation])])
+    expected_results = PandasProcessor(dataset, query).run()
+
+    # The rollups can't answer the query, so the dataset is scanned next to them
+    results = processor_class(dataset, query, rollups=True).run()
+
+    pd.testing.assert_frame_equal(results["Transactions"], expected_results["Transactions"], check_dtype=False)
+
+
+def test_rollups_without_dates_dont_answer_date_filters(tmp_path):
+    output = tmp_path / "output.parquet"
+    transform([str(DATASET), str(output), "--rollups"])
+
+    assert answer_from_rollups(str(output), DEFAULT_QUERY) is not None
+    query = DEFAULT_QUERY.model_copy(update={"filters": Filters(start_date=date(2023, 3, 1))})
+    assert answer_from_rollups(str(output), query) is None
+
+
+def test_rollups_must_cover_every_file(tmp_path, table):
+    output = tmp_path / "dataset" / "output.parquet"
+    transform([str(DATASET), str(output), "--rollups", "-w", "2"])
+    # A part written without a rollup
+    pq.write_table(table, output / "part-99999.parquet")
+
+    assert answer_from_rollups(str(output), DEFAULT_QUERY) is None
+
+
+def test_processor_uses_rollups(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    output = tmp_path / "output.parquet"
+    transform([str(DATASET), str(output), "--rollups"])
+    processor = PandasProcessor(str(output), rollups=True)
+    monkeypatch.setattr(processor, "read", lambda: pytest.fail("The dataset was scanned"))
+
+    results = processor.run()
+
+    assert (
+        results["Total sales by product category"]["total_sales"].sum()
+        == pd.read_csv(DATASET)["cantidad_de_venta"].sum()
+    )
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from scripts.read_and_aggregate.main_streaming import KeyEncoder, ReportAccumulator
+from scripts.read_and_aggregate.query import Aggregation, Report, report_frame
+
+REPORT = Report(
+    name="Sales by region and category",
+    group_by=["region_de_venta", "categoria_de_producto"],
+    aggregations=[
+        Aggregation(column="cantidad_de_venta", function=function, alias=function)
+        for function in ("sum", "mean", "min", "max")
+    ]
+    + [Aggregation(column="id_cliente", function="count", alias="transactions")],
+)
+
+
+def test_key_encoder_codes_dictionaries_and_plain_arrays():
+    encoder = KeyEncoder()
+
+    codes, valid = encoder.encode(pa.array(["Moda", "Salud", None, "Moda"]).dictionary_encode())
+    more_codes, _ = encoder.encode(pa.array(["Salud", "Belleza"]))
+
+    assert codes[valid].tolist() == [0, 1, 0]
+    assert valid.tolist() == [True, True, False, True]
+    assert more_codes.tolist() == [1, 2]
+    assert encoder.values == ["Moda", "Salud", "Belleza"]
+
+
+def test_report_accumulator_merges_batches(table):
+    encoders = {key: KeyEncoder() for key in REPORT.group_by}
+    accumulator = ReportAccumulator(REPORT, encoders)
+    # Every slice has its own dictionaries, and new keys keep appearing
+    df = table.to_pandas().astype({"categoria_de_producto": str, "region_de_venta": str})
+    df = df.sort_values("region_de_venta", ignore_index=True)
+    df.loc[::7, "cantidad_de_venta"] = None
+    df.loc[::11, "categoria_de_producto"] = None
+    batches = pa.Table.from_pandas(df, preserve_index=False).to_batches(max_chunksize=64)
+
+    for batch in batches:
+        index = batch.schema.get_field_index("categoria_de_producto")
+        batch = batch.set_column(index, "categoria_de_producto", batch.column(index).dictionary_encode())
+        codes = {key: encoders[key].encode(batch.column(key)) for key in REPORT.group_by}
+        accumulator.add(batch, codes)
+
+    expected_df = report_frame(
+        df.groupby(REPORT.group_by).agg(
+            sum=("cantidad_de_venta", "sum"),
+            mean=("cantidad_de_venta", "mean"),
+            min=("cantidad_de_venta", "min"),
+            max=("cantidad_de_venta", "max"),
+            transactions=("id_cliente", "count"),
+        ),
+        REPORT,
+    )
+    assert len(batches) > 10
+    assert len(accumulator.groups) == len(expected_df)
+    pd.testing.assert_frame_equal(report_frame(accumulator.frame(), REPORT), expected_df, check_dtype=False)
+
+
+def test_report_accumulator_keeps_only_the_groups_seen():
+    report = Report(
+        name="Sales by client and day",
+        group_by=["id_cliente", "dia"],
+        aggregations=[Aggregation(column="cantidad_de_venta", function="sum", alias="total")],
+    )
+    encoders = {key: KeyEncoder() for key in report.group_by}
+    accumulator = ReportAccumulator(report, encoders)
+    rows = 200_000
+    # Both keys have 100000 values, but only 100000 of their 10**10 combinations occur
+    clients = np.arange(rows) % 100_000
+    days = (np.arange(rows) * 7) % 100_000
+    table = pa.table({"id_cliente": clients, "dia": days, "cantidad_de_venta": np.ones(rows, np.int64)})
+
+    for batch in table.to_batches(max_chunksize=50_000):
+        codes = {key: encoders[key].encode(batch.column(key)) for key in report.group_by}
+        accumulator.add(batch, codes)
+    result_df = accumulator.frame()
+
+    assert len(accumulator.groups) == 100_000
+    assert len(accumulator.rows) < 2 * 100_000
+    assert len(result_df) == 100_000
+    assert (result_df["total"] == 2).all()
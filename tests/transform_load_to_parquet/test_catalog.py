@@ -0,0 +1,72 @@
+import json
+
+import pyarrow.parquet as pq
+import pytest
+from fsspec.core import url_to_fs
+
+from scripts.transform_load_to_parquet.catalog import CATALOG_NAME, Catalog, update_catalog
+from scripts.transform_load_to_parquet.main import main
+from tests.conftest import DATASET
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Single"),
+        pytest.param(["-p", "region_de_venta"], id="Partitioned"),
+        pytest.param(["-s", "-p", "region_de_venta"], id="Streaming"),
+        pytest.param(["-w", "3", "-p", "region_de_venta"], id="Parallel"),
+    ],
+)
+def test_main_writes_catalog(tmp_path, extra_args):
+    output = tmp_path / "dataset" / "output.parquet"
+    main([str(DATASET), str(output), "--catalog"] + extra_args)
+
+    root = output if "-w" in extra_args else output.parent
+    catalog = Catalog.model_validate_json((root / CATALOG_NAME).read_text())
+    files = sorted(path for path in root.rglob("*.parquet") if not path.name.startswith("_"))
+
+    assert [entry.path for entry in catalog.files] == [path.relative_to(root).as_posix() for path in files]
+    assert sum(entry.rows for entry in catalog.files) == sum(1 for _ in open(DATASET)) - 1
+    assert all(entry.size == (root / entry.path).stat().st_size for entry in catalog.files)
+    assert catalog.columns["fecha_de_transaccion"] == "date32[day]"
+    if "-p" in extra_args:
+        # Partition values are decoded from the directory names
+        regions = {entry.partition["region_de_venta"] for entry in catalog.files}
+        assert "Amazonía" in regions
+        assert "region_de_venta" not in catalog.files[0].row_groups[0].columns
+
+
+def test_update_catalog_reads_new_footers_only(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    output = tmp_path / "dataset"
+    main([str(DATASET), str(output), "-w", "2", "--catalog"])
+    catalog = json.loads((output / CATALOG_NAME).read_text())
+    # Previous entries are reused as they are, even if they were edited
+    catalog["files"][0]["rows"] = -1
+    (output / CATALOG_NAME).write_text(json.dumps(catalog))
+    pq.write_table(pq.read_table(output / "part-00000.parquet"), output / "part-99999.parquet")
+    read_metadata = pq.read_metadata
+    footers = []
+    monkeypatch.setattr(pq, "read_metadata", lambda file: footers.append(file) or read_metadata(file))
+
+    updated = update_catalog(*url_to_fs(str(output)))
+
+    assert len(footers) == 1
+    assert [entry.path for entry in updated.files] == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+        "part-99999.parquet",
+    ]
+    assert updated.files[0].rows == -1
+    assert updated.files[2].rows == pq.read_metadata(output / "part-99999.parquet").num_rows
+
+
+def test_update_catalog_drops_removed_files(tmp_path):
+    output = tmp_path / "dataset"
+    main([str(DATASET), str(output), "-w", "2", "--catalog"])
+    (output / "part-00001.parquet").unlink()
+
+    updated = update_catalog(*url_to_fs(str(output)))
+
+    assert [entry.path for entry in updated.files] == ["part-00000.parquet"]
+    assert Catalog.load(*url_to_fs(str(output))) == updated
@@ -0,0 +1,81 @@
+import polars as pl
+import pytest
+
+from scripts.transform_load_to_parquet.incremental import IngestState, complete_size
+from scripts.transform_load_to_parquet.main import main
+from tests.conftest import DATASET
+
+
+@pytest.fixture
+def lines() -> list[str]:
+    return DATASET.read_text().splitlines(keepends=True)
+
+
+def read_dataset(output) -> pl.DataFrame:
+    return pl.read_parquet(output / "**/*.parquet", hive_partitioning=False).sort("id_cliente")
+
+
+def test_complete_size(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_bytes(b"a,b\n1,2\n3,")
+
+    assert complete_size(path) == 8
+
+
+def test_main_incremental_appended_rows(lines: list[str], tmp_path):
+    input = tmp_path / "input.csv"
+    output = tmp_path / "output"
+    input.write_text("".join(lines[:501]))
+
+    main([str(input), str(output), "-i"])
+    # The last line is incomplete, it is left for the next run
+    with open(input, "a") as file:
+        file.write("".join(lines[501:801]) + lines[801].rstrip("\n"))
+    main([str(input), str(output), "-i"])
+    first_runs_df = read_dataset(output)
+    with open(input, "a") as file:
+        file.write("\n" + "".join(lines[802:]))
+    main([str(input), str(output), "-i"])
+    main([str(input), str(output), "-i"])
+    state = IngestState.load(output)
+
+    assert len(first_runs_df) == 800
+    assert read_dataset(output).equals(pl.read_csv(DATASET, try_parse_dates=True).sort("id_cliente"))
+    assert state.next_part == 3
+    assert state.inputs[str(input.resolve())].offset == input.stat().st_size
+    assert [input_range.rows for input_range in state.inputs[str(input.resolve())].ranges] == [500, 300, 200]
+
+
+def test_main_incremental_rewritten_input(lines: list[str], tmp_path):
+    input = tmp_path / "input.csv"
+    output = tmp_path / "output"
+    input.write_text("".join(lines[:501]))
+    main([str(input), str(output), "-i"])
+    input.write_text("".join(lines[:1] + lines[2:]))
+
+    with pytest.raises(SystemExit) as exc:
+        main([str(input), str(output), "-i"])
+
+    assert exc.value.code == 1
+    assert IngestState.load(output).next_part == 1
+
+
+def test_main_incremental_directory_with_error_handling(lines: list[str], tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    output = tmp_path / "output" / "dataset"
+    (input_dir / "day_1.csv").write_text("".join(lines[:401]))
+    main([str(input_dir), str(output), "-i", "-e", "-p", "region_de_venta"])
+    (input_dir / "day_2.csv").write_text("".join(lines[:1] + lines[601:]))
+    with open(input_dir / "day_1.csv", "a") as file:
+        file.write("".join(lines[401:451] + ["1,2,3\n"] + lines[451:601]))
+
+    main([str(input_dir), str(output), "-i", "-e", "-p", "region_de_venta", "-w", "2"])
+    quarantine = pl.read_csv(output.parent / "quarantine-day_1.csv")
+
+    assert len(list(output.glob("region_de_venta=*"))) == 6
+    assert read_dataset(output).equals(
+        pl.read_csv(DATASET, try_parse_dates=True).drop("region_de_venta").sort("id_cliente")
+    )
+    assert quarantine.rows() == [(452, "expected 5 fields, got 3", "1,2,3")]
+    assert not (output.parent / "quarantine-day_2.csv").exists()
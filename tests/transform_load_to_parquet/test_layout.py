@@ -0,0 +1,58 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from scripts.schema import ARROW_SCHEMA
+from scripts.transform_load_to_parquet.layout import Layout, describe_file, sort_table
+from scripts.transform_load_to_parquet.main import main
+from tests.conftest import DATASET
+
+
+def test_sort_table_dictionary_columns():
+    table = pa.table(
+        {
+            "region": pa.array(["b", "a", "b", "a"]).dictionary_encode(),
+            "value": [4, 3, 1, 2],
+        }
+    )
+
+    result = sort_table(table, ["region", "value"])
+
+    assert result.column("region").to_pylist() == ["a", "a", "b", "b"]
+    assert result.column("value").to_pylist() == [2, 3, 1, 4]
+
+
+def test_write_options_partitioned_sorting_columns():
+    layout = Layout(sort_by=["region_de_venta", "fecha_de_transaccion"])
+
+    options = layout.write_options(ARROW_SCHEMA, partition_cols=["region_de_venta"])
+
+    # The partition column isn't stored in the files, so the date is their second column
+    assert options["sorting_columns"] == (pq.SortingColumn(1),)
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Polars"),
+        pytest.param(["-e"], id="Error handling"),
+        pytest.param(["-s"], id="Streaming"),
+    ],
+)
+def test_main_layout(extra_args: list[str], tmp_path):
+    output = tmp_path / "output.parquet"
+    layout_args = ["--sort-by", "region_de_venta", "fecha_de_transaccion", "--row-group-size", "100"]
+    layout_args += ["--compression", "zstd", "--compression-level", "9", "--page-index"]
+
+    main([str(DATASET), str(output), *layout_args, *extra_args])
+    layout = describe_file(output, ["region_de_venta"])
+    metadata = pq.read_metadata(output)
+
+    assert layout.rows == 1000
+    assert len(layout.row_groups) == 10
+    assert layout.compression == "ZSTD"
+    assert metadata.row_group(0).sorting_columns == (pq.SortingColumn(4), pq.SortingColumn(1))
+    assert metadata.row_group(0).column(0).has_offset_index
+    # Sorted row groups don't overlap, so a filter on the region only matches a few of them
+    ranges = [row_group.ranges["region_de_venta"] for row_group in layout.row_groups]
+    assert all(previous[1] <= current[0] for previous, current in zip(ranges, ranges[1:]))
@@ -1,8 +1,16 @@
+import json
 from unittest.mock import Mock, patch
 
+import fsspec
+import polars as pl
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import pytest
 
-from scripts.transform_load_to_parquet.main import main
+from scripts.schema import ARROW_SCHEMA
+from scripts.transform_load_to_parquet.layout import Layout
+from scripts.transform_load_to_parquet.main import main, process_using_polars
+from tests.conftest import DATASET
 
 
 @patch("scripts.transform_load_to_parquet.main.process_using_polars")
@@ -40,3 +48,206 @@ def test_main_fail(m_process_using_pyarrow: Mock, m_process_using_polars: Mock,
     else:
         m_process_using_polars.assert_called_once()
     assert exc.value.code == 1
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Polars"),
+        pytest.param(["-e"], id="Error handling"),
+        pytest.param(["-s"], id="Streaming"),
+        pytest.param(["-w", "2"], id="Parallel"),
+    ],
+)
+def test_main_declared_schema(extra_args: list[str], tmp_path):
+    output = tmp_path / "output" / "output.parquet"
+
+    main([str(DATASET), str(output), *extra_args])
+    schema = ds.dataset(output if output.is_file() else output.parent, format="parquet").schema
+
+    assert schema.remove_metadata() == ARROW_SCHEMA
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Polars"),
+        pytest.param(["-s"], id="Streaming"),
+        pytest.param(["-w", "2"], id="Parallel"),
+    ],
+)
+def test_main_declared_schema_with_invalid_values(extra_args: list[str], tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    lines[199] = "100001,2023-01-01,99999999999,Moda,Caribe\n"
+    lines[599] = "100002,2023-02-30,100,Moda,Caribe\n"
+    dataset.write_text("".join(lines))
+    output = tmp_path / "output" / "output.parquet"
+
+    main([str(dataset), str(output), *extra_args])
+    table = ds.dataset(output if output.is_file() else output.parent, format="parquet").to_table()
+    df = pl.DataFrame(table)
+
+    # Values that don't fit the declared types become null in every mode
+    assert table.schema.remove_metadata() == ARROW_SCHEMA
+    assert table.num_rows == len(lines) - 1
+    assert df.filter(pl.col("id_cliente") == 100001)["cantidad_de_venta"].to_list() == [None]
+    assert df.filter(pl.col("id_cliente") == 100002)["fecha_de_transaccion"].to_list() == [None]
+
+
+@patch("scripts.transform_load_to_parquet.main.write_table_with_rollup")
+def test_process_using_polars_casts_to_declared_schema(m_write_table_with_rollup: Mock, tmp_path):
+    process_using_polars(DATASET, tmp_path / "output.parquet", None, Layout())
+    table = m_write_table_with_rollup.call_args.args[0]
+
+    # Polars' own types, such as categoricals with uint32 indices, aren't written by this mode only
+    assert table.schema == ARROW_SCHEMA
+    assert table.num_rows == len(DATASET.read_text().splitlines()) - 1
+
+
+def test_main_streaming(tmp_path):
+    output = tmp_path / "output.parquet"
+
+    main([str(DATASET), str(output), "-s", "--row-group-size", "300"])
+    result_df = pl.read_parquet(output)
+
+    assert pq.ParquetFile(output).metadata.num_row_groups == 4
+    assert result_df.equals(pl.read_csv(DATASET, try_parse_dates=True))
+
+
+def test_main_streaming_partitioned_with_error_handling(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    dataset.write_text("".join(lines[:10] + ["1,2,3\n"] + lines[10:]))
+    output = tmp_path / "output" / "output.parquet"
+
+    main([str(dataset), str(output), "-s", "-e", "-p", "region_de_venta"])
+    result_df = pl.read_parquet(output.parent / "**/*.parquet", hive_partitioning=True)
+
+    assert len(list(output.parent.glob("region_de_venta=*"))) == 6
+    assert result_df.shape[0] == len(lines) - 1
+    assert pl.read_csv(output.parent / "quarantine.csv").row(0) == (11, "expected 5 fields, got 3", "1,2,3")
+
+
+def test_main_streaming_nulls_invalid_values(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    lines[499] = "100001,2023-01-01,abc,Moda,Caribe\n"
+    lines[699] = "100002,2023-13-45,100,Moda,Caribe\n"
+    dataset.write_text("".join(lines[:10] + ["1,2,3\n"] + lines[10:]))
+    output = tmp_path / "output.parquet"
+
+    main([str(dataset), str(output), "-s", "--memory-budget", "1"])
+    result_df = pl.read_parquet(output)
+
+    # As in the default conversion with Polars, invalid values become null and short rows are skipped
+    assert result_df.shape[0] == len(lines) - 1
+    assert result_df.filter(pl.col("id_cliente") == 100001)["cantidad_de_venta"].to_list() == [None]
+    assert result_df.filter(pl.col("id_cliente") == 100002)["fecha_de_transaccion"].to_list() == [None]
+    assert not (tmp_path / "quarantine.csv").exists()
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Default behavior"),
+        pytest.param(["-p", "region_de_venta"], id="Partition"),
+    ],
+)
+def test_main_parallel(extra_args: list[str], tmp_path):
+    output = tmp_path / "output.parquet"
+
+    main([str(DATASET), str(output), "-w", "3"] + extra_args)
+    manifest = json.loads((output / "_manifest.json").read_text())
+    part_paths = [output / part["path"] for chunk in manifest["chunks"] for part in chunk["parts"]]
+    result_df = pl.concat(pl.read_parquet(path, hive_partitioning=False) for path in part_paths)
+
+    assert len(manifest["chunks"]) == 3
+    assert sorted(part_paths) == sorted(output.rglob("*.parquet"))
+    assert manifest["rows"] == 1000
+    assert result_df.sort("id_cliente").equals(
+        pl.read_csv(DATASET, try_parse_dates=True).select(result_df.columns).sort("id_cliente")
+    )
+
+
+def test_main_parallel_with_error_handling(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    lines[99] = "99,2023-01-01,1000,Moda,Caribe,extra\n"
+    lines[499] = "499,2023-01-01,not a number,Moda,Caribe\n"
+    lines[899] = "899,2023-01-01\n"
+    dataset.write_text("".join(lines))
+    output = tmp_path / "output" / "output.parquet"
+
+    main([str(dataset), str(output), "-w", "3", "-e"])
+    manifest = json.loads((output / "_manifest.json").read_text())
+    rejected = pl.read_csv(output.parent / "quarantine.csv")
+
+    assert manifest["rows"] == 997
+    assert manifest["rejected"] == 3
+    assert rejected["line_number"].to_list() == [100, 500, 900]
+    assert not list(output.glob(".quarantine-*"))
+
+
+def test_main_parallel_nulls_invalid_values(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    lines[99] = "99,2023-01-01,1000,Moda,Caribe,extra\n"
+    lines[499] = "100001,2023-01-01,not a number,Moda,Caribe\n"
+    lines[899] = "abc,2023-01-01,1000,Moda,Caribe\n"
+    dataset.write_text("".join(lines))
+    output = tmp_path / "output"
+
+    main([str(dataset), str(output), "-w", "2"])
+    manifest = json.loads((output / "_manifest.json").read_text())
+    result_df = pl.read_parquet(output / "*.parquet")
+
+    assert manifest["rows"] == 999
+    assert result_df.filter(pl.col("id_cliente") == 100001)["cantidad_de_venta"].to_list() == [None]
+    assert result_df["id_cliente"].null_count() == 1
+
+
+def test_main_streaming_to_url(tmp_path):
+    url = f"memory://bucket/{tmp_path.name}/output.parquet"
+
+    main([str(DATASET), url, "-s", "--row-group-size", "300"])
+    with fsspec.open(url, "rb") as file:
+        result_df = pl.read_parquet(file)
+
+    assert result_df.equals(pl.read_csv(DATASET, try_parse_dates=True))
+    # Nothing is staged locally
+    assert not list(tmp_path.iterdir())
+
+
+def test_main_streaming_to_url_partitioned_with_error_handling(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    dataset = tmp_path / "dataset.csv"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    dataset.write_text("".join(lines[:10] + ["1,2,3\n"] + lines[10:]))
+    url = f"memory://bucket/{tmp_path.name}/output.parquet"
+    monkeypatch.chdir(tmp_path)
+
+    main([str(dataset), url, "-s", "-e", "-p", "region_de_venta"])
+    quarantine_df = pl.read_csv(fsspec.open(f"memory://bucket/{tmp_path.name}/quarantine.csv", "rb").open())
+    fs = fsspec.filesystem("memory")
+    paths = fs.glob(f"/bucket/{tmp_path.name}/region_de_venta=*/*.parquet")
+
+    assert len(paths) == 6
+    assert sum(pq.read_metadata(fs.open(path, "rb")).num_rows for path in paths) == 1000
+    assert quarantine_df.row(0) == (11, "expected 5 fields, got 3", "1,2,3")
+    # Nothing is written to the working directory
+    assert list(tmp_path.iterdir()) == [dataset]
+
+
+@pytest.mark.parametrize("flags", [["-w", "2"], ["-i"]])
+def test_main_url_rejects_local_conversions(tmp_path, flags):
+    with pytest.raises(SystemExit) as exc:
+        main([str(DATASET), f"memory://bucket/{tmp_path.name}/output", "-s", *flags])
+
+    assert exc.value.code == 2
+
+
+def test_main_url_requires_streaming(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        main([str(DATASET), f"memory://bucket/{tmp_path.name}/output.parquet"])
+
+    assert exc.value.code == 1
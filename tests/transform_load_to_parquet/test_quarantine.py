@@ -0,0 +1,52 @@
+import polars as pl
+import pytest
+
+from scripts.transform_load_to_parquet.quarantine import Quarantine, open_validated_csv
+from tests.conftest import DATASET
+
+
+@pytest.fixture
+def dirty_dataset(tmp_path):
+    lines = DATASET.read_text().splitlines(keepends=True)
+    replacements = {
+        5: "5,2023-01-01,1000,Moda\n",
+        300: "300,2023-01-01,not a number,Moda,Caribe\n",
+        301: "301,2023-01-01,1000,Moda,Caribe,extra\n",
+        702: "702,not a date,1000,Moda,Caribe\n",
+    }
+    for index, line in replacements.items():
+        lines[index - 1] = line
+    path = tmp_path / "dirty.csv"
+    path.write_text("".join(lines))
+    return path
+
+
+def test_open_validated_csv(dirty_dataset, tmp_path):
+    quarantine = Quarantine(tmp_path / "quarantine.csv")
+
+    # Small blocks so that errors are found across several batches
+    table = open_validated_csv(dirty_dataset, quarantine, block_size=4096).read_all()
+    quarantine.close()
+    rejected = pl.read_csv(quarantine.path)
+
+    assert table.num_rows == 1000 - 4
+    assert str(table.schema.field("cantidad_de_venta").type) == "int64"
+    assert rejected["line_number"].to_list() == [5, 300, 301, 702]
+    assert rejected["reason"].to_list() == [
+        "expected 5 fields, got 4",
+        "invalid cantidad_de_venta",
+        "expected 5 fields, got 6",
+        "invalid fecha_de_transaccion",
+    ]
+    assert rejected["record"][1] == "300,2023-01-01,not a number,Moda,Caribe"
+    assert quarantine.rejected == 4
+
+
+def test_open_validated_csv_clean(tmp_path):
+    quarantine = Quarantine(tmp_path / "quarantine.csv")
+
+    table = open_validated_csv(DATASET, quarantine).read_all()
+    quarantine.close()
+
+    assert pl.DataFrame(table).equals(pl.read_csv(DATASET, try_parse_dates=True))
+    assert not quarantine.path.exists()
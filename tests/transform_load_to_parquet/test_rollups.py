@@ -0,0 +1,85 @@
+import polars as pl
+import pytest
+
+from scripts.read_and_aggregate.rollups import load_rollup
+from scripts.transform_load_to_parquet.main import main
+from scripts.transform_load_to_parquet.rollups import Rollup, RollupBuilder
+from tests.conftest import DATASET
+
+
+def expected_rollup(keys: list[str]) -> pl.DataFrame:
+    sales = pl.col("cantidad_de_venta")
+    return (
+        pl.read_csv(DATASET, try_parse_dates=True)
+        .group_by(keys)
+        .agg(
+            sales.sum().alias("cantidad_de_venta_sum"),
+            sales.count().alias("cantidad_de_venta_count"),
+            sales.min().alias("cantidad_de_venta_min"),
+            sales.max().alias("cantidad_de_venta_max"),
+        )
+        .sort(keys)
+    )
+
+
+def test_rollup_builder_merges_batches():
+    df = pl.read_csv(DATASET, try_parse_dates=True)
+    builder = RollupBuilder(Rollup())
+    for offset in range(0, len(df), 300):
+        # Every slice has its own dictionaries
+        builder.add(df.slice(offset, 300).cast({"categoria_de_producto": pl.Categorical}).to_arrow())
+
+    result_df = pl.from_arrow(builder.table()).sort(Rollup().keys)
+
+    assert result_df.equals(expected_rollup(Rollup().keys), null_equal=True)
+
+
+@pytest.mark.parametrize(
+    "extra_args",
+    [
+        pytest.param([], id="Polars"),
+        pytest.param(["-e"], id="Error handling"),
+        pytest.param(["-s"], id="Streaming"),
+        pytest.param(["-w", "3"], id="Parallel"),
+        pytest.param(["-p", "region_de_venta"], id="Partition"),
+        pytest.param(["-s", "-p", "region_de_venta"], id="Streaming partition"),
+        pytest.param(["-w", "3", "-p", "region_de_venta"], id="Parallel partition"),
+    ],
+)
+def test_main_writes_rollups(extra_args: list[str], tmp_path):
+    output = tmp_path / "dataset" / "output.parquet"
+
+    main([str(DATASET), str(output), "--rollups"] + extra_args)
+    # Parallel conversions write a directory of parts, the others write next to the output path
+    root = output if "-w" in extra_args else output.parent
+    rollup = load_rollup(str(root))
+
+    assert rollup is not None
+    assert pl.from_arrow(rollup).sort(Rollup().keys).equals(expected_rollup(Rollup().keys))
+
+
+def test_main_writes_rollups_by_date(tmp_path):
+    output = tmp_path / "dataset" / "output.parquet"
+
+    main([str(DATASET), str(output), "--rollups-by-date", "-s", "--row-group-size", "300"])
+    rollup = load_rollup(str(output))
+
+    assert rollup is not None
+    assert pl.from_arrow(rollup).sort(Rollup(by_date=True).keys).equals(expected_rollup(Rollup(by_date=True).keys))
+
+
+def test_main_incremental_writes_rollups_of_new_parts(tmp_path):
+    input = tmp_path / "input.csv"
+    output = tmp_path / "output"
+    lines = DATASET.read_text().splitlines(keepends=True)
+    input.write_text("".join(lines[:501]))
+
+    main([str(input), str(output), "-i", "--rollups"])
+    with open(input, "a") as file:
+        file.write("".join(lines[501:]))
+    main([str(input), str(output), "-i", "--rollups"])
+    rollup = load_rollup(str(output))
+
+    assert len(list(output.glob("_rollup-*.parquet"))) == 2
+    assert rollup is not None
+    assert pl.from_arrow(rollup).sort(Rollup().keys).equals(expected_rollup(Rollup().keys))
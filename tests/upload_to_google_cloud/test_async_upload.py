@@ -0,0 +1,154 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from gcsfs.retry import HttpError
+
+from scripts.upload_to_google_cloud.async_upload import (
+    AdaptiveLimiter,
+    UploadReport,
+    gcs_put,
+    throttling_filesystem,
+    upload_concurrently,
+)
+
+
+def write_files(directory: Path, count: int) -> list[str]:
+    names = [f"part-{i}.parquet" for i in range(count)]
+    for name in names:
+        (directory / name).write_bytes(b"0" * 1024)
+    return names
+
+
+def test_adaptive_limiter():
+    async def run() -> list[float]:
+        limiter = AdaptiveLimiter(initial=4, maximum=10)
+        limits = []
+        for throttled in [False, False, True, False, False]:
+            await limiter.acquire()
+            await limiter.release(throttled)
+            limits.append(limiter.limit)
+        return limits
+
+    # Slow start until the first throttling, then one slot per window of `limit` uploads
+    assert asyncio.run(run()) == [5, 6, 3, 3 + 1 / 3, 3 + 1 / 3 + 1 / (3 + 1 / 3)]
+
+
+def test_upload_concurrently_backs_off_when_throttled(tmp_path):
+    names = write_files(tmp_path, 100)
+    active = 0
+    uploaded = []
+
+    async def put(path: Path, name: str) -> None:
+        nonlocal active
+        # The fake service throttles above 8 concurrent uploads
+        if active >= 8:
+            raise HttpError({"code": 429, "message": "Too Many Requests"})
+        active += 1
+        await asyncio.sleep(0.001)
+        active -= 1
+        uploaded.append(name)
+
+    report = asyncio.run(upload_concurrently(put, tmp_path, names, max_concurrency=64, base_delay=0.001))
+
+    assert sorted(uploaded) == sorted(names)
+    assert not report.failed
+    assert report.retries > 0
+    assert report.peak_concurrency < 64
+    assert report.throughput > 0
+
+
+def test_upload_concurrently_does_not_retry_permanent_errors(tmp_path):
+    names = write_files(tmp_path, 3)
+    attempts = []
+
+    async def put(path: Path, name: str) -> None:
+        attempts.append(name)
+        if name == names[0]:
+            raise HttpError({"code": 403, "message": "Forbidden"})
+
+    report = asyncio.run(upload_concurrently(put, tmp_path, names, max_concurrency=4, base_delay=0.001))
+
+    assert len(attempts) == 3
+    assert [file.name for file in report.failed] == [names[0]]
+    assert report.failed[0].attempts == 1
+
+
+def test_upload_concurrently_retry_limits(tmp_path):
+    names = write_files(tmp_path, 20)
+
+    async def put(path: Path, name: str) -> None:
+        raise HttpError({"code": 503, "message": "Service Unavailable"})
+
+    report = asyncio.run(
+        upload_concurrently(put, tmp_path, names, max_concurrency=4, max_attempts=3, base_delay=0.001)
+    )
+
+    # Every file fails, and the retry budget (10 retries) runs out before every file used its 3 attempts
+    assert len(report.failed) == 20
+    assert report.retries == 10
+    assert all(file.attempts <= 3 for file in report.files)
+
+
+class ThrottlingService:
+    """
+    Local HTTP server standing in for GCS, answering 429 to the requests above 2 concurrent ones.
+    """
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.responses: list[int] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.active += 1
+        try:
+            status = 429 if self.active > 2 else 200
+            self.responses.append(status)
+            await asyncio.sleep(0.005)
+            if status == 429:
+                return web.json_response({"error": {"code": 429, "message": "Too Many Requests"}}, status=429)
+            return web.json_response({})
+        finally:
+            self.active -= 1
+
+
+def test_throttled_requests_reach_the_limiter(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    names = write_files(tmp_path, 20)
+    service = ThrottlingService()
+    limits = []
+    release = AdaptiveLimiter.release
+
+    async def record_release(self: AdaptiveLimiter, throttled: bool) -> None:
+        before = self.limit
+        await release(self, throttled)
+        limits.append((throttled, before, self.limit))
+
+    monkeypatch.setattr(AdaptiveLimiter, "release", record_release)
+
+    async def run() -> UploadReport:
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", service.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        fs = throttling_filesystem(
+            token="anon", endpoint_url=f"http://127.0.0.1:{port}", asynchronous=True, skip_instance_cache=True
+        )
+        session = await fs._set_session()
+        try:
+            put = gcs_put(fs, "bucket")
+            return await upload_concurrently(put, tmp_path, names, max_concurrency=8, base_delay=0.001)
+        finally:
+            await session.close()
+            await runner.cleanup()
+
+    report = asyncio.run(run())
+
+    assert not report.failed
+    # Every 429 of the service is seen by the limiter, which halves the concurrency, instead of retried by gcsfs
+    assert report.retries == service.responses.count(429) > 0
+    assert all(after == max(1.0, before / 2) for throttled, before, after in limits if throttled)
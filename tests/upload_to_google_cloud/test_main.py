@@ -1,11 +1,21 @@
 from unittest.mock import Mock, patch
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from google.cloud.exceptions import exceptions
 from google.cloud.storage import Bucket, Client
 
-from scripts.upload_to_google_cloud.main import get_or_create_bucket, main, transfer_manager, upload_files_to_gcs
+from scripts.transform_load_to_parquet.catalog import CATALOG_NAME, Catalog
+from scripts.upload_to_google_cloud.main import (
+    get_or_create_bucket,
+    main,
+    transfer_manager,
+    upload_catalog,
+    upload_files_to_gcs,
+)
 from scripts.upload_to_google_cloud.parser import Config
+from scripts.upload_to_google_cloud.transfers import file_crc32c
 
 
 def test_get_or_create_bucket_existing(mock_client: Client, mock_bucket: Bucket):
@@ -42,6 +52,52 @@ def test_upload_files_to_gcs_single_file(mock_bucket: Bucket, mock_config: Confi
     mock_blob.upload_from_filename.assert_called_once_with(str(file_path), if_generation_match=0)
 
 
+@patch.object(transfer_manager, "upload_chunks_concurrently")
+def test_upload_files_to_gcs_single_large_file(
+    m_upload_chunks_concurrently: Mock, mock_bucket: Bucket, mock_config: Config
+):
+    mock_config.chunk_size = 1024
+    file_path = mock_config.directory / "test.parquet"
+    file_path.write_bytes(b"0" * 4000)
+    mock_blob = mock_bucket.blob.return_value
+    mock_blob.exists.return_value = False
+    mock_blob.crc32c = file_crc32c(file_path)
+
+    upload_files_to_gcs(mock_bucket, mock_config)
+
+    mock_blob.upload_from_filename.assert_not_called()
+    m_upload_chunks_concurrently.assert_called_once_with(
+        str(file_path), mock_blob, chunk_size=1024, max_workers=mock_config.workers, checksum="crc32c"
+    )
+    mock_blob.reload.assert_called_once()
+    mock_blob.delete.assert_not_called()
+
+
+@patch.object(transfer_manager, "upload_chunks_concurrently")
+def test_upload_files_to_gcs_single_large_file_checksum_mismatch(
+    m_upload_chunks_concurrently: Mock, mock_bucket: Bucket, mock_config: Config
+):
+    mock_config.chunk_size = 1024
+    (mock_config.directory / "test.parquet").write_bytes(b"0" * 4000)
+    mock_blob = mock_bucket.blob.return_value
+    mock_blob.exists.return_value = False
+    mock_blob.crc32c = "AAAAAA=="
+
+    with pytest.raises(ValueError):
+        upload_files_to_gcs(mock_bucket, mock_config)
+
+    m_upload_chunks_concurrently.assert_called_once()
+    mock_blob.delete.assert_called_once()
+
+
+def test_file_crc32c(tmp_path):
+    file_path = tmp_path / "test.parquet"
+    file_path.write_bytes(b"123456789")
+
+    # Check value of the CRC32C (Castagnoli) polynomial
+    assert file_crc32c(file_path) == "4waSgw=="
+
+
 @patch.object(transfer_manager, "upload_many_from_filenames")
 def test_upload_files_to_gcs_multiple_files(
     m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config
@@ -51,8 +107,9 @@ def test_upload_files_to_gcs_multiple_files(
     for file_path in file_paths:
         file_path.touch()
         filenames.append(file_path.name)
+    m_upload_many_from_filenames.return_value = [None] * 4 + [Exception("Service unavailable")]
 
-    upload_files_to_gcs(mock_bucket, mock_config)
+    assert upload_files_to_gcs(mock_bucket, mock_config) == 1
 
     mock_bucket.blob.assert_not_called()
     upload_files_to_gcs_call_args = m_upload_many_from_filenames.call_args.kwargs
@@ -62,6 +119,21 @@ def test_upload_files_to_gcs_multiple_files(
     assert upload_files_to_gcs_call_args["max_workers"] == mock_config.workers
 
 
+def test_upload_catalog(mock_bucket: Bucket, mock_config: Config):
+    partition = mock_config.directory / "region_de_venta=Caribe"
+    partition.mkdir()
+    pq.write_table(pa.table({"cantidad_de_venta": [1, 2]}), partition / "part-0.parquet")
+
+    upload_catalog(mock_bucket, mock_config)
+
+    catalog = Catalog.model_validate_json((mock_config.directory / CATALOG_NAME).read_text())
+    assert [entry.path for entry in catalog.files] == ["region_de_venta=Caribe/part-0.parquet"]
+    mock_bucket.blob.assert_called_once_with(CATALOG_NAME)
+    mock_bucket.blob.return_value.upload_from_filename.assert_called_once_with(
+        str(mock_config.directory / CATALOG_NAME)
+    )
+
+
 @pytest.mark.parametrize(
     "expected_side_effect, func",
     [
@@ -89,3 +161,45 @@ def test_upload_files_to_gcs_fail(
     else:
         m_upload_files_to_gcs.assert_called_once()
     assert exc.value.code == 1
+
+
+@patch("scripts.upload_to_google_cloud.main.Client")
+@patch("scripts.upload_to_google_cloud.main.get_or_create_bucket")
+@patch("scripts.upload_to_google_cloud.main.upload_files_to_gcs")
+@patch("scripts.upload_to_google_cloud.main.upload_catalog")
+def test_catalog_is_not_uploaded_after_failed_uploads(
+    m_upload_catalog: Mock,
+    m_upload_files_to_gcs: Mock,
+    m_get_or_create_bucket: Mock,
+    m_client: Mock,
+    argv,
+    mock_bucket,
+):
+    m_get_or_create_bucket.return_value = mock_bucket
+    m_upload_files_to_gcs.return_value = 1
+
+    with pytest.raises(SystemExit) as exc:
+        main(argv + ["--catalog"])
+
+    m_upload_catalog.assert_not_called()
+    assert exc.value.code == 1
+
+
+@patch("scripts.upload_to_google_cloud.main.Client")
+@patch("scripts.upload_to_google_cloud.main.get_or_create_bucket")
+@patch("scripts.upload_to_google_cloud.main.upload_files_to_gcs")
+@patch("scripts.upload_to_google_cloud.main.upload_catalog")
+def test_catalog_is_uploaded_after_the_files(
+    m_upload_catalog: Mock,
+    m_upload_files_to_gcs: Mock,
+    m_get_or_create_bucket: Mock,
+    m_client: Mock,
+    argv,
+    mock_bucket,
+):
+    m_get_or_create_bucket.return_value = mock_bucket
+    m_upload_files_to_gcs.return_value = 0
+
+    main(argv + ["--catalog"])
+
+    m_upload_catalog.assert_called_once()
@@ -0,0 +1,115 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from google.cloud.storage import Bucket
+
+from scripts.upload_to_google_cloud.parser import Config
+from scripts.upload_to_google_cloud.sync import MANIFEST_TEMPLATE, SyncManifest, sync_files_to_gcs, transfer_manager
+from scripts.upload_to_google_cloud.transfers import file_crc32c
+
+
+def remote_blob(name: str, size: int, crc32c: str) -> Mock:
+    blob = Mock(size=size, crc32c=crc32c)
+    blob.name = name
+    return blob
+
+
+def write_files(config: Config, contents: dict[str, bytes]) -> None:
+    for name, content in contents.items():
+        path = config.directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+
+@patch.object(transfer_manager, "upload_many_from_filenames")
+def test_sync_files_to_gcs(m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config):
+    mock_config.delete = True
+    write_files(mock_config, {"same.parquet": b"same", "p=1/changed.parquet": b"new content", "new.parquet": b"new"})
+    mock_bucket.list_blobs.return_value = [
+        remote_blob("same.parquet", 4, file_crc32c(mock_config.directory / "same.parquet")),
+        remote_blob("p=1/changed.parquet", 11, "AAAAAA=="),
+        remote_blob("gone.parquet", 10, "AAAAAA=="),
+        remote_blob("notes.txt", 10, "AAAAAA=="),
+    ]
+    m_upload_many_from_filenames.return_value = [None, None]
+
+    sync_files_to_gcs(mock_bucket, mock_config)
+    manifest = SyncManifest.load(mock_config.directory / MANIFEST_TEMPLATE.format(bucket=mock_bucket.name))
+
+    assert sorted(m_upload_many_from_filenames.call_args.kwargs["filenames"]) == ["new.parquet", "p=1/changed.parquet"]
+    mock_bucket.blob.assert_called_once_with("gone.parquet")
+    mock_bucket.blob.return_value.delete.assert_called_once()
+    assert manifest.remote is not None
+    assert sorted(manifest.remote) == ["new.parquet", "p=1/changed.parquet", "same.parquet"]
+    assert manifest.remote["p=1/changed.parquet"].crc32c == manifest.local["p=1/changed.parquet"].crc32c
+
+
+@patch.object(transfer_manager, "upload_many_from_filenames")
+def test_sync_files_to_gcs_uses_manifest(m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config):
+    write_files(mock_config, {"a.parquet": b"a", "b.parquet": b"b"})
+    mock_bucket.list_blobs.return_value = []
+    m_upload_many_from_filenames.return_value = [None, RuntimeError("Service unavailable")]
+    sync_files_to_gcs(mock_bucket, mock_config)
+    m_upload_many_from_filenames.reset_mock()
+    m_upload_many_from_filenames.return_value = [None]
+
+    sync_files_to_gcs(mock_bucket, mock_config)
+
+    # The bucket is listed once, and only the file that failed is uploaded again
+    mock_bucket.list_blobs.assert_called_once()
+    assert m_upload_many_from_filenames.call_args.kwargs["filenames"] == ["b.parquet"]
+
+
+@patch.object(transfer_manager, "upload_many_from_filenames")
+def test_sync_files_to_gcs_nothing_changed(
+    m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config
+):
+    write_files(mock_config, {"a.parquet": b"a"})
+    mock_bucket.list_blobs.return_value = [
+        remote_blob("a.parquet", 1, file_crc32c(mock_config.directory / "a.parquet"))
+    ]
+
+    sync_files_to_gcs(mock_bucket, mock_config)
+
+    m_upload_many_from_filenames.assert_not_called()
+    mock_bucket.blob.assert_not_called()
+
+
+@patch.object(transfer_manager, "upload_many_from_filenames")
+def test_sync_files_to_gcs_failed_deletion(
+    m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config
+):
+    mock_config.delete = True
+    write_files(mock_config, {"new.parquet": b"new"})
+    mock_bucket.list_blobs.return_value = [
+        remote_blob("gone.parquet", 10, "AAAAAA=="),
+        remote_blob("old.parquet", 3, "AAAAAA=="),
+    ]
+    m_upload_many_from_filenames.return_value = [None]
+    mock_bucket.blob.return_value.delete.side_effect = [RuntimeError("Service unavailable"), None]
+
+    failed = sync_files_to_gcs(mock_bucket, mock_config)
+    manifest = SyncManifest.load(mock_config.directory / MANIFEST_TEMPLATE.format(bucket=mock_bucket.name))
+
+    # The other deletion and the upload are still recorded, only the failed deletion is retried by the next sync
+    assert failed == 1
+    assert mock_bucket.blob.return_value.delete.call_count == 2
+    assert manifest.remote is not None
+    assert sorted(manifest.remote) == ["gone.parquet", "new.parquet"]
+
+
+@patch.object(transfer_manager, "upload_many_from_filenames")
+def test_sync_files_to_gcs_saves_manifest_on_error(
+    m_upload_many_from_filenames: Mock, mock_bucket: Bucket, mock_config: Config
+):
+    write_files(mock_config, {"a.parquet": b"a"})
+    mock_bucket.list_blobs.return_value = []
+    m_upload_many_from_filenames.side_effect = RuntimeError("Interrupted")
+
+    with pytest.raises(RuntimeError):
+        sync_files_to_gcs(mock_bucket, mock_config)
+    manifest = SyncManifest.load(mock_config.directory / MANIFEST_TEMPLATE.format(bucket=mock_bucket.name))
+
+    # The listing of the bucket and the local checksums aren't lost
+    assert manifest.remote == {}
+    assert list(manifest.local) == ["a.parquet"]